@@ -0,0 +1,92 @@
+"""Compare the vectorized ``BRFSSEncoder`` against the pandasql CASE queries.
+
+Usage::
+
+    python benchmarks/bench_encoding.py --csv CVD_cleaned.csv --repeat 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cvd.encoding import (  # noqa: E402
+    DERIVED_COLUMNS,
+    ENCODING_TABLE,
+    PASSTHROUGH_COLUMNS,
+    BRFSSEncoder,
+)
+
+
+def case_query(column, categories, table="BRFSS_2021"):
+    """Build the same ``SELECT CASE ...`` statement the notebook used."""
+    whens = "\n".join(
+        f"    WHEN {column} = '{category}' THEN {code}"
+        for code, category in enumerate(categories)
+    )
+    return f"SELECT\n  CASE\n{whens}\n  END as {column}\nFROM {table};"
+
+
+def diet_query(table="BRFSS_2021"):
+    added, subtracted = DERIVED_COLUMNS["Diet"]
+    expression = " + ".join(added) + "".join(f" - {name}" for name in subtracted)
+    return f"SELECT\n  ({expression})\n  as Diet\nFROM {table};"
+
+
+def encode_with_sqldf(frame):
+    """The original one-query-per-column pandasql path."""
+    import pandasql as psql
+
+    env = {"BRFSS_2021": frame}
+    parts = [psql.sqldf(case_query(c, cats), env) for c, cats in ENCODING_TABLE.items()]
+    parts.append(psql.sqldf(diet_query(), env))
+    parts.append(frame[PASSTHROUGH_COLUMNS])
+    return pd.concat(parts, axis=1)
+
+
+def encode_with_encoder(frame):
+    return BRFSSEncoder().fit_transform(frame)
+
+
+def best_of(function, frame, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(frame)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", default="CVD_cleaned.csv")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-sqldf", action="store_true",
+                        help="only time the vectorized encoder")
+    args = parser.parse_args(argv)
+
+    frame = pd.read_csv(args.csv)
+    print(f"rows: {len(frame):,}")
+
+    encoder_time, encoded = best_of(encode_with_encoder, frame, args.repeat)
+    print(f"BRFSSEncoder: {encoder_time:.3f}s")
+
+    if not args.skip_sqldf:
+        sqldf_time, expected = best_of(encode_with_sqldf, frame, args.repeat)
+        print(f"pandasql:     {sqldf_time:.3f}s")
+        print(f"speedup:      {sqldf_time / encoder_time:.1f}x")
+        pd.testing.assert_frame_equal(
+            encoded.reset_index(drop=True), expected.reset_index(drop=True),
+            check_dtype=False,
+        )
+        print("outputs match")
+
+
+if __name__ == "__main__":
+    main()
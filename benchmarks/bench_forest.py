@@ -0,0 +1,94 @@
+"""Compare ``FlatForest`` inference against ``RandomForestClassifier.predict``.
+
+Encodes and splits ``CVD_cleaned.csv`` like the notebook, fits a forest with
+the ``grid_search_rf`` defaults (``max_depth=None``) or loads a saved bundle
+(``--model models/rf.joblib``), then times ``best_model.predict(X_test)``
+against the flat-array engine, both in bulk and for single rows (where
+sklearn's per-tree loop dominates), and reports model size and prediction
+agreement.
+
+Usage::
+
+    python benchmarks/bench_forest.py --csv CVD_cleaned.csv --n-estimators 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cvd.encoding import BRFSSEncoder  # noqa: E402
+from cvd.forest import FlatForest  # noqa: E402
+from cvd.serve import load_model  # noqa: E402
+
+
+def best_of(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", default="CVD_cleaned.csv")
+    parser.add_argument("--model", help="bundle saved by cvd.serve.save_model")
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--n-jobs", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    frame = BRFSSEncoder().fit_transform(pd.read_csv(args.csv))
+    frame = frame.drop(columns=["Height_(cm)", "Weight_(kg)"])
+    features = frame.drop(columns=["Heart_Disease"])
+    X_train, X_test, y_train, _ = train_test_split(
+        features, frame["Heart_Disease"], test_size=0.2, random_state=42)
+
+    if args.model:
+        best_model = load_model(args.model)["estimator"]
+        if hasattr(best_model, "named_steps"):
+            best_model = best_model.steps[-1][1]
+    else:
+        best_model = RandomForestClassifier(n_estimators=args.n_estimators,
+                                            max_depth=args.max_depth,
+                                            n_jobs=args.n_jobs, random_state=42)
+        best_model.fit(X_train, y_train)
+    best_model.set_params(n_jobs=args.n_jobs)
+
+    export_time, flat = best_of(lambda: FlatForest.from_sklearn(best_model), 1)
+    X = X_test.to_numpy()
+    sklearn_time, expected = best_of(lambda: best_model.predict(X_test), args.repeat)
+    flat_time, predicted = best_of(lambda: flat.predict(X, n_jobs=args.n_jobs), args.repeat)
+    proba_gap = np.abs(flat.predict_proba(X) - best_model.predict_proba(X_test)).max()
+    one_row = X_test.iloc[:1]
+    sklearn_row, _ = best_of(lambda: best_model.predict(one_row), 50)
+    flat_row, _ = best_of(lambda: flat.predict(X[:1]), 50)
+
+    pickled = len(pickle.dumps(best_model, protocol=pickle.HIGHEST_PROTOCOL))
+    print(f"trees: {len(best_model.estimators_)}  nodes: {flat.n_nodes:,}  "
+          f"max depth: {flat.max_depth}  test rows: {len(X_test):,}")
+    print(f"export:             {export_time:.2f}s")
+    print(f"sklearn predict:    {sklearn_time:.3f}s  ({pickled / 1e6:.1f} MB pickled)")
+    print(f"FlatForest predict: {flat_time:.3f}s  ({flat.nbytes / 1e6:.1f} MB arrays)")
+    print(f"speedup:            {sklearn_time / flat_time:.1f}x")
+    print(f"single row:         sklearn {sklearn_row * 1e3:.2f} ms, "
+          f"FlatForest {flat_row * 1e3:.2f} ms ({sklearn_row / flat_row:.0f}x)")
+    print(f"agreement:          {(predicted == expected).mean():.6f}  "
+          f"(max |proba diff| {proba_gap:.2e})")
+
+
+if __name__ == "__main__":
+    main()
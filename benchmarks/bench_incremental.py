@@ -0,0 +1,97 @@
+"""Adding a survey year: full ``LogisticRegression`` refit vs ``partial_fit_stream``.
+
+On synthetic encoded 2021 rows split into "years" of ``--rows`` each, the
+incremental model is fitted on the first year (``fit_path``) and every
+later year is added with one ``partial_fit_stream`` pass over its chunks;
+the reference refits ``StandardScaler`` + ``LogisticRegression`` on all the
+years so far. After each year it reports the seconds of both updates, the
+test log-loss and ROC AUC of both, and the relative L2 distance of the
+incremental coefficients from the refit's.
+
+Usage::
+
+    python benchmarks/bench_incremental.py --rows 100000 --years 3 --C 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import log_loss, roc_auc_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cvd.encoding import BRFSSEncoder  # noqa: E402
+from cvd.incremental import IncrementalLogisticRegression  # noqa: E402
+from cvd.synthetic import make_frame  # noqa: E402
+from cvd.train import DROPPED_COLUMNS, TARGET  # noqa: E402
+
+
+def encoded_rows(n_rows, seed):
+    frame = BRFSSEncoder().fit_transform(make_frame("2021", n_rows, random_state=seed))
+    y = frame.pop(TARGET).to_numpy()
+    X = frame.drop(columns=DROPPED_COLUMNS).to_numpy(dtype=np.float64)
+    return np.nan_to_num(X), y
+
+
+def chunk_factory(X, y, chunk_size, seed):
+    rng = np.random.default_rng(seed)
+
+    def chunks():
+        order = rng.permutation(len(X))
+        for start in range(0, len(X), chunk_size):
+            rows = order[start:start + chunk_size]
+            yield X[rows], y[rows]
+    return chunks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="rows per year")
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--C", type=float, default=1.0)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    years = [encoded_rows(args.rows, args.seed + year) for year in range(args.years)]
+    X_test, y_test = encoded_rows(50_000, args.seed - 1)
+    model = IncrementalLogisticRegression(Cs=(args.C,))
+
+    print(f"{'year':>4}{'rows':>10}{'refit s':>9}{'update s':>10}{'refit loss':>12}"
+          f"{'stream loss':>13}{'refit AUC':>11}{'stream AUC':>12}{'coef diff':>11}")
+    for year, (X_year, y_year) in enumerate(years):
+        X = np.vstack([X for X, _ in years[:year + 1]])
+        y = np.concatenate([y for _, y in years[:year + 1]])
+        start = time.perf_counter()
+        refit = make_pipeline(StandardScaler(),
+                              LogisticRegression(C=args.C, max_iter=2000)).fit(X, y)
+        refit_seconds = time.perf_counter() - start
+
+        chunks = chunk_factory(X_year, y_year, args.chunk_size, args.seed + year)
+        start = time.perf_counter()
+        if year == 0:
+            model.fit_path(chunks)
+        else:
+            model.partial_fit_stream(chunks)
+        update_seconds = time.perf_counter() - start
+
+        expected = refit[-1].coef_.ravel() / refit[0].scale_
+        coef = model.models_[args.C].coef_.ravel() / model.scaler_.scale_
+        p_refit = refit.predict_proba(X_test)[:, 1]
+        p_stream = model.predict_proba(X_test, C=args.C)[:, 1]
+        print(f"{year:>4}{len(y):>10,}{refit_seconds:>9.2f}{update_seconds:>10.2f}"
+              f"{log_loss(y_test, p_refit):>12.4f}{log_loss(y_test, p_stream):>13.4f}"
+              f"{roc_auc_score(y_test, p_refit):>11.4f}{roc_auc_score(y_test, p_stream):>12.4f}"
+              f"{np.linalg.norm(coef - expected) / np.linalg.norm(expected):>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
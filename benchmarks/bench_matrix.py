@@ -0,0 +1,71 @@
+"""Memory per million rows of the encoded 2021 features in each layout.
+
+Encodes synthetic 2021 rows with ``BRFSSEncoder`` (int64/float64 pandas
+columns, the notebook's original frame), then measures the bytes actually
+held by that frame, by the int8/float32 frame a ``ColumnStore`` returns, by
+a dense float32 matrix and by a ``FeatureMatrix``, scaled to one million
+rows. The last columns time gathering one CV training fold (80% of the
+rows) as the dense float32 matrix an estimator receives.
+
+Usage::
+
+    python benchmarks/bench_matrix.py --rows 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cvd.encoding import BRFSSEncoder  # noqa: E402
+from cvd.matrix import FeatureMatrix  # noqa: E402
+from cvd.synthetic import make_frame  # noqa: E402
+from cvd.train import DROPPED_COLUMNS, TARGET  # noqa: E402
+
+
+def gather(X, rows):
+    start = time.perf_counter()
+    if isinstance(X, FeatureMatrix):
+        np.asarray(X.take(rows))
+    elif hasattr(X, "iloc"):
+        X.iloc[rows].to_numpy(np.float32)
+    else:
+        X[rows]
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    frame = BRFSSEncoder().fit_transform(make_frame("2021", args.rows))
+    features = frame.drop(columns=[TARGET, *DROPPED_COLUMNS])
+    del frame
+    compact_frame = features.apply(
+        lambda column: column.astype(np.int8 if column.dtype.kind == "i" else np.float32))
+    layouts = {
+        "pandas int64/float64": features,
+        "pandas int8/float32": compact_frame,
+        "dense float32": compact_frame.to_numpy(np.float32),
+        "FeatureMatrix": FeatureMatrix.from_frame(compact_frame),
+    }
+    rows = np.sort(np.random.default_rng(args.seed).permutation(args.rows)[:args.rows * 4 // 5])
+    scale = 1e6 / args.rows / 2**20
+    print(f"{'layout':<22}{'MB / 1M rows':>14}{'bytes / row':>13}{'fold gather s':>15}")
+    for name, X in layouts.items():
+        nbytes = X.memory_usage(index=False).sum() if hasattr(X, "memory_usage") else X.nbytes
+        print(f"{name:<22}{nbytes * scale:>14.1f}{nbytes / args.rows:>13.1f}"
+              f"{gather(X, rows):>15.3f}")
+    print(f"\n{layouts['FeatureMatrix']!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Scoring with and without the exact-match ``PredictionCache``.
+
+On synthetic encoded 2021 rows this fits a KNN and a logistic regression
+(the most and least expensive predictors of ``python -m cvd train``) and
+scores a stream of batches in which a ``--repeat`` fraction of the rows are
+records already seen in earlier batches (resubmitted files, retries), with
+``--dup`` extra copies inside each batch. Each model scores the stream
+directly and through a ``PredictionCache`` of ``--cache-size`` rows; the
+table reports seconds, the cache's deduplication and LRU hit rates, and the
+largest score difference (zero up to floating-point batch effects). The
+logistic model costs microseconds per row, less than the hashing; the
+cache pays off for the predictors that cost more than that.
+
+Usage::
+
+    python benchmarks/bench_memo.py --rows 50000 --batches 20 --batch-size 5000 --repeat 0 0.5 0.9
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cvd.encoding import BRFSSEncoder  # noqa: E402
+from cvd.memo import PredictionCache  # noqa: E402
+from cvd.synthetic import make_frame  # noqa: E402
+from cvd.train import DROPPED_COLUMNS, TARGET  # noqa: E402
+
+
+def encoded_rows(n_rows, seed):
+    frame = BRFSSEncoder().fit_transform(make_frame("2021", n_rows, random_state=seed))
+    y = frame.pop(TARGET).to_numpy()
+    X = frame.drop(columns=DROPPED_COLUMNS).to_numpy(dtype=np.float64)
+    return np.nan_to_num(X), y
+
+
+def stream(X, n_batches, batch_size, repeat, dup, rng):
+    """Batches of rows of ``X``; ``repeat`` of each batch was sent before."""
+    fresh = iter(rng.permutation(len(X)))
+    seen = []
+    for _ in range(n_batches):
+        n_repeat = int(repeat * batch_size) if seen else 0
+        n_fresh = batch_size - n_repeat - int(dup * batch_size)
+        rows = [next(fresh) for _ in range(n_fresh)]
+        rows += list(rng.choice(seen, n_repeat)) if n_repeat else []
+        rows += list(rng.choice(rows, batch_size - len(rows)))
+        seen.extend(rows[:n_fresh])
+        yield X[rng.permutation(rows)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    parser.add_argument("--repeat", type=float, nargs="+", default=[0.0, 0.5, 0.9])
+    parser.add_argument("--dup", type=float, default=0.0)
+    parser.add_argument("--cache-size", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    X_train, y_train = encoded_rows(args.rows, args.seed)
+    X_score, _ = encoded_rows(args.batches * args.batch_size, args.seed + 1)
+    models = {
+        "knn": make_pipeline(StandardScaler(), KNeighborsClassifier(15)),
+        "logistic": make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000)),
+    }
+    for model in models.values():
+        model.fit(X_train, y_train)
+
+    print(f"{'model':<10}{'repeat':>8}{'direct s':>10}{'cached s':>10}{'dedup':>8}"
+          f"{'LRU hits':>10}{'not scored':>12}{'max diff':>10}")
+    for name, model in models.items():
+        def predict(X):
+            return model.predict_proba(X)[:, 1]
+
+        for repeat in args.repeat:
+            batches = list(stream(X_score, args.batches, args.batch_size, repeat, args.dup,
+                                  np.random.default_rng(args.seed)))
+            start = time.perf_counter()
+            direct = [predict(batch) for batch in batches]
+            direct_seconds = time.perf_counter() - start
+
+            cache = PredictionCache(predict, max_entries=args.cache_size)
+            start = time.perf_counter()
+            cached = [cache.predict(batch) for batch in batches]
+            cached_seconds = time.perf_counter() - start
+            stats = cache.stats()
+            diff = max(np.abs(a - b).max() for a, b in zip(direct, cached))
+            print(f"{name:<10}{repeat:>8.0%}{direct_seconds:>10.3f}{cached_seconds:>10.3f}"
+                  f"{stats['dedup_rate']:>8.1%}{stats['lru_hit_rate']:>10.1%}"
+                  f"{stats['hit_rate']:>12.1%}{diff:>10.1e}")
+
+
+if __name__ == "__main__":
+    main()
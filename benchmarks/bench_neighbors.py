@@ -0,0 +1,89 @@
+"""Latency vs. accuracy/recall of the KNN neighbour-index backends.
+
+Encodes ``CVD_cleaned.csv`` and splits it exactly like the notebook, fits the
+current brute-force ``KNeighborsClassifier`` as the reference, then reports
+build time, query latency, test accuracy, agreement with the reference
+predictions and neighbour recall@k for every backend. Most features are
+small integer codes, so many neighbours are tied on distance; exact backends
+may break those ties differently, which shows up as recall slightly below 1.
+
+Usage::
+
+    python benchmarks/bench_neighbors.py --csv CVD_cleaned.csv --recall 0.9 0.99
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cvd.encoding import BRFSSEncoder  # noqa: E402
+from cvd.neighbors import IndexedKNeighborsClassifier, recall_at_k  # noqa: E402
+
+
+def load_split(csv, rows=None, seed=42):
+    frame = BRFSSEncoder().fit_transform(pd.read_csv(csv))
+    frame = frame.drop(columns=["Height_(cm)", "Weight_(kg)"])
+    if rows is not None and rows < len(frame):
+        frame = frame.sample(n=rows, random_state=seed)
+    features = frame.drop(columns=["Heart_Disease"]).to_numpy(dtype=np.float64)
+    target = frame["Heart_Disease"].to_numpy()
+    return train_test_split(features, target, test_size=0.2, random_state=seed)
+
+
+def run(model, X_train, y_train, X_test, k):
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    _, neighbors = model.kneighbors(X_test, k)
+    predictions = model.predict(X_test)
+    latency = time.perf_counter() - start
+    return build, latency, neighbors, predictions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", default="CVD_cleaned.csv")
+    parser.add_argument("--rows", type=int, help="subsample the frame first")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--recall", type=float, nargs="*", default=[0.9, 0.95, 0.99],
+                        help="recall targets for the approximate index")
+    args = parser.parse_args(argv)
+
+    X_train, X_test, y_train, y_test = load_split(args.csv, args.rows)
+    print(f"reference rows: {len(X_train):,}  queries: {len(X_test):,}  k={args.k}")
+
+    reference = KNeighborsClassifier(n_neighbors=args.k, algorithm="brute")
+    build, latency, exact, expected = run(reference, X_train, y_train, X_test, args.k)
+
+    header = f"{'backend':<16}{'build s':>9}{'query s':>9}{'us/row':>9}" \
+             f"{'accuracy':>10}{'agree':>8}{'recall':>8}"
+    print(header)
+    print("-" * len(header))
+
+    def report(name, build, latency, neighbors, predictions):
+        print(f"{name:<16}{build:>9.2f}{latency:>9.2f}{1e6 * latency / len(X_test):>9.1f}"
+              f"{(predictions == y_test).mean():>10.4f}{(predictions == expected).mean():>8.4f}"
+              f"{recall_at_k(exact, neighbors):>8.4f}")
+
+    report("sklearn brute", build, latency, exact, expected)
+    backends = [(kind, {"index": kind}) for kind in ("kd_tree", "ball_tree")]
+    backends += [(f"ivf@{target:g}", {"index": "ivf", "recall_target": target})
+                 for target in args.recall]
+    for name, params in backends:
+        model = IndexedKNeighborsClassifier(n_neighbors=args.k, **params)
+        report(name, *run(model, X_train, y_train, X_test, args.k))
+
+
+if __name__ == "__main__":
+    main()
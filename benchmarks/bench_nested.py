@@ -0,0 +1,90 @@
+"""Nested CV: one SearchEngine per outer fold vs ``NestedCV``.
+
+On synthetic encoded 2021 rows this times the naive nested CV - outer folds
+one after the other, each running a ``SearchEngine`` with ``n_outer - 1``
+inner folds on its training rows and scoring the refitted best estimator on
+its test block - against ``NestedCV``, whose outer folds share the fits of
+overlapping inner folds and run in one pool. It reports wall-clock and CPU
+seconds (this process plus workers) and the mean outer accuracy of each
+family; the two estimates differ only through the different inner folds.
+
+Usage::
+
+    python benchmarks/bench_nested.py --rows 20000 --outer 5 --families lr pca lr_smote
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+from sklearn.model_selection import StratifiedKFold
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cvd.encoding import BRFSSEncoder  # noqa: E402
+from cvd.nested import NestedCV  # noqa: E402
+from cvd.search import SearchEngine  # noqa: E402
+from cvd.synthetic import make_frame  # noqa: E402
+from cvd.train import DROPPED_COLUMNS, HALVING, TARGET, model_families  # noqa: E402
+
+
+def cpu_seconds():
+    # this process and its (finished or idle) children, i.e. the workers
+    usage = [resource.getrusage(who) for who in (resource.RUSAGE_SELF,
+                                                 resource.RUSAGE_CHILDREN)]
+    return sum(u.ru_utime + u.ru_stime for u in usage)
+
+
+def naive(X, y, families, args):
+    scores = {name: [] for name in families}
+    splitter = StratifiedKFold(args.outer, shuffle=True, random_state=args.seed)
+    for train, test in splitter.split(X, y):
+        engine = SearchEngine(cv=args.outer - 1, n_jobs=args.n_jobs)
+        for name, (estimator, grid) in families.items():
+            engine.add(name, estimator, grid, halving=HALVING.get(name))
+        results = engine.fit(X[train], y[train])
+        engine.folds_.close()
+        for name, result in results.items():
+            scores[name].append(result.score(X[test], y[test]))
+    return {name: float(np.mean(values)) for name, values in scores.items()}
+
+
+def nested(X, y, families, args):
+    engine = NestedCV(n_outer=args.outer, n_jobs=args.n_jobs, random_state=args.seed)
+    for name, (estimator, grid) in families.items():
+        engine.add(name, estimator, grid, halving=HALVING.get(name))
+    results = engine.fit(X, y)
+    return {name: result.score_ for name, result in results.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--outer", type=int, default=5)
+    parser.add_argument("--families", nargs="+", default=["lr", "pca", "lr_smote"])
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    frame = BRFSSEncoder().fit_transform(make_frame("2021", args.rows, random_state=args.seed))
+    y = frame.pop(TARGET).to_numpy()
+    X = frame.drop(columns=DROPPED_COLUMNS).to_numpy(dtype=np.float64)
+    families = {name: spec for name, spec in model_families(args.seed).items()
+                if name in args.families}
+
+    print(f"{'method':<12}{'wall s':>9}{'CPU s':>9}  mean outer accuracy")
+    for label, run in (("naive", naive), ("NestedCV", nested)):
+        start, start_cpu = time.perf_counter(), cpu_seconds()
+        scores = run(X, y, families, args)
+        wall, cpu = time.perf_counter() - start, cpu_seconds() - start_cpu
+        accuracy = "  ".join(f"{name} {score:.4f}" for name, score in scores.items())
+        print(f"{label:<12}{wall:>9.2f}{cpu:>9.2f}  {accuracy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare ``StreamingPCA`` with ``sklearn.decomposition.PCA`` on survey rows.
+
+Scales synthetic 2021 rows (encoded like the notebook) and fits
+``PCA(n_components=0.80)`` with the full-SVD solver and sklearn's default
+solver against ``StreamingPCA`` with the chunked covariance and randomized
+solvers. For each it reports fit time, the peak memory allocated during the
+fit (``tracemalloc``; numpy registers its buffers there), the number of
+components chosen for the variance target and the largest difference from
+the full-SVD components. A last line counts the PCA fits the notebook's PCA
+grid needs under ``GridSearchCV`` and under ``SearchEngine``, which fits the
+untuned PCA prefix once per fold.
+
+Usage::
+
+    python benchmarks/bench_pca.py --rows 1000000 2000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from sklearn.decomposition import PCA
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cvd.decomposition import StreamingPCA  # noqa: E402
+from cvd.encoding import BRFSSEncoder  # noqa: E402
+from cvd.synthetic import make_frame  # noqa: E402
+from cvd.train import LOGISTIC_GRID  # noqa: E402
+
+
+def measure(estimator, X):
+    tracemalloc.start()
+    start = time.perf_counter()
+    estimator.fit(X)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[250_000, 1_000_000])
+    parser.add_argument("--target", type=float, default=0.80)
+    parser.add_argument("--cv", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    candidates = {
+        "PCA full": lambda: PCA(args.target, svd_solver="full"),
+        "PCA auto": lambda: PCA(args.target),
+        "Streaming covariance": lambda: StreamingPCA(args.target, solver="covariance"),
+        "Streaming randomized": lambda: StreamingPCA(args.target, solver="randomized",
+                                                     random_state=0),
+    }
+    print(f"{'rows':>10}  {'estimator':<22}{'fit s':>8}{'peak MB':>9}{'k':>4}"
+          f"{'max |diff|':>12}")
+    for n_rows in args.rows:
+        frame = BRFSSEncoder().fit_transform(make_frame("2021", n_rows))
+        X = frame.drop(columns=["Heart_Disease", "Height_(cm)", "Weight_(kg)"]).to_numpy(float)
+        X = StandardScaler().fit_transform(X)
+        del frame
+        reference = None
+        for name, make in candidates.items():
+            estimator = make()
+            seconds, peak = measure(estimator, X)
+            if reference is None:
+                reference = estimator.components_
+            k = min(len(reference), len(estimator.components_))
+            diff = np.abs(reference[:k] - estimator.components_[:k]).max()
+            print(f"{n_rows:>10,}  {name:<22}{seconds:>8.3f}{peak / 2**20:>9.1f}"
+                  f"{estimator.n_components_:>4}{diff:>12.2e}")
+
+    n_candidates = int(np.prod([len(values) for values in LOGISTIC_GRID.values()]))
+    print(f"\nPCA fits per grid search: GridSearchCV {n_candidates * args.cv} "
+          f"(+1 refit), SearchEngine {args.cv} (+1 refit)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""End-to-end pipeline benchmark on synthetic BRFSS-shaped data.
+
+For each requested size, generates rows with ``cvd.synthetic`` (no Drive
+mount or Kaggle download needed) and times, as ``cvd.profiling`` stages:
+
+* ``ingest`` - CSV -> column store (only with ``--via-csv``),
+* ``encode`` - ``BRFSSEncoder`` on the raw 2021 frame / int8 cast for 2015,
+* ``split`` - ``train_test_split(test_size=0.2)``,
+* ``search/<family>`` - the notebook's grid for each family (or successive
+  halving with ``--halving``), with every CV fit recorded as a ``cv_fit``
+  event,
+* ``predict/<family>`` and ``report/<family>`` - test-set probabilities,
+  then the confusion matrix, classification report and ROC/PR summary from
+  one ``ThresholdSweep``.
+
+Searches and predictions run on stratified subsamples of at most
+``--search-rows`` / ``--predict-rows`` rows, so large sizes measure the data
+stages without waiting hours for KNN. Results are written as a
+``cvd.profiling`` trace, so two commits compare with::
+
+    python -m cvd.profiling compare results/old.json results/new.json
+
+Usage::
+
+    python benchmarks/bench_pipeline.py --sizes 100000 1000000 --positive-rate 0.08 \\
+        --families lr pca rf knn lr_smote --output bench_results.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cvd.encoding import DERIVED_COLUMNS, BRFSSEncoder  # noqa: E402
+from cvd.evaluation import ThresholdSweep  # noqa: E402
+from cvd.ingest import BRFSS_2015_SCHEMA, BRFSS_2021_SCHEMA, ingest_csv  # noqa: E402
+from cvd.profiling import Profiler  # noqa: E402
+from cvd.search import FoldCache, SearchEngine  # noqa: E402
+from cvd.synthetic import make_frame, write_csv  # noqa: E402
+from cvd.train import model_families  # noqa: E402
+
+TARGETS = {"2021": "Heart_Disease", "2015": "HeartDiseaseorAttack"}
+
+
+def subsample(X, y, n_rows, seed):
+    if len(y) <= n_rows:
+        return X, y
+    X, _, y, _ = train_test_split(X, y, train_size=n_rows, stratify=y, random_state=seed)
+    return X, y
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_size(profiler, args, n_rows, families, workdir):
+    schema = BRFSS_2021_SCHEMA if args.schema == "2021" else BRFSS_2015_SCHEMA
+    target = TARGETS[args.schema]
+    options = {"as_category": True} if args.schema == "2021" and args.categorical else {}
+
+    with profiler.stage("generate"):
+        if args.via_csv:
+            csv_path = os.path.join(workdir, f"synthetic_{args.schema}_{n_rows}.csv")
+            write_csv(csv_path, args.schema, n_rows, positive_rate=args.positive_rate,
+                      random_state=args.seed)
+        else:
+            raw = make_frame(args.schema, n_rows, positive_rate=args.positive_rate,
+                             random_state=args.seed, **options)
+    if args.via_csv:
+        with profiler.stage("ingest"):
+            store = ingest_csv(csv_path, os.path.join(workdir, f"store_{n_rows}"), schema,
+                               DERIVED_COLUMNS if args.schema == "2021" else None)
+            raw = store.frame(list(schema), decode=True)
+
+    with profiler.stage("encode"):
+        if args.schema == "2021":
+            frame = BRFSSEncoder().fit_transform(raw).drop(columns=["Height_(cm)",
+                                                                   "Weight_(kg)"])
+        else:
+            frame = raw.astype(np.int8)
+    del raw
+    features = frame.drop(columns=[target]).to_numpy(dtype=np.float64)
+    labels = frame[target].to_numpy()
+    del frame
+
+    with profiler.stage("split"):
+        X_train, X_test, y_train, y_test = train_test_split(
+            features, labels, test_size=0.2, random_state=args.seed)
+    X_search, y_search = subsample(X_train, y_train, args.search_rows, args.seed)
+    X_eval, y_eval = subsample(X_test, y_test, args.predict_rows, args.seed)
+
+    folds = FoldCache(X_search, y_search, cv=args.cv)
+    halving_reports = {}
+    for name in families:
+        estimator, grid = model_families(args.seed)[name]
+        engine = SearchEngine(cv=args.cv, n_jobs=args.n_jobs, profiler=profiler)
+        with profiler.stage(f"search/{name}"):
+            engine.add(name, estimator, grid, halving=args.halving.get(name))
+            result = engine.fit(X_search, y_search, folds=folds)[name]
+        if result.halving_ is not None:
+            halving_reports[name] = result.halving_
+        with profiler.stage(f"predict/{name}"):
+            scores = result.predict_proba(X_eval)[:, 1]
+        with profiler.stage(f"report/{name}"):
+            sweep = ThresholdSweep(y_eval, scores)
+            sweep.confusion_matrix()
+            sweep.classification_report()
+            sweep.roc_auc(), sweep.average_precision()
+    return halving_reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--schema", choices=["2021", "2015"], default="2021")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--positive-rate", type=float, default=0.081)
+    parser.add_argument("--families", nargs="+", default=["lr", "pca", "rf", "knn"],
+                        choices=list(model_families()))
+    parser.add_argument("--search-rows", type=int, default=200_000)
+    parser.add_argument("--predict-rows", type=int, default=1_000_000)
+    parser.add_argument("--cv", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--via-csv", action="store_true",
+                        help="write a CSV and time the ingest into a column store")
+    parser.add_argument("--categorical", action="store_true",
+                        help="generate category-dtype columns (less memory at large sizes)")
+    parser.add_argument("--halving", nargs="*", default=[], metavar="FAMILY=RESOURCE",
+                        help="search these families by successive halving, "
+                             "e.g. rf=n_estimators lr=n_samples")
+    parser.add_argument("--output", default="bench_pipeline.json")
+    args = parser.parse_args(argv)
+    args.halving = dict(item.split("=", 1) for item in args.halving)
+
+    profiler = Profiler()
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    halving_reports = {}
+    try:
+        for n_rows in args.sizes:
+            with profiler.stage(f"rows={n_rows}"):
+                halving_reports[n_rows] = run_size(profiler, args, n_rows, args.families,
+                                                   workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    profiler.report()
+    profiler.write_trace(
+        args.output, commit=git_commit(), schema=args.schema, sizes=args.sizes,
+        positive_rate=args.positive_rate, families=args.families,
+        search_rows=args.search_rows, halving=args.halving,
+        halving_reports=halving_reports, predict_rows=args.predict_rows, cv=args.cv,
+        python=platform.python_version(), machine=platform.machine(),
+        cpu_count=os.cpu_count(),
+    )
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Cost of preparing the Part 3 figures from rows vs from summaries.
+
+For synthetic encoded 2021 rows this times what the row-based plots compute
+internally - exact per-group quartiles (``groupby().quantile``, the core of
+``sns.boxplot``) and ``frame[frame.Diet > 0].sample(n)`` for the scatter
+plot - against ``QuantileSketch`` passes and ``stratified_sample``. It
+reports the largest relative quartile error of the sketch, the size of what
+is handed to the plotting backend, and how many age bands of the scatter
+sample contain a heart-disease case.
+
+Usage::
+
+    python benchmarks/bench_plots.py --rows 300000 3000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cvd.encoding import BRFSSEncoder  # noqa: E402
+from cvd.schema import ENCODING_TABLE  # noqa: E402
+from cvd.sketch import QuantileSketch, stratified_sample  # noqa: E402
+from cvd.synthetic import make_frame  # noqa: E402
+
+BOXES = [("Weight_(kg)", "Age_Category"), ("BMI", "Exercise")]
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[300_000, 3_000_000])
+    parser.add_argument("--sample", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    quartiles = [0.25, 0.5, 0.75]
+    print(f"{'rows':>10}  {'figure':<28}{'rows s':>9}{'summary s':>11}{'summary':>14}"
+          f"{'error':>9}")
+    for n_rows in args.rows:
+        frame = BRFSSEncoder().fit_transform(make_frame("2021", n_rows))
+        for value, by in BOXES:
+            seconds, exact = timed(
+                lambda: frame.groupby(by)[value].quantile(quartiles).unstack().to_numpy())
+            sketch_seconds, sketch = timed(lambda: QuantileSketch.from_columns(
+                frame[value], frame[by], n_groups=len(ENCODING_TABLE[by])))
+            error = np.nanmax(np.abs(sketch.quantiles(quartiles) / exact - 1))
+            buckets = sketch.positive.counts.size + sketch.negative.counts.size
+            print(f"{n_rows:>10,}  {f'{value} by {by}':<28}{seconds:>9.3f}"
+                  f"{sketch_seconds:>11.3f}{f'{buckets} buckets':>14}{error:>9.4f}")
+
+        seed = 42
+        seconds, sampled = timed(lambda: frame[frame["Diet"] > 0].sample(args.sample,
+                                                                          random_state=seed))
+        sample_seconds, rows = timed(lambda: stratified_sample(
+            [frame["Heart_Disease"], frame["Age_Category"]], args.sample,
+            mask=frame["Diet"] > 0, random_state=seed))
+        stratified = frame.iloc[rows]
+        covered = [sample.groupby("Age_Category")["Heart_Disease"].max().sum()
+                   for sample in (sampled, stratified)]
+        print(f"{n_rows:>10,}  {'scatter sample':<28}{seconds:>9.3f}{sample_seconds:>11.3f}"
+              f"{f'{len(rows)} rows':>14}{'':>9}  age bands with cases: "
+              f"{covered[0]} -> {covered[1]} of {len(ENCODING_TABLE['Age_Category'])}")
+        del frame
+
+
+if __name__ == "__main__":
+    main()
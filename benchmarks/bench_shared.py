@@ -0,0 +1,108 @@
+"""Peak memory of the CV workers with and without the shared-memory handoff.
+
+Runs the notebook's baseline logistic-regression search on synthetic 2021
+rows with ``SearchEngine(shared=True)`` and ``shared=False`` for several
+worker counts, sampling the summed proportional set size (PSS, which splits
+shared pages between the processes mapping them) of this process and its
+workers, and the space used in ``/dev/shm`` (published arrays that are not
+mapped at the moment are not part of any PSS). With sharing, the data part
+of the peak should stay roughly flat as workers are added; what still grows
+is each worker's interpreter and the rows it gathers for its current fit.
+Needs ``psutil`` and Linux.
+
+Usage::
+
+    python benchmarks/bench_shared.py --rows 1000000 --workers 1 2 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import sys
+import threading
+import time
+
+from joblib.externals.loky import get_reusable_executor
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cvd.encoding import BRFSSEncoder  # noqa: E402
+from cvd.profiling import Profiler  # noqa: E402
+from cvd.search import SearchEngine  # noqa: E402
+from cvd.synthetic import make_frame  # noqa: E402
+
+
+def total_pss():
+    import psutil
+
+    processes = [psutil.Process()]
+    processes += processes[0].children(recursive=True)
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_full_info().pss
+        except psutil.Error:
+            pass
+    return total
+
+
+def shm_used():
+    return shutil.disk_usage("/dev/shm").used if os.path.isdir("/dev/shm") else 0
+
+
+def peak_memory(function, interval=0.05):
+    """Peak ``(pss, shm)`` bytes while ``function`` runs, and its wall time."""
+    peak, done = [total_pss(), shm_used()], threading.Event()
+
+    def sample():
+        while not done.wait(interval):
+            peak[0] = max(peak[0], total_pss())
+            peak[1] = max(peak[1], shm_used())
+
+    thread = threading.Thread(target=sample, daemon=True)
+    thread.start()
+    start = time.perf_counter()
+    try:
+        function()
+    finally:
+        done.set()
+        thread.join()
+    return peak[0], peak[1], time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args(argv)
+
+    frame = BRFSSEncoder().fit_transform(make_frame("2021", args.rows))
+    X = frame.drop(columns=["Heart_Disease", "Height_(cm)", "Weight_(kg)"]).to_numpy()
+    y = frame["Heart_Disease"].to_numpy()
+    del frame
+    pipeline = Pipeline([("scaler", StandardScaler()),
+                         ("logistic_regression", LogisticRegression(max_iter=1000))])
+    grid = {"logistic_regression__C": [0.1, 1]}
+    print(f"X: {X.shape[0]:,} x {X.shape[1]} ({X.nbytes / 2**20:.0f} MB)")
+    print(f"{'workers':>8}{'shared':>8}{'peak PSS MB':>14}{'shm MB':>9}{'wall s':>9}")
+
+    for n_jobs in args.workers:
+        for shared in (False, True):
+            # fresh workers, so memory held from the previous run is not counted
+            get_reusable_executor().shutdown(wait=True)
+            engine = SearchEngine(n_jobs=n_jobs, refit=False, shared=shared,
+                                  profiler=Profiler(enabled=False))
+            engine.add("lr", pipeline, grid)
+            pss, shm, wall = peak_memory(lambda: engine.fit(X, y))
+            engine.folds_.close()
+            print(f"{n_jobs:>8}{str(shared):>8}{pss / 2**20:>14.0f}{shm / 2**20:>9.0f}"
+                  f"{wall:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
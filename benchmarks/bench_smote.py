@@ -0,0 +1,83 @@
+"""Per-fold SMOTE: imblearn vs ``FastSMOTE`` with a shared neighbour table.
+
+On synthetic encoded 2021 rows (a compact ``FeatureMatrix``, as in
+``python -m cvd train``) this resamples the training rows of every CV fold
+with ``SMOTE(random_state=...)``, with ``FastSMOTE`` searching neighbours per
+fold, and with ``FastSMOTE`` reading them off one ``MinorityNeighbors``
+table (built once, its time reported separately) and returning a
+``ResampledView``. It reports seconds for all folds, the bytes each method
+allocates for its output, and the share of synthetic rows identical to
+imblearn's. Most features are small integer codes, so many neighbours are
+tied on distance; the table breaks some of those ties differently.
+
+Usage::
+
+    python benchmarks/bench_smote.py --rows 100000 1000000 --folds 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from imblearn.over_sampling import SMOTE
+from sklearn.model_selection import StratifiedKFold
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cvd.encoding import BRFSSEncoder  # noqa: E402
+from cvd.matrix import FeatureMatrix  # noqa: E402
+from cvd.oversampling import FastSMOTE, MinorityNeighbors  # noqa: E402
+from cvd.synthetic import make_frame  # noqa: E402
+from cvd.train import DROPPED_COLUMNS, TARGET  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>10}  {'method':<22}{'seconds':>9}{'output MB':>11}{'same rows':>11}")
+    for n_rows in args.rows:
+        frame = BRFSSEncoder().fit_transform(make_frame("2021", n_rows, random_state=args.seed))
+        y = frame.pop(TARGET).to_numpy()
+        X = FeatureMatrix.from_frame(frame.drop(columns=DROPPED_COLUMNS))
+        del frame
+        folds = [train for train, _ in StratifiedKFold(args.folds, shuffle=True,
+                                                       random_state=args.seed).split(X, y)]
+        start = time.perf_counter()
+        neighbors = MinorityNeighbors(k_neighbors=5).fit(X, y)
+        print(f"{n_rows:>10,}  {'MinorityNeighbors.fit':<22}{time.perf_counter() - start:>9.3f}")
+
+        samplers = {
+            "imblearn SMOTE": SMOTE(random_state=args.seed),
+            "FastSMOTE": FastSMOTE(random_state=args.seed),
+            "FastSMOTE + table": FastSMOTE(random_state=args.seed, neighbors=neighbors,
+                                           virtual=True),
+        }
+        reference = []
+        for label, sampler in samplers.items():
+            seconds, nbytes, same = 0.0, 0, []
+            for fold, train in enumerate(folds):
+                X_fold, y_fold = X.take(train), y[train]
+                start = time.perf_counter()
+                X_resampled, _ = sampler.fit_resample(X_fold, y_fold)
+                seconds += time.perf_counter() - start
+                # a ResampledView allocates only its synthetic rows
+                nbytes += getattr(X_resampled, "synthetic", X_resampled).nbytes
+                synthetic = np.asarray(X_resampled)[len(train):]
+                if label == "imblearn SMOTE":
+                    reference.append(synthetic)
+                same.append(np.all(synthetic == reference[fold], axis=1).mean())
+            print(f"{n_rows:>10,}  {label:<22}{seconds:>9.3f}{nbytes / 2**20:>11.1f}"
+                  f"{np.mean(same):>11.1%}")
+        del X, reference
+
+
+if __name__ == "__main__":
+    main()
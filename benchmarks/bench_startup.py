@@ -0,0 +1,82 @@
+"""Interpreter startup cost of each entry point, checked against a budget.
+
+Every command is imported (not run) in a fresh interpreter several times;
+the best wall time and the heavy top-level packages it pulled in are
+reported. ``score`` must stay under ``--budget`` seconds and must not load
+pandas, sklearn, scipy, joblib or a plotting library; the script exits with
+status 1 otherwise, so it can run in CI. ``baseline`` is the bare
+interpreter plus numpy, the floor for any numpy-based scorer.
+
+Usage::
+
+    python benchmarks/bench_startup.py --repeat 5 --budget 0.25
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from cvd.__main__ import COMMANDS  # noqa: E402
+
+HEAVY = ["pandas", "sklearn", "scipy", "joblib", "imblearn", "matplotlib", "seaborn", "plotly"]
+# default budget for the scoring path, seconds (numpy alone is ~0.06 s)
+SCORE_BUDGET = 0.25
+
+PROBE = """
+import importlib, json, sys
+for module in sys.argv[1:]:
+    importlib.import_module(module)
+print(json.dumps(sorted({name.split('.')[0] for name in sys.modules})))
+"""
+
+
+def startup(modules, repeat):
+    """Best wall time of importing ``modules`` and the packages loaded."""
+    best, loaded = float("inf"), []
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", PROBE, *modules], env=env,
+                                capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if output.returncode:
+            return None, output.stderr.strip().splitlines()[-1]
+        best = min(best, elapsed)
+        loaded = json.loads(output.stdout)
+    return best, [name for name in HEAVY if name in loaded]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=SCORE_BUDGET,
+                        help="seconds allowed for the score entry point")
+    args = parser.parse_args(argv)
+
+    targets = {"baseline": ["numpy"]}
+    targets.update({name: ["cvd.__main__", module] for name, (module, _, _) in COMMANDS.items()})
+    print(f"{'command':<10}{'startup s':>11}  heavy packages loaded")
+    failed = False
+    for name, modules in targets.items():
+        seconds, heavy = startup(modules, args.repeat)
+        if seconds is None:
+            print(f"{name:<10}{'-':>11}  import failed: {heavy}")
+            continue
+        print(f"{name:<10}{seconds:>11.3f}  {', '.join(heavy) or '-'}")
+        if name == "score" and (seconds > args.budget or heavy):
+            failed = True
+    print(f"\nscore budget: {args.budget:.3f} s, no heavy packages -> "
+          f"{'FAILED' if failed else 'ok'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -22,16 +22,14 @@ The results are below, along with various takeaways, methodologies used to gathe
 
 # imports necessary for project
 !pip install kaggle
-!pip install pandasql
-!pip install sqlalchemy==1.4.46
 !pip install imbalanced-learn
 !pip install plotly
 
 import pandas as pd
-import pandasql as psql
 import plotly.express as px
 import numpy as np
 import os
+import gc
 import matplotlib.pyplot as plt
 import seaborn as sns
 from google.colab import drive
@@ -42,15 +40,26 @@ from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import Pipeline
 from imblearn.pipeline import Pipeline as ImbPipeline
-from imblearn.over_sampling import SMOTE
-from sklearn.model_selection import GridSearchCV
-from sklearn.metrics import confusion_matrix
-from sklearn.decomposition import PCA
+from cvd.oversampling import FastSMOTE, MinorityNeighbors
+from cvd.decomposition import StreamingPCA
 from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.neighbors import KNeighborsClassifier
 from sklearn.metrics import make_scorer, recall_score
-from sklearn.metrics import classification_report
+from cvd.encoding import DERIVED_COLUMNS, ENCODING_TABLE
+from cvd.ingest import BRFSS_2015_SCHEMA, BRFSS_2021_SCHEMA, ENCODED_2021_COLUMNS, load_or_ingest
+from cvd.search import SearchEngine
+from cvd.neighbors import IndexedKNeighborsClassifier
+from cvd.serve import save_model
+from cvd.runtime import export_model
+from cvd.aggregate import category_counts, group_rates, to_crosstab
+from cvd.profiling import PROFILER, stage
+from cvd.stats import ColumnStats
+from cvd.evaluation import ThresholdSweep, compare_models
+from cvd.cache import ArtifactCache
+from cvd.sketch import QuantileSketch
+from cvd.plots import bmi_histogram, box_by, count_facets, general_health_counts, scatter_sample
+from cvd.matrix import FeatureMatrix
+from cvd.featurestore import FeatureStore
 
 """## Loading & Analyzing Data
 
@@ -73,10 +82,36 @@ drive.mount('/content/drive')
 !unzip /content/cardiovascular-diseases-risk-prediction-dataset.zip
 !unzip /content/heart-disease-health-indicators-dataset.zip
 
-# Read the csv files and save them to dataframes called "BRFSS_2021" and "BRFSS_2015"
-BRFSS_2021 = pd.read_csv('CVD_cleaned.csv')
-BRFSS_2015 = pd.read_csv('heart_disease_health_indicators_BRFSS2015.csv')
-original = BRFSS_2021.copy()
+# Stream the csv files into compact, memory-mapped column stores (categoricals
+# are stored as int8 codes, numbers as float32/int8; the csvs are only parsed
+# again when they change) and load them as "BRFSS_2021" and "BRFSS_2015"
+# Every stage below (load, encode, split, search, predict, report) and every
+# CV fit is timed into PROFILER; the trace is written at the end of Part 4
+PROFILER.begin('load')
+store_2021 = load_or_ingest('CVD_cleaned.csv', 'brfss_2021_store', BRFSS_2021_SCHEMA, DERIVED_COLUMNS)
+store_2015 = load_or_ingest('heart_disease_health_indicators_BRFSS2015.csv', 'brfss_2015_store', BRFSS_2015_SCHEMA)
+BRFSS_2021 = store_2021.frame(list(BRFSS_2021_SCHEMA), decode=True)
+BRFSS_2015 = store_2015.frame()
+PROFILER.end('load')
+
+# Column statistics (counts, moments, cross-products, nulls, distinct values)
+# computed in one chunked pass over each store and cached next to it; the
+# describe/null/unique/correlation reports below are derived from them
+with stage('stats'):
+    stats_2021 = ColumnStats.for_store(store_2021)
+    stats_2015 = ColumnStats.for_store(store_2015)
+
+# Both survey years mapped onto one harmonized, year-partitioned schema: the
+# 2015 indicators (GenHlth, Age, HeartDiseaseorAttack, PhysActivity, ...) are
+# recoded to the 2021 codes, and questions a year did not ask are stored as
+# missing. A partition is only rebuilt when its source store changes, and
+# reads push the years, columns and filters down to the partitions
+with stage('feature_store'):
+    feature_store = FeatureStore('brfss_features')
+    feature_store.add_partition('2015', store_2015)
+    feature_store.add_partition('2021', store_2021)
+print(feature_store.partition_stats().pivot_table(index='column', columns='year', values='nulls', sort=False))
+print('columns available in every year:', feature_store.available_columns())
 
 """#Part 3: Exploratory Data Analysis and Visualization"""
 
@@ -90,282 +125,123 @@ BRFSS_2021.dtypes
 
 BRFSS_2021.info()
 
-BRFSS_2021.describe()
+stats_2021.describe(BRFSS_2021.select_dtypes('number').columns)
 
 BRFSS_2015.dtypes
 
 BRFSS_2015.info()
 
-BRFSS_2015.describe()
+stats_2015.describe()
 
 #check for null values
-nulls = BRFSS_2021.isnull().sum()
+nulls = stats_2021.null_counts(BRFSS_2021.columns)
 print(nulls)
 
 #check for null values
-nulls = BRFSS_2015.isnull().sum()
+nulls = stats_2015.null_counts()
 print(nulls)
 
 #inspect all non-numeric columns to figure out how to deal with them
 for column in BRFSS_2021.columns:
-  if BRFSS_2021[column].dtype == "object":
-    print(BRFSS_2021[column].unique())
-
-#apply SQL queries to encode categorical variables
-query_general_health = """
-SELECT
-  CASE
-    WHEN General_Health = 'Poor' THEN 0
-    WHEN General_Health = 'Fair' THEN 1
-    WHEN General_Health = 'Good' THEN 2
-    WHEN General_Health = 'Very Good' THEN 3
-    WHEN General_Health = 'Excellent' THEN 4
-  END as General_Health
-FROM BRFSS_2021;
-"""
-
-query_checkup = """
-SELECT
-  CASE
-    WHEN Checkup = 'Within the past year' THEN 0
-    WHEN Checkup = 'Within the past 2 years' THEN 1
-    WHEN Checkup = 'Within the past 5 years' THEN 2
-    WHEN Checkup = '5 or more years ago' THEN 3
-    WHEN Checkup = 'Never' THEN 4
-  END as Checkup
-FROM BRFSS_2021;
-"""
-
-query_exercise = """
-SELECT
-  CASE
-    WHEN Exercise = 'No' THEN 0
-    WHEN Exercise = 'Yes' THEN 1
-  END as Exercise
-FROM BRFSS_2021;
-"""
-
-query_heart_disease = """
-SELECT
-  CASE
-    WHEN Heart_Disease = 'No' THEN 0
-    WHEN Heart_Disease = 'Yes' THEN 1
-  END as Heart_Disease
-FROM BRFSS_2021;
-"""
-
-query_skin_cancer = """
-SELECT
-  CASE
-    WHEN Skin_Cancer = 'No' THEN 0
-    WHEN Skin_Cancer = 'Yes' THEN 1
-  END as Skin_Cancer
-FROM BRFSS_2021;
-"""
-
-query_other_cancer = """
-SELECT
-  CASE
-    WHEN Other_Cancer = 'No' THEN 0
-    WHEN Other_Cancer = 'Yes' THEN 1
-  END as Other_Cancer
-FROM BRFSS_2021;
-"""
-
-query_depression = """
-SELECT
-  CASE
-    WHEN Depression = 'No' THEN 0
-    WHEN Depression = 'Yes' THEN 1
-  END as Depression
-FROM BRFSS_2021;
-"""
-
-query_diabetes = """
-SELECT
-  CASE
-    WHEN Diabetes = 'No' THEN 0
-    WHEN Diabetes = 'No, pre-diabetes or borderline diabetes' THEN 1
-    WHEN Diabetes = 'Yes, but female told only during pregnancy' THEN 2
-    WHEN Diabetes = 'Yes' THEN 3
-  END as Diabetes
-FROM BRFSS_2021;
-"""
-
-query_arthritis = """
-SELECT
-  CASE
-    WHEN Arthritis = 'No' THEN 0
-    WHEN Arthritis = 'Yes' THEN 1
-  END as Arthritis
-FROM BRFSS_2021;
-"""
-
-query_sex = """
-SELECT
-  CASE
-    WHEN Sex = 'Female' THEN 0
-    WHEN Sex = 'Male' THEN 1
-  END as Sex
-FROM BRFSS_2021;
-"""
-
-query_age_category = """
-SELECT
-  CASE
-    WHEN Age_Category = '18-24' THEN 0
-    WHEN Age_Category = '25-29' THEN 1
-    WHEN Age_Category = '30-34' THEN 2
-    WHEN Age_Category = '35-39' THEN 3
-    WHEN Age_Category = '40-44' THEN 4
-    WHEN Age_Category = '45-49' THEN 5
-    WHEN Age_Category = '50-54' THEN 6
-    WHEN Age_Category = '55-59' THEN 7
-    WHEN Age_Category = '60-64' THEN 8
-    WHEN Age_Category = '65-69' THEN 9
-    WHEN Age_Category = '70-74' THEN 10
-    WHEN Age_Category = '75-79' THEN 11
-    WHEN Age_Category = '80+' THEN 12
-  END as Age_Category
-FROM BRFSS_2021;
-"""
-
-query_smoking_history = """
-SELECT
-  CASE
-    WHEN Smoking_History = 'No' THEN 0
-    WHEN Smoking_History = 'Yes' THEN 1
-  END as Smoking_History
-FROM BRFSS_2021;
-"""
-
-query_diet = """
-SELECT
-  (Fruit_Consumption + Green_Vegetables_Consumption - FriedPotato_Consumption)
-  as Diet
-FROM BRFSS_2021;
-"""
-
-# putting each of these individual queries into dataframes
-df_general_health = psql.sqldf(query_general_health, locals())
-df_checkup = psql.sqldf(query_checkup, locals())
-df_exercise = psql.sqldf(query_exercise, locals())
-df_heart_disease = psql.sqldf(query_heart_disease, locals())
-df_skin_cancer = psql.sqldf(query_skin_cancer, locals())
-df_other_cancer = psql.sqldf(query_other_cancer, locals())
-df_depression = psql.sqldf(query_depression, locals())
-df_diabetes = psql.sqldf(query_diabetes, locals())
-df_arthritis = psql.sqldf(query_arthritis, locals())
-df_sex = psql.sqldf(query_sex, locals())
-df_age_category = psql.sqldf(query_age_category, locals())
-df_smoking_history = psql.sqldf(query_smoking_history, locals())
-df_diet = psql.sqldf(query_diet, locals())
-
-# concatting our dataframes back into BRFSS_2021
-BRFSS_2021 = pd.concat([
-    df_general_health,
-    df_checkup,
-    df_exercise,
-    df_heart_disease,
-    df_skin_cancer,
-    df_other_cancer,
-    df_depression,
-    df_diabetes,
-    df_arthritis,
-    df_sex,
-    df_age_category,
-    df_smoking_history,
-    df_diet,
-    BRFSS_2021[["Height_(cm)","Weight_(kg)","BMI","Alcohol_Consumption"]]
-], axis=1)
+  if BRFSS_2021[column].dtype == "category":
+    print(stats_2021.unique(column))
+
+# encode categorical variables in one vectorized pass; the ordinal/binary
+# mappings (e.g. General_Health 'Poor' -> 0 ... 'Excellent' -> 4) are declared
+# once in cvd/schema.py:ENCODING_TABLE, and Diet is derived as
+# Fruit_Consumption + Green_Vegetables_Consumption - FriedPotato_Consumption
+# The column store already holds these codes, so we just select the encoded
+# columns. They match BRFSSEncoder().fit_transform on the raw frame except for
+# categories outside the table: the store keeps them as -1 codes where the
+# encoder gives NaN (FeatureMatrix rows, which the models see, use NaN too)
+with stage('encode'):
+    BRFSS_2021 = store_2021.frame(ENCODED_2021_COLUMNS)
 
 #our new dataframe
 BRFSS_2021.head(10)
 
-# count plot of general health numbers - gives us a sense of initial questioning
+# The figures below are drawn from small precomputed summaries, never from
+# the rows: value counts from stats_2021, grouped counts from
+# category_counts, and box plots from quantile sketches built in chunked,
+# vectorized passes (sketches of several survey years can be merged)
 
-plt.figure(figsize=(8, 6))
-sns.countplot(data=BRFSS_2021, x='General_Health')
-plt.title('Total People by General Health Responses')
-plt.xlabel('General Health Response')
-plt.ylabel('People')
-
-health_types = {
-    '0': 'Poor',
-    '1': 'Fair',
-    '2': 'Good',
-    '3': 'Very Good',
-    '4': 'Excellent'
-}
+# count plot of general health numbers - gives us a sense of initial questioning
 
-plt.xticks(ticks=range(len(health_types)), labels=list(health_types.values()))
+fig, ax = plt.subplots(figsize=(8, 6))
+general_health_counts(stats_2021, ax)
 plt.show()
 
-# histogram of bmi distribution of dataset
+# histogram of bmi distribution of dataset (distinct values weighted by their counts)
 
-plt.figure(figsize=(8, 6))
-plt.hist(BRFSS_2021['BMI'], bins=50)
-plt.title('Distribution of BMI')
-plt.xlabel('BMI')
-plt.ylabel('Frequency')
+fig, ax = plt.subplots(figsize=(8, 6))
+bmi_histogram(stats_2021, ax, bins=50)
 plt.show()
 
 # box plot measuring relationship between BMI values and reported exercise
 
-sns.boxplot(x='Exercise', y='BMI', data=BRFSS_2021)
-plt.title('Box Plot of BMI by Exercise Level')
-plt.xlabel('Exercise Level')
-plt.ylabel('BMI')
+bmi_by_exercise = QuantileSketch.from_columns(BRFSS_2021['BMI'], BRFSS_2021['Exercise'], n_groups=2)
+fig, ax = plt.subplots()
+box_by(bmi_by_exercise, ax, ENCODING_TABLE['Exercise'], 'Box Plot of BMI by Exercise Level', 'Exercise Level', 'BMI')
 plt.show()
 
 # barplot of various disease distribution amongst users split by gender
 
 disease_columns = ['Heart_Disease', 'Skin_Cancer', 'Other_Cancer', 'Diabetes', 'Arthritis']
-original[disease_columns] = original[disease_columns].apply(lambda x: x.map({'Yes': 1, 'No': 0}))
-df_melted = pd.melt(original, id_vars='Sex', value_vars=disease_columns, var_name='Disease', value_name='Affected')
+# share of 'Yes' answers per sex, counted straight from the encoded codes
+disease_rates = group_rates(BRFSS_2021, 'Sex', disease_columns, ENCODING_TABLE)
 plt.figure(figsize=(10, 6))
-sns.barplot(x='Sex', y='Affected', hue='Disease', data=df_melted, palette='viridis')
+sns.barplot(x='Sex', y='Affected', hue='Disease', data=disease_rates, palette='viridis')
 plt.title('Distribution of Diseases by Gender')
 plt.ylabel('Number of Individuals')
 plt.show()
 
+# heart disease rate by age category in each survey year (only the two
+# columns of each year's partition are read)
+
+heart_disease_by_age = pd.concat([
+    group_rates(feature_store.scan(['Age_Category', 'Heart_Disease'], years=[year]), 'Age_Category', ['Heart_Disease'], ENCODING_TABLE).assign(Year=year)
+    for year in feature_store.years
+])
+plt.figure(figsize=(12, 6))
+sns.barplot(x='Age_Category', y='Affected', hue='Year', data=heart_disease_by_age, palette='viridis')
+plt.title('Heart Disease Rate by Age Category, 2015 vs 2021')
+plt.ylabel('Share of Individuals')
+plt.xticks(rotation=45)
+plt.show()
+
 # barplot comparing exercise habits to reports of general health
+# (the share exercising per group is computed from the codes, no decoded copy)
 
-original['Exercise'] = original['Exercise'].map({'Yes': 1, 'No': 0})
+exercise_rates = group_rates(BRFSS_2021, 'General_Health', ['Exercise'], ENCODING_TABLE)
 plt.figure(figsize=(8, 6))
-sns.barplot(x='General_Health', y='Exercise', data=original, palette='Set2')
+sns.barplot(x='General_Health', y='Affected', data=exercise_rates, palette='Set2')
 plt.title('Exercise Habits Across General Health Categories')
 plt.ylabel('Percentage of Individuals Exercising')
 plt.xlabel('General Health')
 plt.show()
 
-# breakdown of smoking history answers split by gender, represented through FacetGrid
+# breakdown of smoking history answers split by gender, one panel per sex (as a FacetGrid)
 
-g = sns.FacetGrid(BRFSS_2021, col='Sex', height=6)
-order = BRFSS_2021['Smoking_History'].value_counts().index
-g.map(sns.countplot, 'Smoking_History', palette='husl', order=order)
-
-g.set_axis_labels('Smoking History', 'Number of Respondants')
-g.set_xticklabels(labels=['No', 'Yes'])
-
-g.set_titles(col_template="{col_name}")
-g.axes[0, 0].set_title("Sex = Female")
-g.axes[0, 1].set_title("Sex = Male")
+smoking_by_sex = category_counts(BRFSS_2021, ['Smoking_History'], 'Sex', ENCODING_TABLE)
+fig, axes = plt.subplots(1, 2, figsize=(12, 6), sharey=True)
+count_facets(smoking_by_sex, 'Smoking_History', 'Sex', axes, ENCODING_TABLE['Sex'])
+axes[0].set_ylabel('Number of Respondants')
 plt.show()
 
 # standard box plot of comparison between age and weight
 
-sns.boxplot(x=BRFSS_2021['Age_Category'], y=BRFSS_2021['Weight_(kg)'])
-plt.title('Box Plot of Age and Weight')
-plt.xlabel('Age Category')
-plt.ylabel('Weight (kg)')
+weight_by_age = QuantileSketch.from_columns(BRFSS_2021['Weight_(kg)'], BRFSS_2021['Age_Category'], n_groups=len(ENCODING_TABLE['Age_Category']))
+fig, ax = plt.subplots(figsize=(12, 6))
+box_by(weight_by_age, ax, ENCODING_TABLE['Age_Category'], 'Box Plot of Age and Weight', 'Age Category', 'Weight (kg)')
 plt.show()
 
 # interactive scatter plot showing BMI vs. age, color coding those that have been diagnosed with heart disease
 
-BRFSS_2021_positive_diets = BRFSS_2021[BRFSS_2021['Diet'] > 0]
+# (a sample stratified by heart disease and age category among the positive
+# diets, so every age band shows its cases; only the sampled rows are copied)
 
-sampled_data = BRFSS_2021_positive_diets.sample(n=1000, random_state=42)
+sampled_data = scatter_sample(BRFSS_2021, ['BMI', 'Age_Category', 'Heart_Disease', 'Diet', 'General_Health'],
+                              ['Heart_Disease', 'Age_Category'], n=1000, mask=BRFSS_2021['Diet'] > 0, random_state=42)
 
 fig = px.scatter(sampled_data, x="BMI", y="Age_Category", color="Heart_Disease",
                  size="Diet", hover_name="General_Health",
@@ -376,14 +252,16 @@ fig.update_layout(yaxis_title_text="Age Category", yaxis_title_standoff=20)
 
 fig.show()
 
-# crosstabs for object columns to determine breakdowns of heart disease related to the certain features
+# crosstabs for categorical columns to determine breakdowns of heart disease related to the certain features
+# (the counts for every column are computed together in one pass over the encoded codes)
 
-categoricals = original.select_dtypes(include='object')
+categoricals = [column for column in ENCODING_TABLE if column != 'Heart_Disease']
+category_counts_by_disease = category_counts(BRFSS_2021, categoricals, 'Heart_Disease', ENCODING_TABLE)
 
 category_crosstabs = {}
 
-for column in categoricals.columns:
-    crosstab = pd.crosstab(index=original[column], columns=original['Heart_Disease'], margins=True, margins_name='Total')
+for column in categoricals:
+    crosstab = to_crosstab(category_counts_by_disease, column, 'Heart_Disease')
     category_crosstabs[column] = crosstab
 
 for column, crosstab in category_crosstabs.items():
@@ -400,14 +278,14 @@ for column, crosstab in category_crosstabs.items():
 
 # correlation heatmap
 plt.figure(figsize=(12,12))
-fig = sns.heatmap(data = BRFSS_2021.corr(), cmap = 'RdBu', vmin = -1, vmax = 1, annot = True, fmt=".2f")
+fig = sns.heatmap(data = stats_2021.corr(BRFSS_2021.columns), cmap = 'RdBu', vmin = -1, vmax = 1, annot = True, fmt=".2f")
 plt.show()
 
-BRFSS_2021_cleaned = BRFSS_2021.drop(columns={'Height_(cm)', 'Weight_(kg)'})
+cleaned_columns = BRFSS_2021.columns.drop(['Height_(cm)', 'Weight_(kg)'])
 
-# new correlation with cleaned data heatmap
+# new correlation with cleaned data heatmap (a sub-matrix of the one above)
 plt.figure(figsize=(12,12))
-fig = sns.heatmap(data = BRFSS_2021_cleaned.corr(), cmap = 'RdBu', vmin = -1, vmax = 1, annot = True, fmt=".2f")
+fig = sns.heatmap(data = stats_2021.corr(cleaned_columns), cmap = 'RdBu', vmin = -1, vmax = 1, annot = True, fmt=".2f")
 plt.show()
 
 """# Part 4: Modeling
@@ -415,19 +293,44 @@ plt.show()
 ##4.1 Creating Training and Testing Datasets
 """
 
-#extract feature columns
-features = BRFSS_2021_cleaned.drop(columns=["Heart_Disease"])
+#extract feature columns into one compact matrix: the binary/ordinal codes
+#as int8 and BMI, Alcohol_Consumption and Diet as float32, in one buffer
+features = FeatureMatrix.from_store(store_2021, cleaned_columns.drop('Heart_Disease'))
+print(features)
+print(features.memory_report())
 
 #extract target column
-target = BRFSS_2021_cleaned["Heart_Disease"]
+target = store_2021.array('Heart_Disease')
+
+# Stage outputs (split rows, searched and refitted models, test-set
+# probabilities) are cached on disk under keys that hash the data fingerprint
+# and the stage settings, so a rerun only recomputes what a change affects
+cache = ArtifactCache('artifact_cache', max_bytes=4 * 1024**3)
 
-#split into training and testing data
+#split into training and testing data (the row indices are cached)
 seed = 42
-X_train,X_test,y_train,y_test = train_test_split(features,target,test_size=0.2,random_state=seed)
+with stage('split'):
+    split_key = cache.key('split', store_2021, list(features.columns), test_size=0.2, random_state=seed)
+    train_rows, test_rows = cache.run(split_key, lambda: train_test_split(np.arange(len(target)), test_size=0.2, random_state=seed), stage='split')
+    X_train, X_test = features.take(train_rows), features.take(test_rows)
+    y_train, y_test = target[train_rows], target[test_rows]
+
+# the EDA frames are no longer needed: release them before the searches
+n_rows = len(features)
+del BRFSS_2021, BRFSS_2015, sampled_data, features
+gc.collect()
 
 """##4.2 Fitting Models Over Standard Data
 
-###4.2.1 Baseline Logistic Regression Model
+Every model family below is registered with one shared search engine. The 5 CV folds of X_train are built once, the scaled (and PCA-projected) fold matrices are cached, and all candidate x fold fits run together in one process pool, using every available core.
+"""
+
+# One search engine shared by all model families of this section
+# Accuracy and recall are both scored on every CV fit; candidates are ranked by accuracy
+scoring = {"accuracy": "accuracy", "recall": make_scorer(recall_score)}
+search = SearchEngine(cv=5, scoring=scoring, refit="accuracy", n_jobs=-1, verbose=1, cache=cache)
+
+"""###4.2.1 Baseline Logistic Regression Model
 """
 
 # Create a pipeline with StandardScaler and logistic regression
@@ -443,35 +346,17 @@ param_grid_lr = {
     'logistic_regression__solver': ['saga']  # Both support 'l1'
 }
 
-# Initialize grid search with 5 folds for each candidate
-grid_search_lr = GridSearchCV(pipeline_lr, param_grid_lr, cv=5, scoring="accuracy",verbose=1.1)
-
-# Fit the model
-grid_search_lr.fit(X_train, y_train)
-
-# Best parameters and best score
-print("Best parameters for Logistic Regression:", grid_search_lr.best_params_)
-print("Best score for Logistic Regression:", grid_search_lr.best_score_)
-
-# Predict on the test set
-y_pred_lr = grid_search_lr.predict(X_test)
-
-#Retrieve feature importance breakdowns
-best_pipeline = grid_search_lr.best_estimator_
-best_model = best_pipeline.named_steps['logistic_regression']
-feature_importance = best_model.coef_[0]
-feature_names = features.columns.tolist()
-imp = zip(feature_names,feature_importance)
-orderedImp = sorted(imp,key=lambda v: abs(v[1]), reverse=True)
-for n,i in orderedImp:
-  print(f"{n}: {i}")
+# Register the family; each candidate is scored over the same 5 folds
+search.add("lr", pipeline_lr, param_grid_lr)
 
 """###4.2.2 Logistic Regression Model with PCA"""
 
-# Create a pipeline with PCA and logistic regression
+# Create a pipeline with PCA and logistic regression; StreamingPCA builds the
+# 17 x 17 covariance in one chunked pass and keeps the components explaining
+# 80% of the variance (same components as PCA(n_components=0.80))
 pipeline = Pipeline([
     ('scaler', StandardScaler()),
-    ('pca', PCA(n_components=0.80)),
+    ('pca', StreamingPCA(n_components=0.80)),
     ('logistic_regression', LogisticRegression(max_iter=1000))
 ])
 
@@ -482,18 +367,8 @@ param_grid_pca = {
     'logistic_regression__solver': ['saga']
 }
 
-# Initialize the GridSearchCV object
-grid_search_pca = GridSearchCV(pipeline, param_grid_pca, cv=5, scoring="accuracy",verbose=1.1)
-
-# Fit the model
-grid_search_pca.fit(X_train, y_train)
-
-# Best parameters and best score
-print("Best parameters for PCA Logistic Regression:", grid_search_pca.best_params_)
-print("Best score for PCA Logistic Regression:", grid_search_pca.best_score_)
-
-# Predict on the test set
-y_pred_pca = grid_search_pca.predict(X_test)
+# Register the family; the scaled + PCA-projected folds are computed once
+search.add("pca", pipeline, param_grid_pca)
 
 """###4.2.3 Random Forest Model"""
 
@@ -503,91 +378,134 @@ param_grid_rf = {
     'min_samples_split': [2, 5]
 }
 
-# Initialize the GridSearchCV object
-grid_search_rf = GridSearchCV(RandomForestClassifier(), param_grid_rf, cv=5, scoring='accuracy',verbose=1.1)
+# Register the family with successive halving over the number of trees: every
+# candidate starts with a small forest, only the best third keep growing (the
+# trees already fitted are kept), and the savings against the full grid are
+# printed after the search
+search.add("rf", RandomForestClassifier(), param_grid_rf, halving="n_estimators")
 
-# Fit the model
-grid_search_rf.fit(X_train, y_train)
+"""###4.2.4 KNN Model"""
+
+# Initialize the KNN model; neighbours are found with an exact KD-tree index
+# (use index="ivf" with a recall_target for faster approximate search)
+knn = IndexedKNeighborsClassifier(index="kd_tree")
+
+# Define the parameter grid for KNN
+param_grid_knn = {
+    'n_neighbors': [3, 5],  # Number of neighbors
+}
+
+# Register the family
+search.add("knn", knn, param_grid_knn)
+
+"""###4.2.5 Running the Searches"""
+
+# Fit every registered family in one parallel run
+with stage('search', engine='standard'):
+    searches = search.fit(X_train, y_train)
+grid_search_lr = searches["lr"]
+grid_search_pca = searches["pca"]
+grid_search_rf = searches["rf"]
+grid_search_knn = searches["knn"]
 
 # Best parameters and best score
-print("Best parameters:", grid_search_rf.best_params_)
-print("Best score:", grid_search_rf.best_score_)
+print("Best parameters for Logistic Regression:", grid_search_lr.best_params_)
+print("Best score for Logistic Regression:", grid_search_lr.best_score_)
 
 # Predict on the test set
-y_pred_rf = grid_search_rf.predict(X_test)
+with stage('predict', model='lr'):
+    proba_lr = cache.run(cache.key('predict', grid_search_lr, split_key), lambda: grid_search_lr.predict_proba(X_test)[:, 1], stage='predict')
 
-best_model = grid_search_rf.best_estimator_
-feature_importance = best_model.feature_importances_
-feature_names = features.columns.tolist()
+#Retrieve feature importance breakdowns
+best_pipeline = grid_search_lr.best_estimator_
+best_model = best_pipeline.named_steps['logistic_regression']
+feature_importance = best_model.coef_[0]
+feature_names = X_train.columns.tolist()
 imp = zip(feature_names,feature_importance)
 orderedImp = sorted(imp,key=lambda v: abs(v[1]), reverse=True)
 for n,i in orderedImp:
   print(f"{n}: {i}")
 
-"""###4.2.4 KNN Model"""
+# Best parameters and best score
+print("Best parameters for PCA Logistic Regression:", grid_search_pca.best_params_)
+print("Best score for PCA Logistic Regression:", grid_search_pca.best_score_)
 
-# Initialize the KNN model
-knn = KNeighborsClassifier()
+# Predict on the test set
+with stage('predict', model='pca'):
+    proba_pca = cache.run(cache.key('predict', grid_search_pca, split_key), lambda: grid_search_pca.predict_proba(X_test)[:, 1], stage='predict')
 
-# Define the parameter grid for KNN
-param_grid_knn = {
-    'n_neighbors': [3, 5],  # Number of neighbors
-}
+# Best parameters and best score
+print("Best parameters:", grid_search_rf.best_params_)
+print("Best score:", grid_search_rf.best_score_)
 
-# Initialize the GridSearchCV object for KNN
-grid_search_knn = GridSearchCV(knn, param_grid_knn, cv=5, scoring='accuracy',verbose=1.1)
+# Predict on the test set
+with stage('predict', model='rf'):
+    proba_rf = cache.run(cache.key('predict', grid_search_rf, split_key), lambda: grid_search_rf.predict_proba(X_test)[:, 1], stage='predict')
 
-# Fit the model
-grid_search_knn.fit(X_train, y_train)
+best_model = grid_search_rf.best_estimator_
+feature_importance = best_model.feature_importances_
+feature_names = X_train.columns.tolist()
+imp = zip(feature_names,feature_importance)
+orderedImp = sorted(imp,key=lambda v: abs(v[1]), reverse=True)
+for n,i in orderedImp:
+  print(f"{n}: {i}")
 
 # Best parameters and best score
 print("Best parameters for KNN:", grid_search_knn.best_params_)
 print("Best score for KNN:", grid_search_knn.best_score_)
 
 # Predict on the test set
-y_pred_knn = grid_search_knn.predict(X_test)
-
-"""###4.2.5 Summary of Model Performances"""
-
-confusion = confusion_matrix(y_test,y_pred_lr)
-print("Confusion Matrix for Logistic Regression:")
-print(confusion)
-classification_rep = classification_report(y_test, y_pred_lr)
-print("Classification Report for Logistic Regression:")
-print(classification_rep)
-print()
-
-confusion = confusion_matrix(y_test,y_pred_pca)
-print("Confusion Matrix for Logistic Regression with PCA:")
-print(confusion)
-classification_rep = classification_report(y_test, y_pred_pca)
-print("Classification Report for Logistic Regression with PCA:")
-print(classification_rep)
-print()
-
-confusion = confusion_matrix(y_test,y_pred_rf)
-print("Confusion Matrix for Random Forest:")
-print(confusion)
-classification_rep = classification_report(y_test, y_pred_rf)
-print("Classification Report for Random Forest:")
-print(classification_rep)
-print()
-
-confusion = confusion_matrix(y_test,y_pred_knn)
-print("Confusion Matrix for KNN:")
-print(confusion)
-classification_rep = classification_report(y_test, y_pred_knn)
-print("Classification Report for KNN:")
-print(classification_rep)
+with stage('predict', model='knn'):
+    proba_knn = cache.run(cache.key('predict', grid_search_knn, split_key), lambda: grid_search_knn.predict_proba(X_test)[:, 1], stage='predict')
+
+"""###4.2.6 Summary of Model Performances"""
+
+PROFILER.begin('report', engine='standard')
+# One sort of each model's test probabilities gives the confusion counts at
+# every threshold; reports at 0.5 match predict(), other thresholds are free
+sweeps = {
+    "Logistic Regression": ThresholdSweep(y_test, proba_lr),
+    "Logistic Regression with PCA": ThresholdSweep(y_test, proba_pca),
+    "Random Forest": ThresholdSweep(y_test, proba_rf),
+    "KNN": ThresholdSweep(y_test, proba_knn),
+}
+for name, sweep in sweeps.items():
+    print(f"Confusion Matrix for {name}:")
+    print(sweep.confusion_matrix())
+    print(f"Classification Report for {name}:")
+    print(sweep.classification_report())
+    print()
+
+# Test-set ROC AUC / average precision and the metrics at 0.5, per model
+print(compare_models(sweeps))
+
+# Lowest-cost operating point reaching 80% recall, without retraining
+for name, sweep in sweeps.items():
+    threshold = sweep.threshold_for(min_recall=0.8)
+    if threshold is None:
+        continue
+    metrics = sweep.metrics(threshold, inclusive=True)
+    print(f"{name}: threshold {threshold:.3f} -> recall {metrics['recall']:.3f}, "
+          f"specificity {metrics['specificity']:.3f}, precision {metrics['precision']:.3f}")
+PROFILER.end('report')
 
 """#4.3 Fitting Models Over Synthetically-Enhanced Data
 
-###4.3.1 Logistic Regression Model
+The SMOTE pipelines are searched the same way, with a second engine that reuses the folds built in 4.2. Since SMOTE comes before any tuned step, it is fit once per fold and the resampled rows are shared by every candidate of all four families. `FastSMOTE` makes the same draws as imblearn's `SMOTE` up to tie-breaking among equidistant neighbours, but reads each fold's minority neighbours off one table computed for the whole training set, and leaves the original rows uncopied (a `ResampledView`).
+"""
+
+# One search engine shared by all SMOTE model families
+search_smote = SearchEngine(cv=5, scoring=scoring, refit="accuracy", n_jobs=-1, verbose=1, cache=cache)
+
+# Nearest heart-disease neighbours of every heart-disease row, shared by all folds
+minority_neighbors = MinorityNeighbors(k_neighbors=5).fit(X_train, y_train)
+
+"""###4.3.1 Logistic Regression Model
 """
 
 # Create a pipeline with StandardScaler and logistic regression
 pipeline_lr = ImbPipeline([
-    ('smote', SMOTE(random_state=seed)),
+    ('smote', FastSMOTE(random_state=seed, neighbors=minority_neighbors, virtual=True)),
     ('scaler', StandardScaler()),
     ('logistic_regression', LogisticRegression(max_iter=1000))
 ])
@@ -600,35 +518,16 @@ param_grid_lr = {
     'logistic_regression__solver': ['saga']  # Both support 'l1'
 }
 
-# Initialize the GridSearchCV object for the pipeline
-grid_search_lr = GridSearchCV(pipeline_lr, param_grid_lr, cv=5, scoring="accuracy",verbose=1.1)
-
-# Fit the model
-grid_search_lr.fit(X_train, y_train)
-
-# Best parameters and best score
-print("Best parameters for Logistic Regression:", grid_search_lr.best_params_)
-print("Best score for Logistic Regression:", grid_search_lr.best_score_)
-
-# Predict on the test set
-y_pred_lr = grid_search_lr.predict(X_test)
-
-best_pipeline = grid_search_lr.best_estimator_
-best_model = best_pipeline.named_steps['logistic_regression']
-feature_importance = best_model.coef_[0]
-feature_names = features.columns.tolist()
-imp = zip(feature_names,feature_importance)
-orderedImp = sorted(imp,key=lambda v: abs(v[1]), reverse=True)
-for n,i in orderedImp:
-  print(f"{n}: {i}")
+# Register the family
+search_smote.add("lr", pipeline_lr, param_grid_lr)
 
 """###4.3.2 Logistic Regression Model with PCA"""
 
 # Create a pipeline with PCA and logistic regression
 pipeline = ImbPipeline([
-    ('smote', SMOTE(random_state=seed)),
+    ('smote', FastSMOTE(random_state=seed, neighbors=minority_neighbors, virtual=True)),
     ('scaler', StandardScaler()),
-    ('pca', PCA(n_components=0.80)),
+    ('pca', StreamingPCA(n_components=0.80)),
     ('logistic_regression', LogisticRegression(max_iter=1000))
 ])
 
@@ -639,24 +538,14 @@ param_grid_pca = {
     'logistic_regression__solver': ['saga']
 }
 
-# Initialize the GridSearchCV object
-grid_search_pca = GridSearchCV(pipeline, param_grid_pca, cv=5, scoring="accuracy",verbose=1.1)
-
-# Fit the model
-grid_search_pca.fit(X_train, y_train)
-
-# Best parameters and best score
-print("Best parameters for PCA Logistic Regression:", grid_search_pca.best_params_)
-print("Best score for PCA Logistic Regression:", grid_search_pca.best_score_)
-
-# Predict on the test set
-y_pred_pca = grid_search_pca.predict(X_test)
+# Register the family
+search_smote.add("pca", pipeline, param_grid_pca)
 
 """###4.3.3 Random Forest Model"""
 
 # Define the parameter grid
 pipeline_rf = ImbPipeline([
-    ('smote', SMOTE(random_state=seed)),
+    ('smote', FastSMOTE(random_state=seed, neighbors=minority_neighbors, virtual=True)),
     ('random_forest', RandomForestClassifier())
 ])
 
@@ -665,85 +554,135 @@ param_grid_rf = {
     'random_forest__min_samples_split': [2, 5]
 }
 
-# Initialize the GridSearchCV object
-grid_search_rf = GridSearchCV(pipeline_rf, param_grid_rf, cv=5, scoring='accuracy',verbose=1.1)
+# Register the family, again with successive halving over the number of trees
+search_smote.add("rf", pipeline_rf, param_grid_rf, halving="n_estimators")
+
+"""###4.3.4 KNN Model"""
+
+pipeline_knn = ImbPipeline([
+    ('smote', FastSMOTE(random_state=42, neighbors=minority_neighbors, virtual=True)),
+    ('knn', IndexedKNeighborsClassifier(index="kd_tree"))
+])
+
+# Define the parameter grid for KNN
+param_grid_knn = {
+    'knn__n_neighbors': [3, 5],  # Number of neighbors
+}
+
+# Register the family
+search_smote.add("knn", pipeline_knn, param_grid_knn)
+
+"""###4.3.5 Running the Searches"""
 
-# Fit the model
-grid_search_rf.fit(X_train, y_train)
+# Fit every registered SMOTE family in one parallel run
+with stage('search', engine='smote'):
+    searches_smote = search_smote.fit(X_train, y_train, folds=search.folds_)
+grid_search_lr = searches_smote["lr"]
+grid_search_pca = searches_smote["pca"]
+grid_search_rf = searches_smote["rf"]
+grid_search_knn = searches_smote["knn"]
+
+# Best parameters and best score
+print("Best parameters for Logistic Regression:", grid_search_lr.best_params_)
+print("Best score for Logistic Regression:", grid_search_lr.best_score_)
+
+# Predict on the test set
+with stage('predict', model='lr'):
+    proba_lr = cache.run(cache.key('predict', grid_search_lr, split_key), lambda: grid_search_lr.predict_proba(X_test)[:, 1], stage='predict')
+
+best_pipeline = grid_search_lr.best_estimator_
+best_model = best_pipeline.named_steps['logistic_regression']
+feature_importance = best_model.coef_[0]
+feature_names = X_train.columns.tolist()
+imp = zip(feature_names,feature_importance)
+orderedImp = sorted(imp,key=lambda v: abs(v[1]), reverse=True)
+for n,i in orderedImp:
+  print(f"{n}: {i}")
+
+# Best parameters and best score
+print("Best parameters for PCA Logistic Regression:", grid_search_pca.best_params_)
+print("Best score for PCA Logistic Regression:", grid_search_pca.best_score_)
+
+# Predict on the test set
+with stage('predict', model='pca'):
+    proba_pca = cache.run(cache.key('predict', grid_search_pca, split_key), lambda: grid_search_pca.predict_proba(X_test)[:, 1], stage='predict')
 
 # Best parameters and best score
 print("Best parameters:", grid_search_rf.best_params_)
 print("Best score:", grid_search_rf.best_score_)
 
 # Predict on the test set
-y_pred_rf = grid_search_rf.predict(X_test)
+with stage('predict', model='rf'):
+    proba_rf = cache.run(cache.key('predict', grid_search_rf, split_key), lambda: grid_search_rf.predict_proba(X_test)[:, 1], stage='predict')
 
 best_pipeline = grid_search_rf.best_estimator_
 best_model = best_pipeline.named_steps['random_forest']
 feature_importance = best_model.feature_importances_
-feature_names = features.columns.tolist()
+feature_names = X_train.columns.tolist()
 imp = zip(feature_names,feature_importance)
 orderedImp = sorted(imp,key=lambda v: abs(v[1]), reverse=True)
 for n,i in orderedImp:
   print(f"{n}: {i}")
 
-"""###4.3.4 KNN Model"""
-
-pipeline_knn = ImbPipeline([
-    ('smote', SMOTE(random_state=42)),
-    ('knn', KNeighborsClassifier())
-])
+# Best parameters and best score
+print("Best parameters for KNN:", grid_search_knn.best_params_)
+print("Best score for KNN:", grid_search_knn.best_score_)
 
-# Define the parameter grid for KNN
-param_grid_knn = {
-    'knn__n_neighbors': [3, 5],  # Number of neighbors
+# Predict on the test set
+with stage('predict', model='knn'):
+    proba_knn = cache.run(cache.key('predict', grid_search_knn, split_key), lambda: grid_search_knn.predict_proba(X_test)[:, 1], stage='predict')
+
+"""###4.3.6 Summary of Model Performances Utilizing SMOTE"""
+
+PROFILER.begin('report', engine='smote')
+# One sort of each model's test probabilities gives the confusion counts at
+# every threshold; reports at 0.5 match predict(), other thresholds are free
+sweeps_smote = {
+    "Logistic Regression": ThresholdSweep(y_test, proba_lr),
+    "Logistic Regression with PCA": ThresholdSweep(y_test, proba_pca),
+    "Random Forest": ThresholdSweep(y_test, proba_rf),
+    "KNN": ThresholdSweep(y_test, proba_knn),
 }
+for name, sweep in sweeps_smote.items():
+    print(f"Confusion Matrix for {name}:")
+    print(sweep.confusion_matrix())
+    print(f"Classification Report for {name}:")
+    print(sweep.classification_report())
+    print()
+
+# Test-set ROC AUC / average precision and the metrics at 0.5, per model
+print(compare_models(sweeps_smote))
+
+# Lowest-cost operating point reaching 80% recall, without retraining
+for name, sweep in sweeps_smote.items():
+    threshold = sweep.threshold_for(min_recall=0.8)
+    if threshold is None:
+        continue
+    metrics = sweep.metrics(threshold, inclusive=True)
+    print(f"{name}: threshold {threshold:.3f} -> recall {metrics['recall']:.3f}, "
+          f"specificity {metrics['specificity']:.3f}, precision {metrics['precision']:.3f}")
+PROFILER.end('report')
+
+"""##4.4 Saving the Tuned Models
+
+Every best estimator is saved together with its feature columns, so it can be scored outside of this notebook on raw survey rows, e.g. `python -m cvd serve models/rf_smote.joblib --input new_rows.csv --output scores.csv`. The logistic regression and random forest models are also exported as plain numpy arrays (`.npz`), which `python -m cvd score models/rf_smote.npz --input new_rows.csv` scores without importing pandas, sklearn or any plotting library. The whole modeling part can also be run without the notebook: `python -m cvd train CVD_cleaned.csv` and `python -m cvd evaluate CVD_cleaned.csv`.
+"""
 
-# Initialize the GridSearchCV object for KNN
-grid_search_knn = GridSearchCV(pipeline_knn, param_grid_knn, cv=5, scoring='accuracy',verbose=1.1)
+os.makedirs('models', exist_ok=True)
+for suffix, results in (('', searches), ('_smote', searches_smote)):
+    for name, result in results.items():
+        save_model(result.best_estimator_, f'models/{name}{suffix}.joblib', X_train.columns)
+        if name != 'knn':  # KNN needs its training rows; it is served from the bundle only
+            export_model(result.best_estimator_, f'models/{name}{suffix}.npz', X_train.columns)
 
-# Fit the model
-grid_search_knn.fit(X_train, y_train)
+"""##4.5 Profiling
 
-# Best parameters and best score
-print("Best parameters for KNN:", grid_search_knn.best_params_)
-print("Best score for KNN:", grid_search_knn.best_score_)
+Wall time, CPU time and peak memory of every stage and CV fit, written as a Chrome trace (open it in `chrome://tracing` or Perfetto). Two runs can be compared with `python -m cvd.profiling compare old_trace.json profile_trace.json`.
+"""
 
-# Predict on the test set
-y_pred_knn = grid_search_knn.predict(X_test)
-
-"""###4.3.5 Summary of Model Performances Utilizing SMOTE"""
-
-confusion = confusion_matrix(y_test,y_pred_lr)
-print("Confusion Matrix for Logistic Regression:")
-print(confusion)
-classification_rep = classification_report(y_test, y_pred_lr)
-print("Classification Report for Logistic Regression:")
-print(classification_rep)
-print()
-
-confusion = confusion_matrix(y_test,y_pred_pca)
-print("Confusion Matrix for Logistic Regression with PCA:")
-print(confusion)
-classification_rep = classification_report(y_test, y_pred_pca)
-print("Classification Report for Logistic Regression with PCA:")
-print(classification_rep)
-print()
-
-confusion = confusion_matrix(y_test,y_pred_rf)
-print("Confusion Matrix for Random Forest:")
-print(confusion)
-classification_rep = classification_report(y_test, y_pred_rf)
-print("Classification Report for Random Forest:")
-print(classification_rep)
-print()
-
-confusion = confusion_matrix(y_test,y_pred_knn)
-print("Confusion Matrix for KNN:")
-print(confusion)
-classification_rep = classification_report(y_test, y_pred_knn)
-print("Classification Report for KNN:")
-print(classification_rep)
+PROFILER.report()
+print(cache.stats())
+PROFILER.write_trace('profile_trace.json', rows=n_rows)
 
 """# Part 5: Conclusion
 
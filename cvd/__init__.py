@@ -0,0 +1,5 @@
+"""Reusable building blocks for the cardiovascular disease prediction project.
+
+Submodules are imported on demand so that light-weight entry points do not
+pay for the heavier dependencies used elsewhere in the project.
+"""
@@ -0,0 +1,41 @@
+"""Command-line entry points: ``python -m cvd <command> [options]``.
+
+Only the module of the chosen command is imported, so e.g. ``score`` loads
+numpy and the scoring runtime but never pandas, sklearn or the plotting
+libraries.
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+
+# command -> (module, function, summary)
+COMMANDS = {
+    "ingest": ("cvd.ingest", "main", "stream a BRFSS CSV into a column store"),
+    "features": ("cvd.featurestore", "main", "build the year-partitioned feature store"),
+    "train": ("cvd.train", "main", "search, refit and save the notebook's models"),
+    "evaluate": ("cvd.train", "evaluate_main", "threshold sweep of the saved models"),
+    "subsample": ("cvd.train", "subsample_main", "training time vs recall/AUC by sampling ratio"),
+    "nested": ("cvd.train", "nested_main", "nested-CV score and cost of each model family"),
+    "score": ("cvd.runtime", "main", "numpy-only batch scoring of exported models"),
+    "serve": ("cvd.serve", "main", "batch/online scoring of full sklearn bundles"),
+    "plot": ("cvd.plots", "main", "write the EDA figures"),
+    "profile": ("cvd.profiling", "main", "compare profiler traces"),
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in COMMANDS:
+        width = max(map(len, COMMANDS))
+        lines = [f"  {name:<{width}}  {summary}" for name, (_, _, summary) in COMMANDS.items()]
+        print("usage: python -m cvd <command> [options]\n\ncommands:\n" + "\n".join(lines),
+              file=sys.stderr)
+        return 2
+    module, function, _ = COMMANDS[argv[0]]
+    return getattr(importlib.import_module(module), function)(argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""One-pass grouped aggregation over integer-coded survey columns.
+
+``pd.crosstab`` rescans the whole frame once per column and ``pd.melt``
+materializes an n_rows x n_columns long frame just to average indicators.
+Here every categorical column is already an integer code (see
+``cvd.encoding``), so all counts can be computed with ``np.bincount``:
+
+* ``category_counts`` - counts of every (column, category, target) triple
+  for many columns in a single ``bincount`` call, returned as a tidy frame;
+  ``to_crosstab`` reshapes one column of it into the ``pd.crosstab`` layout
+  (with ``Total`` margins).
+* ``group_rates`` - share of positive answers per group for several
+  yes/no columns (the data behind the per-sex disease barplot).
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+def _codes(frame, column):
+    values = frame[column]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy()
+    return np.asarray(values)
+
+
+def category_counts(frame, columns, by, categories):
+    """Counts of each category of ``columns`` split by the codes of ``by``.
+
+    Parameters
+    ----------
+    frame : DataFrame
+        Integer-coded columns (``-1``/NaN marks a missing value).
+    columns : list of str
+    by : str
+        Integer-coded grouping column, e.g. ``"Heart_Disease"``.
+    categories : dict
+        Column -> category labels in code order (e.g. ``ENCODING_TABLE``);
+        must include ``by``.
+
+    Returns
+    -------
+    DataFrame with columns ``column``, ``category``, ``code``, ``by`` and
+    ``count``; one row per (column, category, group), including zeros.
+    """
+    columns = list(columns)
+    sizes = np.array([len(categories[c]) for c in columns])
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    n_groups = len(categories[by])
+
+    group = np.nan_to_num(_codes(frame, by), nan=-1).astype(np.int64)
+    codes = np.column_stack([
+        np.nan_to_num(_codes(frame, c), nan=-1).astype(np.int64) for c in columns
+    ])
+    valid = (codes >= 0) & (codes < sizes) & ((group >= 0) & (group < n_groups))[:, None]
+    keys = (codes + offsets) * n_groups + group[:, None]
+    counts = np.bincount(keys[valid], minlength=sizes.sum() * n_groups)
+
+    code = np.concatenate([np.arange(size) for size in sizes])
+    return pd.DataFrame({
+        "column": np.repeat(np.repeat(columns, sizes), n_groups),
+        "category": np.repeat(np.concatenate([categories[c] for c in columns]), n_groups),
+        "code": np.repeat(code, n_groups),
+        by: np.tile(np.arange(n_groups), sizes.sum()),
+        "count": counts,
+    })
+
+
+def to_crosstab(counts, column, by, margins_name="Total", drop_empty=True):
+    """``pd.crosstab(..., margins=True)`` layout for one column of ``counts``.
+
+    Categories that never occur are dropped, like in ``pd.crosstab``, unless
+    ``drop_empty`` is False.
+    """
+    subset = counts[counts["column"] == column]
+    table = subset.pivot_table(index="category", columns=by, values="count",
+                               aggfunc="sum", sort=False)
+    order = subset.drop_duplicates("category").sort_values("code")["category"]
+    table = table.loc[order.to_numpy()]
+    table[margins_name] = table.sum(axis=1)
+    if drop_empty:
+        table = table[table[margins_name] > 0]
+    table.loc[margins_name] = table.sum(axis=0)
+    table.index.name = column
+    table.columns.name = by
+    return table.astype(np.int64)
+
+
+def group_rates(frame, by, columns, categories, positive="Yes", negative="No"):
+    """Share of ``positive`` answers in each ``by`` group for every column.
+
+    Rows whose answer is neither ``positive`` nor ``negative`` are ignored,
+    matching ``x.map({'Yes': 1, 'No': 0})`` followed by a mean.
+
+    Returns a tidy DataFrame with the ``by`` label, ``Disease`` (the column
+    name), ``Affected`` (the rate) and ``n`` (answers counted).
+    """
+    labels = categories[by]
+    group = np.nan_to_num(_codes(frame, by), nan=-1).astype(np.int64)
+    in_group = (group >= 0) & (group < len(labels))
+    rows = []
+    for column in columns:
+        codes = _codes(frame, column)
+        pos = codes == categories[column].index(positive)
+        answered = (pos | (codes == categories[column].index(negative))) & in_group
+        n = np.bincount(group[answered], minlength=len(labels))
+        hits = np.bincount(group[answered & pos], minlength=len(labels))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rate = hits / n
+        rows.append(pd.DataFrame({by: labels, "Disease": column, "Affected": rate, "n": n}))
+    return pd.concat(rows, ignore_index=True)
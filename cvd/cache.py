@@ -0,0 +1,205 @@
+"""Content-addressed on-disk cache of pipeline stage outputs.
+
+Every run of the notebook repeats the split, the searches, the refits and
+the test-set predictions even when neither the data nor any grid changed.
+``ArtifactCache`` stores each stage's output as a joblib file named by a key
+that hashes the stage name, its configuration and the keys of its inputs:
+
+* raw data is identified by its ``ColumnStore`` fingerprint (source file
+  plus ingest schema), so the store itself is the cached encoded frame;
+* a downstream stage lists upstream keys among its inputs, so a change
+  anywhere produces new keys for exactly the stages below it, while every
+  other stage is read back from disk.
+
+Entries are evicted least-recently-used first to stay under ``max_bytes``
+and ``max_entries``. Stale entries are never overwritten, only evicted.
+
+Example::
+
+    cache = ArtifactCache("artifact_cache")
+    split_key = cache.key("split", store, test_size=0.2, random_state=seed)
+    train_rows, test_rows = cache.run(split_key, lambda: train_test_split(...))
+    search = SearchEngine(cache=cache)           # one entry per model family
+    proba_key = cache.key("predict", results["rf"], split_key)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+
+import joblib
+import sklearn
+from joblib import hash as joblib_hash
+
+CACHE_VERSION = 1
+INDEX_FILE = "index.json"
+
+
+def fingerprint(value):
+    """Content hash of a stage input.
+
+    ``ColumnStore``s are identified by their source fingerprint and cached
+    results (anything with a ``cache_key_``) by their key, so neither is
+    rehashed; a ``FeatureMatrix`` by its compact buffer; arrays and frames
+    are hashed by content, other values by their pickled state.
+    """
+    key = getattr(value, "cache_key_", None)
+    if key is not None:
+        return key
+    meta = getattr(value, "meta", None)
+    if isinstance(meta, dict) and "fingerprint" in meta:
+        return meta["fingerprint"]
+    if hasattr(value, "content_hash"):
+        return value.content_hash()
+    if hasattr(value, "columns") and hasattr(value, "to_numpy"):
+        return joblib_hash((list(value.columns), value.to_numpy()))
+    if hasattr(value, "to_numpy"):
+        return joblib_hash((getattr(value, "name", None), value.to_numpy()))
+    return joblib_hash(value)
+
+
+class ArtifactCache:
+    """LRU-bounded directory of stage outputs keyed by content hashes.
+
+    Parameters
+    ----------
+    path : str, default="artifact_cache"
+    max_bytes : int, default=4 GiB
+        Upper bound on the total size of the entry files; an output larger
+        than the bound is returned without being stored.
+    max_entries : int, optional
+    enabled : bool, default=True
+        With ``enabled=False`` every ``run`` recomputes and nothing is written.
+    """
+
+    def __init__(self, path="artifact_cache", max_bytes=4 * 1024**3, max_entries=None,
+                 enabled=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._index = {}
+        if enabled:
+            os.makedirs(path, exist_ok=True)
+            self._index = self._read_index()
+            # the limits may be tighter than the ones the cache was filled under
+            self._evict()
+            self._write_index()
+
+    def _read_index(self):
+        index_path = os.path.join(self.path, INDEX_FILE)
+        if not os.path.exists(index_path):
+            return {}
+        with open(index_path) as handle:
+            index = json.load(handle)
+        # drop entries whose file has gone (e.g. removed by hand)
+        return {key: entry for key, entry in index.items()
+                if os.path.exists(self._file(key))}
+
+    def _write_index(self):
+        tmp_path = os.path.join(self.path, INDEX_FILE + ".tmp")
+        with open(tmp_path, "w") as handle:
+            json.dump(self._index, handle, indent=1)
+        os.replace(tmp_path, os.path.join(self.path, INDEX_FILE))
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.joblib")
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    @property
+    def nbytes(self):
+        return sum(entry["nbytes"] for entry in self._index.values())
+
+    def key(self, stage, *inputs, **config):
+        """Key of ``stage`` applied to ``inputs`` (hashed with ``fingerprint``)
+        under ``config``; upstream keys may be passed as inputs."""
+        return joblib_hash({
+            "version": CACHE_VERSION,
+            "sklearn": sklearn.__version__,
+            "stage": stage,
+            "inputs": [fingerprint(value) for value in inputs],
+            "config": config,
+        })
+
+    def get(self, key):
+        """Load an entry (marking it recently used); ``KeyError`` if absent."""
+        if key not in self._index:
+            raise KeyError(key)
+        value = joblib.load(self._file(key))
+        self._index[key]["accessed"] = time.time()
+        self._write_index()
+        return value
+
+    def put(self, key, value, stage=None):
+        """Store ``value`` under ``key`` and evict down to the size limits."""
+        if not self.enabled:
+            return
+        tmp_path = self._file(key) + ".tmp"
+        joblib.dump(value, tmp_path)
+        size = os.path.getsize(tmp_path)
+        if size > self.max_bytes:
+            os.remove(tmp_path)
+            return
+        os.replace(tmp_path, self._file(key))
+        now = time.time()
+        self._index[key] = {"stage": stage, "nbytes": size, "created": now, "accessed": now}
+        self._evict()
+        self._write_index()
+
+    def run(self, key, function, stage=None):
+        """``function()``, or its output cached under ``key``."""
+        if self.enabled and key in self._index:
+            self.hits += 1
+            return self.get(key)
+        self.misses += 1
+        value = function()
+        self.put(key, value, stage=stage)
+        return value
+
+    def _evict(self):
+        by_age = sorted(self._index, key=lambda key: self._index[key]["accessed"])
+        total = self.nbytes
+        for key in by_age:
+            over_entries = self.max_entries is not None and len(self._index) > self.max_entries
+            if total <= self.max_bytes and not over_entries:
+                break
+            total -= self._index.pop(key)["nbytes"]
+            os.remove(self._file(key))
+            self.evictions += 1
+
+    def invalidate(self, stage=None):
+        """Remove every entry (of one ``stage``)."""
+        for key in [key for key, entry in self._index.items()
+                    if stage is None or entry["stage"] == stage]:
+            del self._index[key]
+            os.remove(self._file(key))
+        if self.enabled:
+            self._write_index()
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        stages = {}
+        for entry in self._index.values():
+            stages[entry["stage"]] = stages.get(entry["stage"], 0) + 1
+        return {
+            "entries": len(self._index),
+            "nbytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stages": stages,
+        }
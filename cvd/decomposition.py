@@ -0,0 +1,180 @@
+"""PCA for tall survey matrices: one chunked pass, no full SVD.
+
+``PCA(n_components=0.80)`` with the full solver decomposes the whole centred
+training matrix (and copies it) just to keep a handful of directions of a
+17-feature table. ``StreamingPCA`` instead
+
+* with ``solver="covariance"`` accumulates the feature covariance chunk by
+  chunk (``partial_fit`` merges further chunks, e.g. the rows of another
+  survey year streamed from a ``ColumnStore``) and eigendecomposes that
+  ``n_features x n_features`` matrix - memory is one chunk plus O(d^2) and
+  the data are never centred in place;
+* with ``solver="randomized"`` (wide inputs) finds the leading directions
+  with a randomized SVD, growing the number of components until the
+  explained-variance target is met - the total variance comes from the
+  column variances, so no full decomposition is needed to pick the count.
+
+The fitted attributes and sign convention match ``sklearn.decomposition.PCA``
+(components as rows, the largest-magnitude loading of each positive). In a
+``SearchEngine`` pipeline the PCA step precedes the tuned logistic
+regression, so ``FoldCache`` fits it once per fold and shares the projected
+fold matrices with every candidate.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.utils.validation import check_is_fitted
+
+
+def _flip_signs(components):
+    """Make the largest-magnitude loading of every component positive."""
+    rows = np.arange(len(components))
+    signs = np.sign(components[rows, np.argmax(np.abs(components), axis=1)])
+    signs[signs == 0] = 1
+    return components * signs[:, None]
+
+
+def _n_for_target(explained_variance_ratio, target):
+    """Components needed to explain more than ``target`` (as in ``PCA``)."""
+    cumulative = np.cumsum(explained_variance_ratio)
+    return int(min(np.searchsorted(cumulative, target, side="right") + 1,
+                   len(explained_variance_ratio)))
+
+
+class StreamingPCA(TransformerMixin, BaseEstimator):
+    """Principal component analysis from chunked covariance or randomized SVD.
+
+    Parameters
+    ----------
+    n_components : int or float, default=0.80
+        Number of components, or a float in (0, 1): the smallest number of
+        components whose explained variance ratio exceeds it.
+    solver : {"auto", "covariance", "randomized"}, default="auto"
+        ``"auto"`` uses the covariance solver up to 1000 features.
+    chunk_size : int, default=100_000
+        Rows per chunk for the covariance pass and ``transform``.
+    whiten : bool, default=False
+    n_oversamples, n_iter : int
+        Randomized SVD settings.
+    random_state : int, optional
+    """
+
+    def __init__(self, n_components=0.80, solver="auto", chunk_size=100_000, whiten=False,
+                 n_oversamples=10, n_iter=4, random_state=None):
+        self.n_components = n_components
+        self.solver = solver
+        self.chunk_size = chunk_size
+        self.whiten = whiten
+        self.n_oversamples = n_oversamples
+        self.n_iter = n_iter
+        self.random_state = random_state
+
+    def _solver(self, n_features):
+        if self.solver == "auto":
+            return "covariance" if n_features <= 1000 else "randomized"
+        if self.solver not in ("covariance", "randomized"):
+            raise ValueError(f"Unknown solver {self.solver!r}")
+        return self.solver
+
+    def fit(self, X, y=None):
+        X = np.asarray(X)
+        for attribute in ("n_samples_seen_", "_shift", "_sum", "_gram"):
+            self.__dict__.pop(attribute, None)
+        if self._solver(X.shape[1]) == "randomized":
+            return self._fit_randomized(X)
+        return self.partial_fit(X)
+
+    def partial_fit(self, X, y=None):
+        """Add the rows of ``X`` to the covariance and refresh the components."""
+        X = np.asarray(X)
+        if not hasattr(self, "n_samples_seen_"):
+            self.n_features_in_ = X.shape[1]
+            # sums are taken around a reference point for numerical stability
+            self._shift = X[:min(len(X), 1000)].mean(axis=0, dtype=np.float64)
+            self._sum = np.zeros(X.shape[1])
+            self._gram = np.zeros((X.shape[1], X.shape[1]))
+            self.n_samples_seen_ = 0
+        elif X.shape[1] != self.n_features_in_:
+            raise ValueError("X has a different number of features than seen before")
+        for start in range(0, len(X), self.chunk_size):
+            chunk = np.subtract(X[start:start + self.chunk_size], self._shift, dtype=np.float64)
+            self._sum += chunk.sum(axis=0)
+            self._gram += chunk.T @ chunk
+        self.n_samples_seen_ += len(X)
+        self._fit_covariance()
+        return self
+
+    def _fit_covariance(self):
+        n = self.n_samples_seen_
+        mean_offset = self._sum / n
+        covariance = (self._gram - n * np.outer(mean_offset, mean_offset)) / (n - 1)
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        self._set_components(self._shift + mean_offset, np.clip(eigenvalues[::-1], 0, None),
+                             eigenvectors[:, ::-1].T, covariance.trace(), n)
+
+    def _fit_randomized(self, X):
+        from sklearn.utils.extmath import randomized_svd
+
+        n, d = X.shape
+        self.n_features_in_ = d
+        mean = X.mean(axis=0, dtype=np.float64)
+        centred = X - mean
+        total_variance = centred.var(axis=0, ddof=1).sum()
+        target = self.n_components
+        k = int(target) if target >= 1 else min(d, max(2, int(np.ceil(target * d / 4))))
+        while True:
+            _, singular_values, components = randomized_svd(
+                centred, int(k), n_oversamples=self.n_oversamples, n_iter=self.n_iter,
+                random_state=self.random_state)
+            variance = singular_values ** 2 / (n - 1)
+            # stop when the target is reached inside the computed components
+            if target >= 1 or variance.sum() > target * total_variance or k >= d:
+                break
+            k = min(d, 2 * k)
+        self.n_samples_seen_ = n
+        self._set_components(mean, variance, components, total_variance, n)
+        return self
+
+    def _set_components(self, mean, variance, components, total_variance, n_samples):
+        ratio = variance / total_variance if total_variance > 0 else np.zeros_like(variance)
+        if self.n_components >= 1:
+            k = int(self.n_components)
+            if k > len(variance):
+                raise ValueError(f"n_components={k} exceeds the {len(variance)} available")
+        else:
+            k = _n_for_target(ratio, self.n_components)
+        self.mean_ = mean
+        self.n_samples_ = n_samples
+        self.n_components_ = k
+        self.components_ = np.ascontiguousarray(_flip_signs(components[:k]))
+        self.explained_variance_ = variance[:k]
+        self.explained_variance_ratio_ = ratio[:k]
+        self.singular_values_ = np.sqrt(variance[:k] * (n_samples - 1))
+        # probabilistic PCA noise: mean variance of the discarded directions
+        discarded = min(self.n_features_in_, n_samples) - k
+        remaining = max(total_variance - variance[:k].sum(), 0.0)
+        self.noise_variance_ = remaining / discarded if discarded > 0 else 0.0
+
+    def transform(self, X):
+        check_is_fitted(self, "components_")
+        X = np.asarray(X)
+        projection = self.components_.T
+        if self.whiten:
+            projection = projection / np.sqrt(self.explained_variance_)
+        out = np.empty((len(X), self.n_components_))
+        for start in range(0, len(X), self.chunk_size):
+            chunk = X[start:start + self.chunk_size]
+            out[start:start + len(chunk)] = (chunk - self.mean_) @ projection
+        return out
+
+    def inverse_transform(self, X):
+        check_is_fitted(self, "components_")
+        X = np.asarray(X)
+        if self.whiten:
+            X = X * np.sqrt(self.explained_variance_)
+        return X @ self.components_ + self.mean_
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray([f"streamingpca{i}" for i in range(self.n_components_)], dtype=object)
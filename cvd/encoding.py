@@ -0,0 +1,102 @@
+"""Declarative categorical encoding for the BRFSS 2021 survey frame.
+
+Every ordinal/binary mapping that used to live in a ``query_*`` SQL CASE
+statement is listed once in ``ENCODING_TABLE`` (defined in ``cvd.schema``);
+the position of a category in its list is the integer code it receives.
+``BRFSSEncoder`` applies the whole table in a single vectorized pass using
+pandas categorical codes.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+# the tables live in the dependency-free cvd.schema (shared with the numpy-only
+# scoring runtime) and are re-exported here
+from cvd.schema import DERIVED_COLUMNS, ENCODING_TABLE, PASSTHROUGH_COLUMNS  # noqa: F401
+
+
+def encode_column(values, categories) -> pd.Series:
+    """Map ``values`` to the position of each value in ``categories``.
+
+    Values outside ``categories`` become NaN, mirroring the NULL a CASE
+    statement without an ELSE branch produces; in that case the result is
+    float64, otherwise int64.
+    """
+    series = pd.Series(values)
+    codes = pd.Categorical(series, categories=categories).codes.astype(np.int64)
+    if (codes < 0).any():
+        codes = np.where(codes < 0, np.nan, codes)
+    return pd.Series(codes, index=series.index, name=series.name)
+
+
+class BRFSSEncoder(BaseEstimator, TransformerMixin):
+    """Fit/transform encoder equivalent to the ``query_*`` SQL mappings.
+
+    Parameters
+    ----------
+    mappings : dict, optional
+        Column -> ordered categories. Defaults to ``ENCODING_TABLE``.
+    derived : dict, optional
+        Derived column -> (added columns, subtracted columns). Defaults to
+        ``DERIVED_COLUMNS``.
+    passthrough : list, optional
+        Columns copied through unchanged. Defaults to ``PASSTHROUGH_COLUMNS``.
+    """
+
+    def __init__(self, mappings=None, derived=None, passthrough=None):
+        self.mappings = mappings
+        self.derived = derived
+        self.passthrough = passthrough
+
+    def fit(self, X, y=None):
+        self.mappings_ = dict(ENCODING_TABLE if self.mappings is None else self.mappings)
+        self.derived_ = dict(DERIVED_COLUMNS if self.derived is None else self.derived)
+        self.passthrough_ = list(
+            PASSTHROUGH_COLUMNS if self.passthrough is None else self.passthrough
+        )
+
+        required = list(self.mappings_) + self.passthrough_
+        for added, subtracted in self.derived_.values():
+            required += list(added) + list(subtracted)
+        missing = [column for column in required if column not in X.columns]
+        if missing:
+            raise KeyError(f"Columns missing from input frame: {missing}")
+
+        # categories seen during fit that the table does not know about
+        self.unknown_categories_ = {}
+        for column, categories in self.mappings_.items():
+            seen = pd.unique(X[column].dropna())
+            unknown = sorted(set(seen) - set(categories))
+            if unknown:
+                self.unknown_categories_[column] = unknown
+
+        self.feature_names_out_ = (
+            list(self.mappings_) + list(self.derived_) + self.passthrough_
+        )
+        return self
+
+    def transform(self, X):
+        columns = {}
+        for column, categories in self.mappings_.items():
+            columns[column] = encode_column(X[column], categories).to_numpy()
+        for column, (added, subtracted) in self.derived_.items():
+            total = X[added[0]].to_numpy()
+            for name in added[1:]:
+                total = total + X[name].to_numpy()
+            for name in subtracted:
+                total = total - X[name].to_numpy()
+            columns[column] = total
+        for column in self.passthrough_:
+            columns[column] = X[column].to_numpy()
+        return pd.DataFrame(columns, index=X.index)[self.feature_names_out_]
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(self.feature_names_out_, dtype=object)
+
+
+def encode_brfss_2021(frame: pd.DataFrame) -> pd.DataFrame:
+    """Encode a raw ``CVD_cleaned.csv`` frame with the default table."""
+    return BRFSSEncoder().fit_transform(frame)
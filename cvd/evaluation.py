@@ -0,0 +1,226 @@
+"""Every binary-classification metric from one sort of the predicted scores.
+
+``confusion_matrix``, ``classification_report``, ``roc_curve`` and
+``precision_recall_curve`` each rescan the predictions, and looking at a
+different decision threshold means predicting again. ``ThresholdSweep``
+sorts the positive-class probabilities once and takes cumulative sums of
+the labels, which gives the confusion counts at every distinct threshold in
+one vectorized pass. Confusion matrices, precision/recall/F1, the
+classification report, ROC and PR curves, AUC/AP and the threshold that
+meets a sensitivity/specificity target are all read off those counts.
+
+Example::
+
+    sweep = ThresholdSweep(y_test, model.predict_proba(X_test)[:, 1])
+    sweep.confusion_matrix()                  # == confusion_matrix(y_test, model.predict(X_test))
+    threshold = sweep.threshold_for(min_recall=0.8)
+    print(sweep.classification_report(threshold))
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+# numpy < 2.0 only has ``trapz``
+_trapezoid = getattr(np, "trapezoid", None) or np.trapz
+
+
+class ThresholdSweep:
+    """Confusion counts of a binary scorer at every distinct threshold.
+
+    A row is predicted positive when its score is above the threshold
+    (``score > threshold``, which is how ``predict`` relates to
+    ``predict_proba`` at 0.5); ``inclusive=True`` switches to ``>=``.
+
+    Parameters
+    ----------
+    y_true : array-like
+    scores : array-like
+        Positive-class probabilities (or any score, higher = more positive).
+    pos_label : default=1
+    labels : tuple, optional
+        ``(negative, positive)`` labels for reports; inferred from ``y_true``.
+    """
+
+    def __init__(self, y_true, scores, pos_label=1, labels=None):
+        y_true = np.asarray(y_true)
+        scores = np.asarray(scores, dtype=np.float64)
+        if scores.ndim == 2:
+            scores = scores[:, -1]
+        if len(y_true) != len(scores):
+            raise ValueError("y_true and scores have different lengths")
+        if labels is None:
+            present = [label for label in np.unique(y_true) if label != pos_label]
+            labels = (present[0] if present else 0, pos_label)
+        self.labels = tuple(labels)
+        self.pos_label = pos_label
+
+        order = np.argsort(-scores, kind="mergesort")
+        sorted_scores = scores[order]
+        positive = (y_true[order] == pos_label).astype(np.int64)
+        # the last row of every run of equal scores closes a threshold
+        last = np.r_[np.flatnonzero(np.diff(sorted_scores)), len(scores) - 1]
+        if not len(scores):
+            last = np.empty(0, dtype=np.int64)
+        self.thresholds = sorted_scores[last]  # descending
+        self.tp = np.cumsum(positive)[last]
+        self.fp = (last + 1) - self.tp
+        self.n_pos = int(positive.sum())
+        self.n_neg = len(scores) - self.n_pos
+
+    def __len__(self):
+        return self.n_pos + self.n_neg
+
+    def counts(self, threshold=0.5, inclusive=False):
+        """``(tp, fp, fn, tn)`` at one threshold (no rescan of the data)."""
+        descending = -self.thresholds
+        k = np.searchsorted(descending, -threshold, side="right" if inclusive else "left")
+        tp = int(self.tp[k - 1]) if k else 0
+        fp = int(self.fp[k - 1]) if k else 0
+        return tp, fp, self.n_pos - tp, self.n_neg - fp
+
+    def confusion_matrix(self, threshold=0.5, inclusive=False):
+        """``[[tn, fp], [fn, tp]]``, like ``sklearn.metrics.confusion_matrix``."""
+        tp, fp, fn, tn = self.counts(threshold, inclusive)
+        return np.array([[tn, fp], [fn, tp]])
+
+    def metrics(self, threshold=0.5, inclusive=False):
+        """Accuracy, precision, recall, specificity, F1, ... at one threshold."""
+        return _metrics(*(np.asarray(c) for c in self.counts(threshold, inclusive)))
+
+    def table(self):
+        """The full sweep: one row per distinct threshold, with all metrics.
+
+        Row ``i`` predicts positive every score ``>= thresholds[i]``.
+        """
+        frame = pd.DataFrame({
+            "threshold": self.thresholds,
+            "tp": self.tp,
+            "fp": self.fp,
+            "fn": self.n_pos - self.tp,
+            "tn": self.n_neg - self.fp,
+        })
+        for name, values in _metrics(frame["tp"].to_numpy(), frame["fp"].to_numpy(),
+                                     frame["fn"].to_numpy(), frame["tn"].to_numpy()).items():
+            frame[name] = values
+        return frame
+
+    def roc_curve(self):
+        """``(fpr, tpr, thresholds)`` like ``sklearn.metrics.roc_curve``
+        (``drop_intermediate=False``)."""
+        tpr = np.r_[0, self.tp] / max(self.n_pos, 1)
+        fpr = np.r_[0, self.fp] / max(self.n_neg, 1)
+        return fpr, tpr, np.r_[np.inf, self.thresholds]
+
+    def precision_recall_curve(self):
+        """``(precision, recall, thresholds)`` in increasing-threshold order,
+        like ``sklearn.metrics.precision_recall_curve``
+        (``drop_intermediate=False``): one point per distinct score, then
+        ``(1, 0)``. Without positives recall is 1 everywhere, as in sklearn."""
+        precision = self.tp / np.maximum(self.tp + self.fp, 1)
+        recall = self.tp / self.n_pos if self.n_pos else np.ones(len(self.tp))
+        return np.r_[precision[::-1], 1], np.r_[recall[::-1], 0], self.thresholds[::-1]
+
+    def roc_auc(self):
+        fpr, tpr, _ = self.roc_curve()
+        return float(_trapezoid(tpr, fpr))
+
+    def average_precision(self):
+        """Step-wise area under the PR curve, like ``average_precision_score``."""
+        precision, recall, _ = self.precision_recall_curve()
+        return float(-np.sum(np.diff(recall) * precision[:-1]))
+
+    def best_threshold(self, metric="f1"):
+        """Threshold maximizing a ``table()`` column (e.g. ``"f1"``,
+        ``"balanced_accuracy"`` or ``"youden"``); used with ``inclusive=True``."""
+        values = self.table()[metric].to_numpy()
+        return float(self.thresholds[int(np.nanargmax(values))])
+
+    def threshold_for(self, min_recall=None, min_specificity=None, min_precision=None):
+        """Threshold meeting the targets with the fewest positives predicted.
+
+        Returns the highest threshold whose recall/specificity/precision meet
+        every given minimum (to be used with ``inclusive=True``), or ``None``.
+        """
+        table = self.table()
+        ok = np.ones(len(table), dtype=bool)
+        for column, minimum in (("recall", min_recall), ("specificity", min_specificity),
+                                ("precision", min_precision)):
+            if minimum is not None:
+                ok &= table[column].to_numpy() >= minimum
+        if not ok.any():
+            return None
+        return float(self.thresholds[int(np.argmax(ok))])
+
+    def classification_report(self, threshold=0.5, inclusive=False, target_names=None,
+                              digits=2):
+        """Text report laid out like ``sklearn.metrics.classification_report``."""
+        tp, fp, fn, tn = self.counts(threshold, inclusive)
+        # per class: (precision, recall, f1, support); class 0 sees the flipped matrix
+        rows = [_class_scores(tn, fn, fp), _class_scores(tp, fp, fn)]
+        names = [str(label) for label in (target_names or self.labels)]
+        total = len(self)
+        supports = np.array([row[3] for row in rows])
+        macro = [np.mean([row[i] for row in rows]) for i in range(3)]
+        weighted = [np.average([row[i] for row in rows], weights=supports) if total else 0.0
+                    for i in range(3)]
+
+        width = max(max(len(name) for name in names), len("weighted avg"), digits)
+        head = " " * width + " " + "".join(
+            f" {header:>9}" for header in ("precision", "recall", "f1-score", "support"))
+        lines = [head, ""]
+        for name, (precision, recall, f1, support) in zip(names, rows):
+            lines.append(f"{name:>{width}} " + f" {precision:>9.{digits}f}"
+                         f" {recall:>9.{digits}f} {f1:>9.{digits}f} {support:>9}")
+        lines.append("")
+        accuracy = (tp + tn) / total if total else 0.0
+        lines.append(f"{'accuracy':>{width}} " + f" {'':>9} {'':>9}"
+                     f" {accuracy:>9.{digits}f} {total:>9}")
+        for label, (precision, recall, f1) in (("macro avg", macro),
+                                               ("weighted avg", weighted)):
+            lines.append(f"{label:>{width}} " + f" {precision:>9.{digits}f}"
+                         f" {recall:>9.{digits}f} {f1:>9.{digits}f} {total:>9}")
+        return "\n".join(lines) + "\n"
+
+
+def _class_scores(tp, fp, fn):
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1, tp + fn
+
+
+def _metrics(tp, fp, fn, tn):
+    """Vectorized metrics; undefined ratios are 0, like ``zero_division=0``."""
+    tp, fp, fn, tn = (np.asarray(c, dtype=np.float64) for c in (tp, fp, fn, tn))
+
+    def ratio(numerator, denominator):
+        return np.divide(numerator, denominator, out=np.zeros_like(numerator),
+                         where=denominator > 0)
+
+    precision = ratio(tp, tp + fp)
+    recall = ratio(tp, tp + fn)
+    specificity = ratio(tn, tn + fp)
+    return {
+        "accuracy": ratio(tp + tn, tp + fp + fn + tn),
+        "precision": precision,
+        "recall": recall,
+        "specificity": specificity,
+        "fpr": 1 - specificity,
+        "f1": ratio(2 * precision * recall, precision + recall),
+        "balanced_accuracy": (recall + specificity) / 2,
+        "youden": recall + specificity - 1,
+    }
+
+
+def compare_models(sweeps, threshold=0.5, inclusive=False):
+    """One row per model: ROC AUC, average precision and the metrics at
+    ``threshold``; ``sweeps`` maps model names to ``ThresholdSweep``s."""
+    rows = {}
+    for name, sweep in sweeps.items():
+        row = {"roc_auc": sweep.roc_auc(), "average_precision": sweep.average_precision()}
+        row.update({key: float(value) for key, value in
+                    sweep.metrics(threshold, inclusive).items()})
+        rows[name] = row
+    return pd.DataFrame(rows).T
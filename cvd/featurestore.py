@@ -0,0 +1,362 @@
+"""Year-partitioned feature store on one harmonized BRFSS schema.
+
+The 2015 indicators file and ``CVD_cleaned.csv`` code the same questions
+differently (``GenHlth`` 1 = excellent vs ``General_Health`` "Poor" ..
+"Excellent", ``Age`` 1-13 vs age-band labels, ...), so the 2015 data never
+reached modelling. A ``FeatureStore`` maps every survey year onto the
+encoded 2021 columns (``cvd.schema.YEAR_MAPPINGS``; columns a year does not
+ask about are stored as missing, ``-1`` codes / NaN) and keeps one
+partition per year::
+
+    brfss_features/
+        catalog.json      harmonized columns and the partitions
+        year=2015/        a ColumnStore: int8 codes / float32 columns, with
+        year=2021/        per-column null counts and min/max in meta.json
+
+Partitions are rebuilt only when their source store changes. ``scan``
+pushes down the work: it skips years that were not asked for, skips
+partitions whose recorded min/max cannot satisfy the filters, and reads
+(memory-mapped) only the requested and filtered columns, returning a
+compact ``FeatureMatrix``. ``column_stats`` merges the cached per-partition
+``ColumnStats`` for the EDA reports without touching the rows.
+
+Example::
+
+    features = FeatureStore("brfss_features")
+    features.add_partition("2015", store_2015)
+    features.add_partition("2021", store_2021)
+    X = features.scan(features.available_columns(), years=["2015", "2021"],
+                      filters=[("Age_Category", ">=", "45-49")], year_column="Survey_Year")
+
+Command line (``python -m cvd features`` is the same)::
+
+    python -m cvd.featurestore brfss_features --2021 CVD_cleaned.csv \\
+        --2015 heart_disease_health_indicators_BRFSS2015.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import operator
+import os
+
+import numpy as np
+import pandas as pd
+from joblib import hash as joblib_hash
+
+from cvd.ingest import ENCODED_2021_COLUMNS, SCHEMAS, ColumnStore, StoreWriter, load_or_ingest
+from cvd.matrix import FeatureMatrix
+from cvd.schema import ENCODING_TABLE, YEAR_MAPPINGS
+
+CATALOG_FILE = "catalog.json"
+CATALOG_VERSION = 1
+
+# harmonized column -> ordered categories (int8 codes) or a numpy dtype name
+HARMONIZED_SCHEMA = {
+    column: ENCODING_TABLE.get(column, "float32") for column in ENCODED_2021_COLUMNS
+}
+
+_COMPARISONS = {"==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le,
+                ">": operator.gt, ">=": operator.ge}
+
+
+def _harmonize(source, mapping, schema, start, stop):
+    """One chunk of ``source`` rows as ``{harmonized column: array}``."""
+    arrays = {}
+    for column, spec in schema.items():
+        categorical = isinstance(spec, (list, tuple))
+        if mapping is None:
+            if column in source.columns:
+                arrays[column] = source.array(column)[start:stop]
+                continue
+            entry = None
+        else:
+            entry = mapping.get(column)
+        n_rows = min(stop, len(source)) - start
+        if entry is None:
+            arrays[column] = np.full(n_rows, -1 if categorical else np.nan,
+                                     dtype=np.int8 if categorical else spec)
+            continue
+        source_column, codes = entry
+        values = source.array(source_column)[start:stop]
+        if codes is None:
+            arrays[column] = values.astype(spec)
+            continue
+        # lookup table over the source values; unmapped values become -1
+        values = np.nan_to_num(values.astype(np.float64), nan=-1).astype(np.int64)
+        low = min(min(codes), int(values.min(initial=0)))
+        table = np.full(max(max(codes), int(values.max(initial=0))) - low + 1, -1, np.int8)
+        table[np.asarray(list(codes)) - low] = list(codes.values())
+        arrays[column] = table[values - low]
+    return arrays
+
+
+class FeatureStore:
+    """Harmonized survey years, one ``ColumnStore`` partition per year.
+
+    Parameters
+    ----------
+    path : str
+        Directory of the store; created on the first ``add_partition``.
+    schema : dict, optional
+        Harmonized column -> categories or dtype; ``HARMONIZED_SCHEMA``.
+    """
+
+    def __init__(self, path, schema=None):
+        self.path = path
+        self.schema = dict(HARMONIZED_SCHEMA if schema is None else schema)
+        self.catalog = {"version": CATALOG_VERSION, "partitions": {}}
+        catalog_path = os.path.join(path, CATALOG_FILE)
+        if os.path.exists(catalog_path):
+            with open(catalog_path) as handle:
+                catalog = json.load(handle)
+            # a catalog of another schema is rebuilt partition by partition
+            if (catalog.get("version") == CATALOG_VERSION
+                    and catalog.get("schema") == self._schema_json()):
+                self.catalog = catalog
+
+    @property
+    def columns(self):
+        return list(self.schema)
+
+    @property
+    def years(self):
+        return sorted(self.catalog["partitions"])
+
+    def partition(self, year):
+        """The ``ColumnStore`` of one year."""
+        return ColumnStore(os.path.join(self.path, self.catalog["partitions"][year]["path"]))
+
+    def _schema_json(self):
+        return {column: spec if isinstance(spec, str) else list(spec)
+                for column, spec in self.schema.items()}
+
+    def _write_catalog(self):
+        self.catalog["schema"] = self._schema_json()
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = os.path.join(self.path, CATALOG_FILE + ".tmp")
+        with open(tmp_path, "w") as handle:
+            json.dump(self.catalog, handle, indent=2)
+        os.replace(tmp_path, os.path.join(self.path, CATALOG_FILE))
+
+    def add_partition(self, year, source, mapping=None, chunk_size=1_000_000):
+        """Harmonize a year's ``ColumnStore`` into its partition.
+
+        ``mapping`` defaults to ``YEAR_MAPPINGS[year]``. Nothing is written
+        when the partition was already built from the same source.
+        """
+        year = str(year)
+        mapping = YEAR_MAPPINGS.get(year) if mapping is None else mapping
+        fingerprint = joblib_hash((source.meta.get("fingerprint"), mapping, self.schema))
+        entry = self.catalog["partitions"].get(year)
+        if entry is not None and entry["fingerprint"] == fingerprint:
+            return self.partition(year)
+
+        path = f"year={year}"
+        dtypes = {column: np.int8 if isinstance(spec, (list, tuple)) else spec
+                  for column, spec in self.schema.items()}
+        categories = {column: spec for column, spec in self.schema.items()
+                      if isinstance(spec, (list, tuple))}
+        os.makedirs(self.path, exist_ok=True)
+        writer = StoreWriter(os.path.join(self.path, path), dtypes, categories)
+        try:
+            for start in range(0, len(source), chunk_size):
+                writer.append(_harmonize(source, mapping, self.schema, start,
+                                         start + chunk_size))
+        except BaseException:
+            writer.abort()
+            raise
+        partition = writer.close(source=source.path, year=year, fingerprint=fingerprint)
+        self.catalog["partitions"][year] = {"path": path, "fingerprint": fingerprint,
+                                            "n_rows": len(partition)}
+        self._write_catalog()
+        return partition
+
+    def _years(self, years):
+        if years is None:
+            return self.years
+        missing = [str(year) for year in years if str(year) not in self.catalog["partitions"]]
+        if missing:
+            raise KeyError(f"no partitions for {missing}; available: {self.years}")
+        return [str(year) for year in years]
+
+    def partition_stats(self, years=None):
+        """Rows, nulls and min/max of every column of every partition."""
+        rows = []
+        for year in self._years(years):
+            partition = self.partition(year)
+            for column in self.columns:
+                stats = partition.column_stats(column)
+                rows.append({"year": year, "column": column, "rows": len(partition), **stats})
+        return pd.DataFrame(rows)
+
+    def available_columns(self, years=None):
+        """Columns with at least one value in every selected partition."""
+        partitions = [self.partition(year) for year in self._years(years)]
+        return [column for column in self.columns
+                if all(p.column_stats(column).get("nulls", 0) < len(p) for p in partitions)]
+
+    def _code(self, column, value):
+        spec = self.schema[column]
+        if isinstance(spec, (list, tuple)) and isinstance(value, str):
+            return spec.index(value)
+        return value
+
+    def _filters(self, filters):
+        """``(column, op, value)`` triples with labels turned into codes."""
+        parsed = []
+        for column, op, value in filters or ():
+            if op in ("in", "not in"):
+                value = [self._code(column, v) for v in value]
+            elif op in _COMPARISONS:
+                value = self._code(column, value)
+            else:
+                raise ValueError(f"Unknown filter operator {op!r}")
+            parsed.append((column, op, value))
+        return parsed
+
+    @staticmethod
+    def _may_match(stats, n_rows, op, value):
+        """Whether a partition with these column stats can satisfy a filter."""
+        if stats.get("nulls", 0) >= n_rows:
+            return False  # missing values never match
+        low, high = stats.get("min"), stats.get("max")
+        if low is None:
+            return True
+        if op == "in":
+            return any(low <= v <= high for v in value)
+        if op == "not in":
+            return not (low == high and low in value)
+        if op == "==":
+            return low <= value <= high
+        if op == "!=":
+            return not (low == high == value)
+        if op in ("<", "<="):
+            return _COMPARISONS[op](low, value)
+        return _COMPARISONS[op](high, value)
+
+    def prune(self, years=None, filters=None):
+        """The selected years whose partition statistics may match ``filters``."""
+        filters = self._filters(filters)
+        kept = []
+        for year in self._years(years):
+            partition = self.partition(year)
+            if all(self._may_match(partition.column_stats(column), len(partition), op, value)
+                   for column, op, value in filters):
+                kept.append(year)
+        return kept
+
+    def _mask(self, partition, filters, start, stop):
+        mask = np.ones(min(stop, len(partition)) - start, dtype=bool)
+        for column, op, value in filters:
+            values = partition.array(column)[start:stop]
+            categorical = isinstance(self.schema[column], (list, tuple))
+            present = values >= 0 if categorical else ~np.isnan(values)
+            if op in ("in", "not in"):
+                matched = np.isin(values, value)
+                mask &= present & (matched if op == "in" else ~matched)
+            else:
+                mask &= present & _COMPARISONS[op](values, value)
+        return mask
+
+    def scan(self, columns=None, years=None, filters=None, year_column=None,
+             chunk_size=1_000_000):
+        """Rows of the selected years matching ``filters``, as a ``FeatureMatrix``.
+
+        Parameters
+        ----------
+        columns : list of str, optional
+            Harmonized columns to read (default all).
+        years : list, optional
+            Partitions to read (default all).
+        filters : list of (column, op, value), optional
+            ANDed conditions; ``op`` is one of ``== != < <= > >= in``,
+            ``not in`` and categorical values may be given as labels.
+            Missing values never match.
+        year_column : str, optional
+            Add the survey year as a column of this name.
+        """
+        columns = self.columns if columns is None else list(columns)
+        filters = self._filters(filters)
+        selections = []
+        for year in self.prune(years, filters):
+            partition = self.partition(year)
+            if filters:
+                rows = np.concatenate([
+                    start + np.flatnonzero(self._mask(partition, filters, start,
+                                                      start + chunk_size))
+                    for start in range(0, len(partition), chunk_size)
+                ] or [np.empty(0, np.int64)])
+            else:
+                rows = slice(None)
+            selections.append((year, partition, rows))
+
+        names = columns + ([year_column] if year_column else [])
+        codes = [c for c in columns if isinstance(self.schema[c], (list, tuple))]
+        sizes = [len(p) if isinstance(rows, slice) else len(rows) for _, p, rows in selections]
+        matrix = FeatureMatrix.empty(sum(sizes), names, codes,
+                                     {c: list(self.schema[c]) for c in codes})
+        offset = 0
+        for (year, partition, rows), size in zip(selections, sizes):
+            block = slice(offset, offset + size)
+            for column in columns:
+                matrix[column][block] = partition.array(column)[rows]
+            if year_column:
+                matrix[year_column][block] = int(year)
+            offset += size
+        return matrix
+
+    def column_stats(self, years=None):
+        """``ColumnStats`` of the selected partitions, merged (cached per partition)."""
+        from cvd.stats import ColumnStats
+
+        total = ColumnStats()
+        for year in self._years(years):
+            total.merge(ColumnStats.for_store(self.partition(year)))
+        return total
+
+    def fingerprint(self, years=None):
+        """Identity of the selected partitions' contents (for cache keys)."""
+        return joblib_hash([(year, self.catalog["partitions"][year]["fingerprint"])
+                            for year in self._years(years)])
+
+
+def build(path, sources, raw_path=None):
+    """``FeatureStore`` at ``path`` from ``{year: csv path}``.
+
+    Each CSV is ingested (or reused) as a raw column store under
+    ``raw_path`` (default ``<path>/raw``) and harmonized into its partition.
+    """
+    features = FeatureStore(path)
+    raw_path = raw_path or os.path.join(path, "raw")
+    for year, csv_path in sources.items():
+        schema, derived = SCHEMAS[str(year)]
+        source = load_or_ingest(csv_path, os.path.join(raw_path, str(year)), schema, derived)
+        features.add_partition(year, source)
+    return features
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the year-partitioned feature store.")
+    parser.add_argument("path", help="feature store directory")
+    for year in SCHEMAS:
+        parser.add_argument(f"--{year}", dest=f"csv_{year}", metavar="CSV",
+                            help=f"BRFSS {year} CSV")
+    args = parser.parse_args(argv)
+
+    sources = {year: getattr(args, f"csv_{year}") for year in SCHEMAS
+               if getattr(args, f"csv_{year}")}
+    if not sources:
+        parser.error("give at least one survey CSV")
+    features = build(args.path, sources)
+    stats = features.partition_stats()
+    nulls = stats.pivot_table(index="column", columns="year", values="nulls", sort=False)
+    print(nulls.astype(np.int64).rename(columns=lambda year: f"nulls {year}").to_string())
+    sizes = [f"{year} ({len(features.partition(year)):,} rows)" for year in features.years]
+    print(f"\npartitions: {', '.join(sizes)}")
+    print(f"columns available in every year: {features.available_columns()}")
+
+
+if __name__ == "__main__":
+    main()
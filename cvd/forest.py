@@ -0,0 +1,215 @@
+"""Flat-array export and vectorized inference for fitted random forests.
+
+``FlatForest.from_sklearn`` copies every tree of a fitted binary
+``RandomForestClassifier`` into two contiguous arrays:
+
+* ``nodes`` - one int64 word per node packing the left child index (high 32
+  bits), the split feature (16 bits) and the quantized threshold (low 16
+  bits). Nodes are renumbered breadth-first so the right child is always
+  ``left + 1``; leaves point at themselves with threshold ``LEAF``, so
+  traversal needs no leaf test.
+* ``value`` - positive-class probability of each leaf (float32).
+
+Thresholds are quantized exactly: ``bin_edges[f]`` holds the sorted distinct
+thresholds the forest uses for feature ``f``, a sample is binned once per
+feature with ``searchsorted`` and ``x <= t_j`` becomes ``bin(x) <= j``.
+Traversal advances all (sample, tree) pairs one level per step with a
+couple of integer gathers, dropping pairs that reached a leaf every few
+levels.
+
+Models with missing values in the input are not supported.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+LEAF = 0xFFFF  # threshold of leaf nodes; real bin ids are always smaller
+COMPACT_EVERY = 8  # levels between removing finished (sample, tree) pairs
+
+
+def _breadth_first_order(left, right, roots):
+    """New ids for every node such that siblings are adjacent (right = left + 1).
+
+    Returns ``(order, new_left)`` where ``order[new_id] = old_id`` and
+    ``new_left[old_id]`` is the new id of the node's left child (itself for
+    leaves).
+    """
+    n_nodes = len(left)
+    is_leaf = left < 0
+    new_id = np.empty(n_nodes, dtype=np.int64)
+    new_left = np.empty(n_nodes, dtype=np.int64)
+    new_id[roots] = np.arange(len(roots))
+    next_id = len(roots)
+    frontier = np.asarray(roots, dtype=np.int64)
+    while len(frontier):
+        internal = frontier[~is_leaf[frontier]]
+        children = np.stack([left[internal], right[internal]], axis=1).ravel()
+        new_id[children] = next_id + np.arange(len(children))
+        new_left[internal] = next_id + 2 * np.arange(len(internal))
+        next_id += len(children)
+        frontier = children
+    new_left[is_leaf] = new_id[is_leaf]
+    order = np.empty(n_nodes, dtype=np.int64)
+    order[new_id] = np.arange(n_nodes)
+    return order, new_left
+
+
+class FlatForest:
+    """Forest stored as flat node arrays; see the module docstring."""
+
+    def __init__(self, nodes, value, n_trees, bin_edges, classes, max_depth):
+        self.nodes = nodes
+        self.value = value
+        self.n_trees = n_trees
+        self.bin_edges = bin_edges
+        self.classes_ = classes
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Export a fitted binary ``RandomForestClassifier``."""
+        if len(forest.classes_) != 2:
+            raise ValueError("FlatForest only supports binary classifiers")
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+
+        sizes = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        shift = np.repeat(offsets, sizes)
+        left = np.concatenate([tree.children_left for tree in trees])
+        right = np.concatenate([tree.children_right for tree in trees])
+        is_leaf = left < 0
+        left = np.where(is_leaf, -1, left + shift)
+        right = np.where(is_leaf, -1, right + shift)
+        feature = np.concatenate([tree.feature for tree in trees])
+        threshold = np.concatenate([tree.threshold for tree in trees])
+        values = np.concatenate([tree.value[:, 0, :] for tree in trees])
+
+        # sorted distinct thresholds per feature; node thresholds become bin ids
+        bins = np.full(len(feature), LEAF, dtype=np.int64)
+        bin_edges = []
+        for f in range(forest.n_features_in_):
+            used = (feature == f) & ~is_leaf
+            edges = np.unique(threshold[used])
+            if len(edges) >= LEAF:
+                raise ValueError(f"Feature {f} has too many distinct thresholds for 16-bit bins")
+            bin_edges.append(edges)
+            bins[used] = np.searchsorted(edges, threshold[used])
+
+        order, new_left = _breadth_first_order(left, right, offsets)
+        feature = np.where(is_leaf, 0, feature).astype(np.int64)
+        nodes = (new_left << 32) | (feature << 16) | bins
+        return cls(
+            nodes=nodes[order],
+            value=(values[:, 1] / values.sum(axis=1)).astype(np.float32)[order],
+            n_trees=len(trees),
+            bin_edges=bin_edges,
+            classes=np.asarray(forest.classes_),
+            max_depth=max(tree.max_depth for tree in trees),
+        )
+
+    @property
+    def n_nodes(self):
+        return len(self.nodes)
+
+    @property
+    def nbytes(self):
+        return self.nodes.nbytes + self.value.nbytes + sum(e.nbytes for e in self.bin_edges)
+
+    def transform_bins(self, X):
+        """Bin ids of ``X``, comparable with the quantized node thresholds."""
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if np.isnan(X).any():
+            raise ValueError("FlatForest does not support missing values")
+        binned = np.empty(X.shape, dtype=np.int64)
+        for f, edges in enumerate(self.bin_edges):
+            binned[:, f] = np.searchsorted(edges, X[:, f], side="left")
+        return binned
+
+    def apply(self, X):
+        """Leaf index reached in every tree, shape ``(n_samples, n_trees)``."""
+        binned = self.transform_bins(X)
+        n_samples, n_features = binned.shape
+        flat_bins = binned.ravel()
+        # roots are nodes 0 .. n_trees - 1
+        current = np.tile(np.arange(self.n_trees, dtype=np.int64), n_samples)
+        row_start = np.repeat(np.arange(n_samples, dtype=np.int64) * n_features, self.n_trees)
+        leaves = np.empty(n_samples * self.n_trees, dtype=np.int64)
+        pending = np.arange(len(current))
+
+        for depth in range(self.max_depth):
+            word = self.nodes[current]
+            if depth and depth % COMPACT_EVERY == 0:
+                active = (word & 0xFFFF) != LEAF
+                leaves[pending] = current
+                pending, current = pending[active], current[active]
+                row_start, word = row_start[active], word[active]
+                if not len(current):
+                    break
+            go_right = flat_bins[row_start + ((word >> 16) & 0xFFFF)] > (word & 0xFFFF)
+            current = (word >> 32) + go_right
+        leaves[pending] = current
+        return leaves.reshape(n_samples, self.n_trees)
+
+    def predict_proba(self, X, batch_size=8192, n_jobs=1):
+        """Average of the trees' leaf probabilities, like ``predict_proba``."""
+        X = np.asarray(X)
+        batches = [X[start:start + batch_size] for start in range(0, len(X), batch_size)]
+        if n_jobs == 1:
+            parts = [self.apply(batch) for batch in batches]
+        else:
+            # joblib only when threads are asked for: the scoring runtime
+            # loads this module with numpy alone
+            from joblib import Parallel, delayed
+
+            parts = Parallel(n_jobs=n_jobs, prefer="threads")(
+                delayed(self.apply)(batch) for batch in batches
+            )
+        positive = np.concatenate(
+            [self.value[leaves].astype(np.float64).mean(axis=1) for leaves in parts]
+        ) if parts else np.empty(0)
+        return np.column_stack([1 - positive, positive])
+
+    def predict(self, X, batch_size=8192, n_jobs=1):
+        proba = self.predict_proba(X, batch_size=batch_size, n_jobs=n_jobs)
+        # ties go to the first class, as with sklearn's argmax
+        return self.classes_[(proba[:, 1] > proba[:, 0]).astype(np.intp)]
+
+    def save(self, path, **extra):
+        """Write the arrays to an ``.npz`` (plus any ``extra`` arrays)."""
+        np.savez(
+            path, **extra, nodes=self.nodes, value=self.value, n_trees=self.n_trees,
+            classes=self.classes_, max_depth=self.max_depth,
+            bin_counts=np.array([len(e) for e in self.bin_edges]),
+            bin_edges=np.concatenate(self.bin_edges) if self.bin_edges else np.empty(0),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            bin_edges = np.split(data["bin_edges"], np.cumsum(data["bin_counts"])[:-1])
+            return cls(
+                nodes=data["nodes"], value=data["value"], n_trees=int(data["n_trees"]),
+                bin_edges=bin_edges, classes=data["classes"],
+                max_depth=int(data["max_depth"]),
+            )
+
+
+def compile_estimator(estimator):
+    """``FlatForest`` for a binary random forest, else ``None``.
+
+    ``estimator`` may also be a pipeline whose only steps besides the forest
+    are samplers (e.g. the SMOTE pipelines), since those are skipped at
+    prediction time.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+
+    steps = getattr(estimator, "steps", None)
+    if steps is not None:
+        if any(not hasattr(step, "fit_resample") for _, step in steps[:-1]):
+            return None
+        estimator = steps[-1][1]
+    if isinstance(estimator, RandomForestClassifier) and len(estimator.classes_) == 2:
+        return FlatForest.from_sklearn(estimator)
+    return None
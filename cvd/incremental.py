@@ -0,0 +1,215 @@
+"""Incremental (out-of-core) logistic regression over streamed data chunks.
+
+``LogisticRegression(solver='saga')`` needs all of ``X_train`` in memory and
+restarts from scratch for every grid point. ``IncrementalLogisticRegression``
+instead consumes ``(X, y)`` chunks - e.g. from one or more ``ColumnStore``
+survey years via ``iter_chunks`` - and
+
+* updates a ``StandardScaler`` with running mean/variance
+  (``partial_fit``), re-expressing the models' coefficients in the new
+  scaling so their decision function is unchanged by the update;
+* trains one minibatch-SGD logistic model (``SGDClassifier(loss="log_loss")``)
+  per value of ``C``, with ``alpha = 1 / (C * n_seen)`` so the objective
+  matches ``LogisticRegression``'s. The step size is a constant ``eta0``
+  and the reported solution is the average of the iterates after the first
+  ``average`` samples (averaged SGD): sklearn's ``"optimal"`` schedule,
+  ``1 / (alpha * t)``, takes huge early steps at the tiny ``alpha`` of a
+  few hundred thousand rows and does not recover;
+* fits the ``C`` path with warm starts: each larger ``C`` starts from the
+  previous, more regularized solution.
+
+Adding a survey year is then ``model.partial_fit_stream(iter_chunks(new_year))``
+instead of a full refit. ``to_sklearn`` exports any point of the path as the
+notebook's ``StandardScaler`` + ``LogisticRegression`` pipeline.
+"""
+
+from __future__ import annotations
+
+import copy
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+
+def iter_chunks(sources, feature_columns, target, chunk_size=50_000, shuffle=True,
+                random_state=0):
+    """Yield ``(X, y)`` float64/int chunks from frames or ``ColumnStore``s.
+
+    Chunks are visited in random order (and shuffled within) when
+    ``shuffle`` is set, which SGD needs to converge well.
+    """
+    if not isinstance(sources, (list, tuple)):
+        sources = [sources]
+    rng = np.random.default_rng(random_state)
+    spans = []
+    for source_index, source in enumerate(sources):
+        for start in range(0, len(source), chunk_size):
+            spans.append((source_index, start, min(start + chunk_size, len(source))))
+    if shuffle:
+        rng.shuffle(spans)
+
+    for source_index, start, stop in spans:
+        source = sources[source_index]
+        if hasattr(source, "array"):  # ColumnStore: slice the memory maps
+            X = np.column_stack([source.array(c)[start:stop] for c in feature_columns])
+            y = np.asarray(source.array(target)[start:stop])
+        else:
+            X = source[feature_columns].iloc[start:stop].to_numpy()
+            y = source[target].iloc[start:stop].to_numpy()
+        X = X.astype(np.float64)
+        if shuffle:
+            order = rng.permutation(len(X))
+            X, y = X[order], y[order]
+        yield X, y
+
+
+class IncrementalLogisticRegression:
+    """Streaming logistic regression along a path of ``C`` values.
+
+    Parameters
+    ----------
+    Cs : sequence of float, default=(0.1, 1)
+        Inverse regularization strengths, as in ``LogisticRegression``.
+    penalty : {"l2", "l1", "elasticnet", None}, default="l2"
+    classes : sequence, default=(0, 1)
+    batch_size : int, default=4096
+        SGD minibatch size within a chunk.
+    eta0 : float, default=0.01
+        Constant SGD step size (on standardized features).
+    average : int, default=10_000
+        Average the SGD iterates from this many samples on.
+    random_state : int, default=0
+    """
+
+    def __init__(self, Cs=(0.1, 1), penalty="l2", classes=(0, 1), batch_size=4096,
+                 eta0=0.01, average=10_000, random_state=0):
+        self.Cs = sorted(Cs)
+        self.penalty = penalty
+        self.classes = np.asarray(classes)
+        self.batch_size = batch_size
+        self.eta0 = eta0
+        self.average = average
+        self.random_state = random_state
+        self.scaler_ = StandardScaler()
+        self.models_ = {}
+        self.n_seen_ = 0
+
+    def _new_model(self, C):
+        return SGDClassifier(loss="log_loss", penalty=self.penalty,
+                             alpha=1.0 / (C * max(self.n_seen_, 1)),
+                             learning_rate="constant", eta0=self.eta0, average=self.average,
+                             random_state=self.random_state)
+
+    def _update_scaler(self, X):
+        """Fold ``X`` into the scaler, keeping every model's predictions fixed."""
+        rescale = bool(self.models_) and self.n_seen_ > 0
+        if rescale:
+            old_mean, old_scale = self.scaler_.mean_.copy(), self.scaler_.scale_.copy()
+        self.scaler_.partial_fit(X)
+        self.n_seen_ += len(X)
+        if not rescale:
+            return
+        mean, scale = self.scaler_.mean_, self.scaler_.scale_
+        for model in self.models_.values():
+            raw_coef = model.coef_ / old_scale
+            raw_intercept = model.intercept_ - raw_coef @ old_mean
+            model.coef_ = raw_coef * scale
+            model.intercept_ = raw_intercept + model.coef_ @ (mean / scale)
+
+    def _sgd(self, model, C, X, y):
+        model.set_params(alpha=1.0 / (C * self.n_seen_))
+        for start in range(0, len(X), self.batch_size):
+            stop = start + self.batch_size
+            model.partial_fit(X[start:stop], y[start:stop], classes=self.classes)
+
+    def partial_fit(self, X, y):
+        """Update the scaler and every model of the path with one chunk."""
+        X = np.asarray(X, dtype=np.float64)
+        self._update_scaler(X)
+        return self._train(X, y)
+
+    def _train(self, X, y):
+        """SGD passes of every model over a chunk already counted in the scaler."""
+        X_scaled = self.scaler_.transform(np.asarray(X, dtype=np.float64))
+        y = np.asarray(y)
+        for C in self.Cs:
+            model = self.models_.setdefault(C, self._new_model(C))
+            self._sgd(model, C, X_scaled, y)
+        return self
+
+    def partial_fit_stream(self, chunks, n_epochs=1):
+        """``partial_fit`` on every chunk of an iterable (or chunk factory).
+
+        Pass a zero-argument callable returning a fresh iterator to make
+        more than one epoch. Only the first epoch updates the scaler and
+        ``n_seen_``; later ones revisit the same rows with the same penalty.
+        """
+        for epoch in range(n_epochs):
+            step = self.partial_fit if epoch == 0 else self._train
+            for X, y in (chunks() if callable(chunks) else chunks):
+                step(X, y)
+        return self
+
+    def fit_path(self, chunks, n_epochs=3):
+        """Fit the ``C`` path from scratch with warm starts.
+
+        ``chunks`` is a zero-argument callable returning a fresh iterator of
+        ``(X, y)`` chunks. The scaler is fitted in a first pass; then each
+        ``C`` (smallest first) is initialized from the previous solution and
+        trained for ``n_epochs`` passes.
+        """
+        self.scaler_ = StandardScaler()
+        self.models_ = {}
+        self.n_seen_ = 0
+        for X, _ in chunks():
+            self._update_scaler(np.asarray(X, dtype=np.float64))
+
+        previous = None
+        for C in self.Cs:
+            model = self._new_model(C) if previous is None else copy.deepcopy(previous)
+            for _ in range(n_epochs):
+                for X, y in chunks():
+                    self._sgd(model, C, self.scaler_.transform(np.asarray(X, np.float64)),
+                              np.asarray(y))
+            self.models_[C] = previous = model
+        return self
+
+    def decision_function(self, X, C=None):
+        model = self.models_[self._pick(C)]
+        return model.decision_function(self.scaler_.transform(np.asarray(X, dtype=np.float64)))
+
+    def predict_proba(self, X, C=None):
+        positive = 1.0 / (1.0 + np.exp(-self.decision_function(X, C)))
+        return np.column_stack([1 - positive, positive])
+
+    def predict(self, X, C=None):
+        return self.classes[(self.decision_function(X, C) > 0).astype(np.intp)]
+
+    def score_path(self, X, y, scoring=accuracy_score):
+        """``{C: score}`` on held-out data; also sets ``best_C_``."""
+        scores = {C: scoring(y, self.predict(X, C)) for C in self.Cs}
+        self.best_C_ = max(scores, key=scores.get)
+        return scores
+
+    def _pick(self, C):
+        if C is None:
+            C = getattr(self, "best_C_", self.Cs[-1])
+        if C not in self.models_:
+            raise KeyError(f"C={C} is not on the fitted path {sorted(self.models_)}")
+        return C
+
+    def to_sklearn(self, C=None):
+        """The model at ``C`` as a fitted ``StandardScaler`` + ``LogisticRegression``
+        pipeline with the notebook's step names."""
+        model = self.models_[self._pick(C)]
+        scaler = copy.deepcopy(self.scaler_)
+        logistic = LogisticRegression(C=self._pick(C), max_iter=1000)
+        logistic.coef_ = model.coef_.copy()
+        logistic.intercept_ = model.intercept_.copy()
+        logistic.classes_ = self.classes
+        logistic.n_features_in_ = model.coef_.shape[1]
+        logistic.n_iter_ = np.array([0])
+        return Pipeline([("scaler", scaler), ("logistic_regression", logistic)])
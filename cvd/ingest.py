@@ -0,0 +1,313 @@
+"""Chunked CSV ingestion into a typed, memory-mappable column store.
+
+``pd.read_csv`` on the BRFSS files materializes every column as object or
+float64. ``ingest_csv`` instead streams a CSV in chunks with an explicit
+compact schema and appends each column to its own raw binary file:
+
+* categorical columns are stored as int8 codes in ``ENCODING_TABLE`` order,
+  i.e. encoded like ``BRFSSEncoder``, except that a value outside the table
+  is stored as ``-1`` where ``BRFSSEncoder`` gives NaN (``ColumnStore.frame``
+  returns the codes as stored; ``FeatureMatrix`` rows turn ``-1`` into NaN);
+* numeric columns are stored as float32 or a small integer type;
+* derived columns (``Diet``) are computed per chunk.
+
+A ``meta.json`` written last records the schema, row count, per-column null
+counts and min/max, and a fingerprint of the source file. ``ColumnStore``
+opens the column files with ``np.memmap``, so later runs load the data
+zero-copy, and ``load_or_ingest`` only re-parses the CSV when the source or
+schema changed. ``StoreWriter`` writes stores from any chunked source (the
+year partitions of ``cvd.featurestore`` use it too).
+
+Command line (``python -m cvd ingest`` is the same)::
+
+    python -m cvd.ingest CVD_cleaned.csv brfss_2021_store --schema 2021
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+from joblib import hash as joblib_hash
+
+from cvd.schema import DERIVED_COLUMNS, ENCODING_TABLE, PASSTHROUGH_COLUMNS
+
+STORE_VERSION = 1
+
+# column -> ordered categories (stored as int8 codes) or a numpy dtype name
+BRFSS_2021_SCHEMA = {
+    "General_Health": ENCODING_TABLE["General_Health"],
+    "Checkup": ENCODING_TABLE["Checkup"],
+    "Exercise": ENCODING_TABLE["Exercise"],
+    "Heart_Disease": ENCODING_TABLE["Heart_Disease"],
+    "Skin_Cancer": ENCODING_TABLE["Skin_Cancer"],
+    "Other_Cancer": ENCODING_TABLE["Other_Cancer"],
+    "Depression": ENCODING_TABLE["Depression"],
+    "Diabetes": ENCODING_TABLE["Diabetes"],
+    "Arthritis": ENCODING_TABLE["Arthritis"],
+    "Sex": ENCODING_TABLE["Sex"],
+    "Age_Category": ENCODING_TABLE["Age_Category"],
+    "Height_(cm)": "float32",
+    "Weight_(kg)": "float32",
+    "BMI": "float32",
+    "Smoking_History": ENCODING_TABLE["Smoking_History"],
+    "Alcohol_Consumption": "float32",
+    "Fruit_Consumption": "float32",
+    "Green_Vegetables_Consumption": "float32",
+    "FriedPotato_Consumption": "float32",
+}
+
+# every BRFSS 2015 indicator is a small integer (flags, 1-13 scales, BMI < 100)
+BRFSS_2015_SCHEMA = {
+    column: "int8"
+    for column in [
+        "HeartDiseaseorAttack", "HighBP", "HighChol", "CholCheck", "BMI",
+        "Smoker", "Stroke", "Diabetes", "PhysActivity", "Fruits", "Veggies",
+        "HvyAlcoholConsump", "AnyHealthcare", "NoDocbcCost", "GenHlth",
+        "MentHlth", "PhysHlth", "DiffWalk", "Sex", "Age", "Education", "Income",
+    ]
+}
+
+# the columns (and order) BRFSSEncoder produces for the 2021 frame
+ENCODED_2021_COLUMNS = list(ENCODING_TABLE) + list(DERIVED_COLUMNS) + PASSTHROUGH_COLUMNS
+
+
+def _is_categorical(spec):
+    return isinstance(spec, (list, tuple))
+
+
+def _store_dtype(spec):
+    return np.dtype(np.int8) if _is_categorical(spec) else np.dtype(spec)
+
+
+def _read_dtypes(schema):
+    """dtypes for ``read_csv``; integers are parsed as float and cast later."""
+    dtypes = {}
+    for column, spec in schema.items():
+        if _is_categorical(spec):
+            dtypes[column] = pd.CategoricalDtype(categories=list(spec))
+        elif np.issubdtype(np.dtype(spec), np.integer):
+            dtypes[column] = "float64"
+        else:
+            dtypes[column] = spec
+    return dtypes
+
+
+def _cast(values, dtype, column):
+    """Cast ``values`` to ``dtype``, refusing casts that change any value."""
+    cast = values.astype(dtype)
+    if not np.array_equal(cast.astype(values.dtype), values, equal_nan=True):
+        raise ValueError(f"Column {column!r} does not fit in {dtype} without loss")
+    return cast
+
+
+def encode_chunk(chunk, schema, derived=None):
+    """Convert a parsed CSV chunk into ``{column: compact numpy array}``."""
+    arrays = {}
+    for column, spec in schema.items():
+        values = chunk[column]
+        if _is_categorical(spec):
+            arrays[column] = values.cat.codes.to_numpy().astype(np.int8)
+        else:
+            arrays[column] = _cast(values.to_numpy(), np.dtype(spec), column)
+    for column, (added, subtracted) in (derived or {}).items():
+        total = sum(arrays[name] for name in added)
+        for name in subtracted:
+            total = total - arrays[name]
+        arrays[column] = total.astype(np.float32)
+    return arrays
+
+
+def source_fingerprint(path, schema, derived=None):
+    """Cheap identity of a CSV plus the schema it is ingested with."""
+    stat = os.stat(path)
+    return joblib_hash({
+        "version": STORE_VERSION,
+        "path": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "schema": schema,
+        "derived": derived or {},
+    })
+
+
+class StoreWriter:
+    """Builds a column store from appended chunks of ``{column: array}``.
+
+    The store is written to ``store_path + ".tmp"`` and moved into place by
+    ``close``, which also records each column's null count and min/max
+    (categorical nulls are negative codes, numeric ones NaN) in ``meta.json``.
+
+    Parameters
+    ----------
+    store_path : str
+    dtypes : dict
+        Column -> numpy dtype, in store order.
+    categories : dict, optional
+        Column -> ordered categories of the int8-coded columns.
+    """
+
+    def __init__(self, store_path, dtypes, categories=None):
+        self.store_path = store_path
+        self.tmp_path = store_path + ".tmp"
+        self.dtypes = {name: np.dtype(dtype) for name, dtype in dtypes.items()}
+        self.categories = dict(categories or {})
+        self.n_rows = 0
+        self._stats = {name: [0, np.inf, -np.inf] for name in self.dtypes}
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+        self._files = [open(os.path.join(self.tmp_path, f"{i}.bin"), "wb")
+                       for i in range(len(self.dtypes))]
+
+    def append(self, arrays):
+        for handle, (name, dtype) in zip(self._files, self.dtypes.items()):
+            values = np.asarray(arrays[name], dtype=dtype)
+            values.tofile(handle)
+            present = values >= 0 if name in self.categories else ~np.isnan(values)
+            stats = self._stats[name]
+            stats[0] += len(values) - int(present.sum())
+            if present.any():
+                stats[1] = min(stats[1], values[present].min().item())
+                stats[2] = max(stats[2], values[present].max().item())
+        self.n_rows += len(next(iter(arrays.values()))) if arrays else 0
+
+    def abort(self):
+        for handle in self._files:
+            handle.close()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+    def close(self, **meta):
+        """Write ``meta.json`` (plus ``meta``) and return the ``ColumnStore``."""
+        for handle in self._files:
+            handle.close()
+        columns = []
+        for name, dtype in self.dtypes.items():
+            nulls, low, high = self._stats[name]
+            entry = {"name": name, "dtype": dtype.str}
+            if name in self.categories:
+                entry["categories"] = list(self.categories[name])
+                entry["unknown"] = nulls
+            present = nulls < self.n_rows
+            entry["stats"] = {"nulls": nulls, "min": low if present else None,
+                              "max": high if present else None}
+            columns.append(entry)
+        meta = {"version": STORE_VERSION, **meta, "n_rows": self.n_rows, "columns": columns}
+        with open(os.path.join(self.tmp_path, "meta.json"), "w") as handle:
+            json.dump(meta, handle, indent=2)
+
+        shutil.rmtree(self.store_path, ignore_errors=True)
+        os.replace(self.tmp_path, self.store_path)
+        return ColumnStore(self.store_path)
+
+
+def ingest_csv(csv_path, store_path, schema, derived=None, chunksize=100_000):
+    """Stream ``csv_path`` into a column store at ``store_path``.
+
+    Returns the opened ``ColumnStore``. The store is built in a temporary
+    directory and moved into place once complete.
+    """
+    derived = dict(derived or {})
+    names = list(schema) + list(derived)
+    writer = StoreWriter(
+        store_path, {name: _store_dtype(schema.get(name, "float32")) for name in names},
+        {column: spec for column, spec in schema.items() if _is_categorical(spec)})
+    try:
+        reader = pd.read_csv(csv_path, usecols=list(schema), dtype=_read_dtypes(schema),
+                             chunksize=chunksize)
+        for chunk in reader:
+            writer.append(encode_chunk(chunk, schema, derived))
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close(source=os.path.abspath(csv_path),
+                        fingerprint=source_fingerprint(csv_path, schema, derived))
+
+
+def load_or_ingest(csv_path, store_path, schema, derived=None, chunksize=100_000):
+    """Open the store at ``store_path``, (re)ingesting ``csv_path`` if stale."""
+    meta_path = os.path.join(store_path, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path) as handle:
+            meta = json.load(handle)
+        if meta.get("fingerprint") == source_fingerprint(csv_path, schema, derived):
+            return ColumnStore(store_path)
+    return ingest_csv(csv_path, store_path, schema, derived=derived, chunksize=chunksize)
+
+
+class ColumnStore:
+    """Read-only, memory-mapped view of a store written by ``ingest_csv``."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as handle:
+            self.meta = json.load(handle)
+        self._columns = {entry["name"]: (i, entry) for i, entry in enumerate(self.meta["columns"])}
+
+    def __len__(self):
+        return self.meta["n_rows"]
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def categories(self, column):
+        """Ordered categories of a categorical column, else ``None``."""
+        return self._columns[column][1].get("categories")
+
+    def array(self, column):
+        """Zero-copy, read-only array of one column."""
+        position, entry = self._columns[column]
+        dtype = np.dtype(entry["dtype"])
+        if len(self) == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, f"{position}.bin"), dtype=dtype,
+                         mode="r", shape=(len(self),))
+
+    def frame(self, columns=None, decode=False):
+        """DataFrame over the memory-mapped columns, without copying them.
+
+        Categorical columns hold their integer codes (``-1`` for a value
+        outside the table); with ``decode=True`` they are returned as
+        ``pd.Categorical`` with the original labels (NaN for ``-1``).
+        """
+        data = {}
+        for column in columns or self.columns:
+            values = self.array(column)
+            categories = self.categories(column)
+            if decode and categories is not None:
+                values = pd.Categorical.from_codes(values, categories=categories)
+            data[column] = values
+        return pd.DataFrame(data, copy=False)
+
+    def column_stats(self, column):
+        """``{"nulls", "min", "max"}`` recorded at write time (``{}`` for
+        stores written before they were recorded)."""
+        return self._columns[column][1].get("stats", {})
+
+    def nbytes(self, columns=None):
+        return sum(self.array(column).nbytes for column in columns or self.columns)
+
+
+SCHEMAS = {"2021": (BRFSS_2021_SCHEMA, DERIVED_COLUMNS), "2015": (BRFSS_2015_SCHEMA, None)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest a BRFSS CSV into a column store.")
+    parser.add_argument("csv")
+    parser.add_argument("store")
+    parser.add_argument("--schema", choices=list(SCHEMAS), default="2021")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    schema, derived = SCHEMAS[args.schema]
+    store = load_or_ingest(args.csv, args.store, schema, derived, chunksize=args.chunksize)
+    print(f"{args.store}: {len(store):,} rows, {len(store.columns)} columns, "
+          f"{store.nbytes() / 2**20:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""Compact feature matrix: int8 codes and float32 values in one buffer.
+
+After ``drop``/``iloc`` the encoded survey frame turns into per-dtype pandas
+blocks, and ``np.asarray`` on it (as every estimator does) materializes a
+dense float matrix - 4 to 8 bytes per code that fits in one. A
+``FeatureMatrix`` keeps the rows in a single contiguous byte buffer with two
+row-major blocks:
+
+* the small-range integer / categorical columns as int8 codes;
+* every other column as float32.
+
+Row subsets (``take``) stay compact, ``matrix[column]`` is a zero-copy view
+for the EDA helpers in ``cvd.aggregate``, and estimators receive dense
+float32 rows only when they ask for them (``rows``/``np.asarray``), one fold
+at a time; there the ``-1`` code of an unknown category becomes NaN, as in
+``BRFSSEncoder``. ``FoldCache`` publishes the buffer itself to shared memory, so CV
+workers gather and convert just the rows of the fold they fit.
+``memory_report`` gives the cost per million rows next to the dense float32
+and pandas int64/float64 layouts.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from joblib import hash as joblib_hash
+
+ALIGNMENT = 64  # the float32 block starts on a cache-line boundary
+CODE_RANGE = (-128, 127)
+
+
+def _is_code(values):
+    """Whether a column fits int8 codes without loss."""
+    if not np.issubdtype(values.dtype, np.integer) and values.dtype != np.bool_:
+        return False
+    if not len(values):
+        return True
+    return CODE_RANGE[0] <= values.min() and values.max() <= CODE_RANGE[1]
+
+
+class FeatureMatrix:
+    """Rows of int8 code columns and float32 columns in one buffer.
+
+    Build it with ``from_columns``, ``from_store`` or ``from_frame``.
+    ``dtype`` is the type of the dense rows estimators receive; it matches
+    ``np.asarray`` of the equivalent int8/float32 frame.
+    """
+
+    dtype = np.dtype(np.float32)
+
+    def __init__(self, buffer, columns, code_columns, n_rows, categories=None):
+        self.buffer = buffer
+        self._columns = list(columns)
+        self.code_columns = [c for c in self._columns if c in set(code_columns)]
+        self.value_columns = [c for c in self._columns if c not in set(code_columns)]
+        self.n_rows = n_rows
+        self.categories = dict(categories or {})
+        n_codes, n_values = len(self.code_columns), len(self.value_columns)
+        offset = _values_offset(n_rows, n_codes)
+        self.codes = np.ndarray((n_rows, n_codes), dtype=np.int8, buffer=buffer)
+        self.values = np.ndarray((n_rows, n_values), dtype=np.float32, buffer=buffer,
+                                 offset=offset)
+        self._slots = {c: (self.codes, j) for j, c in enumerate(self.code_columns)}
+        self._slots.update({c: (self.values, j) for j, c in enumerate(self.value_columns)})
+        self._order = {c: i for i, c in enumerate(self.code_columns + self.value_columns)}
+
+    @classmethod
+    def empty(cls, n_rows, columns, code_columns, categories=None):
+        n_codes = len([c for c in columns if c in set(code_columns)])
+        size = _values_offset(n_rows, n_codes) + n_rows * (len(columns) - n_codes) * 4
+        return cls(np.empty(size, dtype=np.uint8), columns, code_columns, n_rows, categories)
+
+    @classmethod
+    def from_columns(cls, arrays, categories=None):
+        """From ``{column: 1-d array}``; integer columns in int8 range become
+        codes, everything else float32."""
+        columns = list(arrays)
+        n_rows = len(arrays[columns[0]]) if columns else 0
+        codes = [c for c in columns if _is_code(np.asarray(arrays[c]))]
+        matrix = cls.empty(n_rows, columns, codes, categories)
+        for column in columns:
+            block, j = matrix._slots[column]
+            block[:, j] = arrays[column]
+        return matrix
+
+    @classmethod
+    def from_store(cls, store, columns=None):
+        """Copy ``ColumnStore`` columns (already int8/float32) into one buffer."""
+        columns = list(columns or store.columns)
+        categories = {c: store.categories(c) for c in columns if store.categories(c)}
+        return cls.from_columns({c: store.array(c) for c in columns}, categories)
+
+    @classmethod
+    def from_frame(cls, frame):
+        """From a DataFrame; ``category`` columns are stored as their codes."""
+        arrays, categories = {}, {}
+        for column in frame.columns:
+            values = frame[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                categories[column] = list(values.cat.categories)
+                values = values.cat.codes
+            arrays[column] = values.to_numpy()
+        return cls.from_columns(arrays, categories)
+
+    def __len__(self):
+        return self.n_rows
+
+    @property
+    def shape(self):
+        return (self.n_rows, len(self._columns))
+
+    @property
+    def columns(self):
+        return pd.Index(self._columns)
+
+    @property
+    def nbytes(self):
+        return self.buffer.nbytes
+
+    def __getitem__(self, column):
+        """Zero-copy (strided) view of one column."""
+        block, j = self._slots[column]
+        return block[:, j]
+
+    def rows(self, index=slice(None), columns=None, dtype=None):
+        """Dense ``dtype`` matrix of the selected rows, in column order."""
+        columns = self._columns if columns is None else list(columns)
+        dtype = self.dtype if dtype is None else dtype
+        codes, values = self.codes[index], self.values[index]
+        # both blocks side by side (two slice copies), then one column gather
+        # unless ``columns`` is already codes-then-values order
+        out = np.empty((len(codes), codes.shape[1] + values.shape[1]), dtype=dtype)
+        out[:, :codes.shape[1]] = codes
+        out[:, codes.shape[1]:] = values
+        if np.issubdtype(out.dtype, np.floating):
+            # -1 marks a category outside the table; BRFSSEncoder gives NaN
+            for j, column in enumerate(self.code_columns):
+                if column in self.categories:
+                    block = out[:, j]
+                    block[block < 0] = np.nan
+        order = [self._order[column] for column in columns]
+        if order != list(range(out.shape[1])):
+            out = out[:, order]
+        return out
+
+    def to_numpy(self, dtype=None, columns=None):
+        return self.rows(columns=columns, dtype=dtype)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.rows(dtype=dtype)
+
+    def take(self, index):
+        """Compact copy of a subset of rows."""
+        codes = self.codes[index]
+        matrix = FeatureMatrix.empty(len(codes), self._columns, self.code_columns,
+                                     self.categories)
+        matrix.codes[...] = codes
+        matrix.values[...] = self.values[index]
+        return matrix
+
+    def frame(self, decode=False):
+        """DataFrame over the column views (categoricals decoded on request)."""
+        data = {}
+        for column in self._columns:
+            values = self[column]
+            if decode and column in self.categories:
+                values = pd.Categorical.from_codes(values, categories=self.categories[column])
+            data[column] = values
+        return pd.DataFrame(data, copy=False)
+
+    def content_hash(self):
+        # the blocks, not the buffer: the alignment padding is uninitialized
+        return joblib_hash((self._columns, self.code_columns, self.codes, self.values))
+
+    def publish(self, arena):
+        """Write the buffer to a ``SharedArena``; returns a picklable handle."""
+        return SharedFeatureMatrix(arena.publish(self.buffer), self._columns,
+                                   self.code_columns, self.n_rows, self.categories)
+
+    def memory_report(self):
+        """Bytes per row and MB per million rows, against dense layouts."""
+        n_codes, n_values = len(self.code_columns), len(self.value_columns)
+        per_row = {
+            "compact": n_codes + 4 * n_values,
+            "float32": 4 * (n_codes + n_values),
+            "pandas int64/float64": 8 * (n_codes + n_values),
+        }
+        return pd.DataFrame({
+            "bytes_per_row": per_row,
+            "mb_per_million_rows": {k: v * 1e6 / 2**20 for k, v in per_row.items()},
+            "mb_total": {k: v * self.n_rows / 2**20 for k, v in per_row.items()},
+        })
+
+    def __repr__(self):
+        return (f"FeatureMatrix({self.n_rows:,} rows, {len(self.code_columns)} int8 + "
+                f"{len(self.value_columns)} float32 columns, {self.nbytes / 2**20:.1f} MB)")
+
+
+def _values_offset(n_rows, n_codes):
+    size = n_rows * n_codes
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+class SharedFeatureMatrix:
+    """Handle to a published ``FeatureMatrix``; ``array`` attaches zero-copy."""
+
+    def __init__(self, shared, columns, code_columns, n_rows, categories):
+        self.shared = shared
+        self.columns = columns
+        self.code_columns = code_columns
+        self.n_rows = n_rows
+        self.categories = categories
+
+    @property
+    def array(self):
+        return FeatureMatrix(self.shared.array, self.columns, self.code_columns, self.n_rows,
+                             self.categories)
+
+    @property
+    def parts(self):
+        return (self.shared,)
+
+    @property
+    def nbytes(self):
+        return self.shared.nbytes
+
+    def __len__(self):
+        return self.n_rows
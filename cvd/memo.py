@@ -0,0 +1,228 @@
+"""Exact-match memoization of predictions on encoded rows.
+
+Almost every BRFSS feature is a small ordinal or binary code; only BMI and
+the food-frequency columns take more than a few dozen values. Scoring
+traffic repeats records - the same respondents are rescored when a file is
+resubmitted, online clients retry, models on the coded features alone see
+few distinct rows - and each repeat costs a full estimator call (a KNN
+query, hundreds of trees). ``PredictionCache`` wraps a row-wise ``predict``
+function:
+
+* each batch is deduplicated first - rows are hashed to 64 bits in a few
+  vectorized passes over the columns, the estimator only sees the distinct
+  rows and the results are scattered back to every copy;
+* the distinct rows are looked up in a bounded LRU of earlier results, so
+  records repeated across batches (or online requests) are not scored
+  again.
+
+Matches are exact: hashes only propose candidates, a candidate is used only
+when its float64 bits equal the row's (``-0.0`` and ``0.0`` count as equal,
+as do all NaNs), and a batch with a hash collision is deduplicated by
+sorting the rows instead. Only numpy and the standard library are used, so
+the numpy scoring runtime (``cvd.runtime``) can use it too.
+
+Example::
+
+    cache = PredictionCache(lambda X: model.predict_proba(X)[:, 1], max_entries=100_000)
+    scores = cache.predict(X)        # X: encoded float matrix
+    cache.stats()                    # rows, distinct rows, LRU hits, hit rate ...
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _canonical(X):
+    """Contiguous float64 rows with one bit pattern per value."""
+    X = np.array(X, dtype=np.float64, order="C", copy=True)
+    X += 0.0  # -0.0 -> 0.0
+    X[np.isnan(X)] = np.nan
+    return X
+
+
+def row_hashes(X):
+    """64-bit hash of every row of a canonical float64 matrix."""
+    bits = X.view(np.uint64)
+    hashes = np.full(len(X), X.shape[1], dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for column in range(X.shape[1]):
+            hashes = (hashes ^ bits[:, column]) * _MULTIPLIER
+            hashes ^= hashes >> np.uint64(29)
+    return hashes
+
+
+def _same_rows(A, B):
+    """Whether the rows of two canonical matrices are bit-for-bit equal."""
+    return np.all(A.view(np.uint64) == B.view(np.uint64), axis=1)
+
+
+class PredictionCache:
+    """Bounded LRU of ``predict`` results keyed on exact encoded rows.
+
+    Parameters
+    ----------
+    predict : callable
+        Maps a float64 matrix of rows to one result per row (e.g. the
+        positive-class probabilities).
+    max_entries : int, default=1_000_000
+        Distinct rows kept across batches; least recently used ones are
+        evicted. ``0`` keeps only the per-batch deduplication.
+
+    Thread-safe: the online scorer's batching thread and batch jobs may
+    share one cache.
+    """
+
+    def __init__(self, predict, max_entries=1_000_000):
+        self.predict_function = predict
+        self.max_entries = max_entries
+        self._index = OrderedDict()  # row hash -> slot
+        self._rows = None
+        self._values = None
+        self._free = []
+        self._lock = threading.Lock()
+        self.rows = 0
+        self.distinct = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.collisions = 0
+
+    def __len__(self):
+        return len(self._index)
+
+    def predict(self, X):
+        """Results for every row of ``X``, computing each distinct row once."""
+        X = _canonical(X)
+        if not len(X):
+            return np.empty(0)
+        hashes = row_hashes(X)
+        unique, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        rows = X[first]
+        if not np.all(_same_rows(X, rows[inverse])):
+            # two different rows share a hash: deduplicate exactly, skip the LRU
+            rows, inverse = np.unique(X, axis=0, return_inverse=True)
+            values = np.asarray(self.predict_function(rows))
+            with self._lock:
+                self.collisions += 1
+                self._count(len(X), len(rows), 0)
+            return values[inverse.ravel()]
+
+        with self._lock:
+            slots = self._lookup(unique, rows)
+            found = np.flatnonzero(slots >= 0)
+            cached = self._values[slots[found]] if len(found) else None
+        missing = np.flatnonzero(slots < 0)
+        computed = np.asarray(self.predict_function(rows[missing])) if len(missing) else None
+        sample = cached if computed is None else computed
+        values = np.empty((len(rows),) + sample.shape[1:], dtype=sample.dtype)
+        if cached is not None:
+            values[found] = cached
+        if computed is not None:
+            values[missing] = computed
+        with self._lock:
+            if computed is not None:
+                self._store(unique[missing], rows[missing], computed)
+            self._count(len(X), len(rows), len(found))
+        return values[inverse]
+
+    __call__ = predict
+
+    def _count(self, n_rows, n_distinct, n_hits):
+        self.rows += n_rows
+        self.distinct += n_distinct
+        self.hits += n_hits
+        self.misses += n_distinct - n_hits
+
+    def _lookup(self, hashes, rows):
+        """LRU slot of every row (``-1`` if absent), refreshing the hits."""
+        slots = np.full(len(hashes), -1, dtype=np.int64)
+        if not self._index:
+            return slots
+        for position, key in enumerate(hashes.tolist()):
+            slot = self._index.get(key)
+            if slot is not None:
+                slots[position] = slot
+                self._index.move_to_end(key)
+        found = np.flatnonzero(slots >= 0)
+        # a hash match with different bits is a miss
+        stale = found[~_same_rows(self._rows[slots[found]], rows[found])]
+        slots[stale] = -1
+        return slots
+
+    def _allocate(self, n_columns, values):
+        capacity = min(self.max_entries, 1024)
+        self._rows = np.empty((capacity, n_columns), dtype=np.float64)
+        self._values = np.empty((capacity,) + values.shape[1:], dtype=values.dtype)
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def _grow(self):
+        capacity = min(self.max_entries, 2 * len(self._rows))
+        if capacity == len(self._rows):
+            return False
+        old = len(self._rows)
+        self._rows = np.concatenate([self._rows, np.empty((capacity - old,)
+                                                          + self._rows.shape[1:])])
+        self._values = np.concatenate([self._values, np.empty(
+            (capacity - old,) + self._values.shape[1:], dtype=self._values.dtype)])
+        self._free.extend(range(capacity - 1, old - 1, -1))
+        return True
+
+    def _store(self, hashes, rows, values):
+        if self.max_entries <= 0:
+            return
+        if self._values is None:
+            self._allocate(rows.shape[1], values)
+        # a batch with more new rows than fit keeps its last ones
+        keep = slice(-self.max_entries, None)
+        slots = []
+        for key in hashes[keep].tolist():
+            slot = self._index.pop(key, None)
+            if slot is None:
+                if not self._free and not self._grow():
+                    # the oldest entry; never one of this batch, which fits
+                    _, slot = self._index.popitem(last=False)
+                    self.evictions += 1
+                else:
+                    slot = self._free.pop()
+            self._index[key] = slot
+            slots.append(slot)
+        self._rows[slots] = rows[keep]
+        self._values[slots] = values[keep]
+
+    def clear(self):
+        with self._lock:
+            self._index.clear()
+            self._rows = self._values = None
+            self._free = []
+
+    def stats(self):
+        """Counts plus ``dedup_rate`` (copies saved within batches),
+        ``lru_hit_rate`` (distinct rows found in the LRU) and ``hit_rate``
+        (rows that were not sent to the estimator)."""
+        with self._lock:
+            return {
+                "entries": len(self._index),
+                "rows": self.rows,
+                "distinct": self.distinct,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "collisions": self.collisions,
+                "dedup_rate": 1 - self.distinct / self.rows if self.rows else 0.0,
+                "lru_hit_rate": self.hits / self.distinct if self.distinct else 0.0,
+                "hit_rate": 1 - self.misses / self.rows if self.rows else 0.0,
+            }
+
+    def summary(self):
+        """One line of ``stats()`` for the scoring command lines."""
+        stats = self.stats()
+        return (f"{stats['distinct']:,} distinct of {stats['rows']:,} rows "
+                f"({stats['dedup_rate']:.1%} deduplicated), {stats['lru_hit_rate']:.1%} "
+                f"from the LRU, {stats['hit_rate']:.1%} of rows not scored")
@@ -0,0 +1,361 @@
+"""Pluggable nearest-neighbour indexes for the KNN model.
+
+``KNeighborsClassifier`` on ~246k reference rows answers ``predict(X_test)``
+by brute force. This module provides interchangeable indexes behind one
+``build``/``query`` interface:
+
+* ``BruteIndex`` - exact, same search as the current model.
+* ``TreeIndex`` - exact KD-tree or ball-tree.
+* ``IVFIndex`` - approximate inverted-file index: rows are bucketed by a
+  k-means coarse quantizer and stored as uint8 scalar-quantized codes; a
+  query scans only the ``n_probe`` closest buckets and re-ranks the best
+  candidates exactly. ``calibrate`` picks the smallest ``n_probe`` that
+  meets a recall target.
+
+Queries are answered in batches spread over a thread pool, and every index
+can be saved and re-loaded (``load_or_build``) so it is not rebuilt on every
+run. ``IndexedKNeighborsClassifier`` puts an index behind the
+``KNeighborsClassifier`` API.
+"""
+
+from __future__ import annotations
+
+import os
+
+import joblib
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.neighbors import BallTree, KDTree, NearestNeighbors
+
+
+def _batches(n_rows, batch_size):
+    return [slice(start, min(start + batch_size, n_rows))
+            for start in range(0, n_rows, batch_size)]
+
+
+def _top_k(distances, k):
+    """Column indices of the ``k`` smallest entries of each row, sorted."""
+    k = min(k, distances.shape[1])
+    part = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(distances, part, axis=1).argsort(axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+
+class NeighborIndex:
+    """Base class: batched, thread-parallel ``query`` and persistence."""
+
+    def __init__(self, batch_size=4096, n_jobs=-1):
+        self.batch_size = batch_size
+        self.n_jobs = n_jobs
+        self.fingerprint_ = None
+
+    def build(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        self.fingerprint_ = joblib.hash(X)
+        self.n_samples_, self.n_features_ = X.shape
+        self._build(X)
+        return self
+
+    def query(self, X, k):
+        """Return ``(distances, indices)`` of the ``k`` nearest indexed rows."""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        batches = _batches(len(X), self.batch_size)
+        results = Parallel(n_jobs=self.n_jobs, prefer="threads")(
+            delayed(self._query)(X[batch], k) for batch in batches
+        )
+        if not results:
+            return np.empty((0, k)), np.empty((0, k), dtype=np.intp)
+        distances, indices = zip(*results)
+        return np.vstack(distances), np.vstack(indices)
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @classmethod
+    def load(cls, path):
+        index = joblib.load(path)
+        if not isinstance(index, cls):
+            raise TypeError(f"{path} holds a {type(index).__name__}, not a {cls.__name__}")
+        return index
+
+    def _build(self, X):
+        raise NotImplementedError
+
+    def _query(self, X, k):
+        raise NotImplementedError
+
+
+class BruteIndex(NeighborIndex):
+    """Exact brute-force search, as used by ``KNeighborsClassifier`` today."""
+
+    def _build(self, X):
+        self._nn = NearestNeighbors(algorithm="brute").fit(X)
+
+    def _query(self, X, k):
+        return self._nn.kneighbors(X, n_neighbors=k)
+
+
+class TreeIndex(NeighborIndex):
+    """Exact KD-tree (``kind="kd_tree"``) or ball-tree (``kind="ball_tree"``)."""
+
+    def __init__(self, kind="kd_tree", leaf_size=40, batch_size=4096, n_jobs=-1):
+        super().__init__(batch_size=batch_size, n_jobs=n_jobs)
+        if kind not in ("kd_tree", "ball_tree"):
+            raise ValueError(f"kind must be 'kd_tree' or 'ball_tree', got {kind!r}")
+        self.kind = kind
+        self.leaf_size = leaf_size
+
+    def _build(self, X):
+        tree = KDTree if self.kind == "kd_tree" else BallTree
+        self._tree = tree(X, leaf_size=self.leaf_size)
+
+    def _query(self, X, k):
+        return self._tree.query(X, k=k)
+
+
+class IVFIndex(NeighborIndex):
+    """Approximate inverted-file index over uint8 scalar-quantized rows.
+
+    Parameters
+    ----------
+    n_lists : int, optional
+        Number of k-means buckets; defaults to ``sqrt(n_samples)``.
+    n_probe : int, default=8
+        Buckets scanned per query. Larger is slower and more accurate;
+        ``calibrate`` sets it from a recall target.
+    rerank : int, default=4
+        Keep ``rerank * k`` quantized candidates per bucket and re-rank them
+        with exact float32 distances. ``0`` skips re-ranking and drops the
+        float32 copy of the data.
+    train_size : int, default=100_000
+        Rows sampled to fit the coarse quantizer.
+    random_state : int, default=0
+    """
+
+    def __init__(self, n_lists=None, n_probe=8, rerank=4, train_size=100_000,
+                 random_state=0, batch_size=4096, n_jobs=-1):
+        super().__init__(batch_size=batch_size, n_jobs=n_jobs)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.rerank = rerank
+        self.train_size = train_size
+        self.random_state = random_state
+
+    def _build(self, X):
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(X))))
+        n_lists = min(n_lists, len(X))
+        rng = np.random.default_rng(self.random_state)
+        sample = X
+        if len(X) > self.train_size:
+            sample = X[rng.choice(len(X), self.train_size, replace=False)]
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, n_init=1, batch_size=4096,
+                                 random_state=self.random_state).fit(sample)
+        self.centroids_ = kmeans.cluster_centers_.astype(np.float32)
+        assignment = kmeans.predict(X)
+
+        # rows sorted by bucket; bucket l holds ids_[offsets_[l]:offsets_[l + 1]]
+        self.ids_ = np.argsort(assignment, kind="stable")
+        self.offsets_ = np.concatenate(
+            [[0], np.cumsum(np.bincount(assignment, minlength=n_lists))]
+        )
+
+        rows = X[self.ids_]
+        self.low_ = rows.min(axis=0).astype(np.float32)
+        span = rows.max(axis=0) - rows.min(axis=0)
+        self.scale_ = np.where(span > 0, span / 255.0, 1.0).astype(np.float32)
+        self.codes_ = np.rint((rows - self.low_) / self.scale_).astype(np.uint8)
+        self.vectors_ = rows.astype(np.float32) if self.rerank else None
+
+    def _decode(self, start, stop):
+        return self.codes_[start:stop].astype(np.float32) * self.scale_ + self.low_
+
+    def _query(self, X, k, n_probe=None):
+        n_probe = min(n_probe or self.n_probe, len(self.centroids_))
+        Q = X.astype(np.float32)
+        n_queries = len(Q)
+        keep = k * self.rerank if self.rerank else k
+
+        probes = _top_k(_squared_distances(Q, self.centroids_), n_probe)
+        cand_dist = np.full((n_queries, n_probe * keep), np.inf, dtype=np.float32)
+        cand_pos = np.full((n_queries, n_probe * keep), -1, dtype=np.intp)
+
+        # visit each probed bucket once, with every query that probes it
+        flat = probes.ravel()
+        order = np.argsort(flat, kind="stable")
+        bounds = np.flatnonzero(np.diff(flat[order])) + 1
+        for group in np.split(order, bounds):
+            bucket = flat[group[0]]
+            start, stop = self.offsets_[bucket], self.offsets_[bucket + 1]
+            if start == stop:
+                continue
+            queries, slots = np.divmod(group, n_probe)
+            distances = _squared_distances(Q[queries], self._decode(start, stop))
+            best = _top_k(distances, keep)
+            columns = slots[:, None] * keep + np.arange(best.shape[1])
+            cand_dist[queries[:, None], columns] = np.take_along_axis(distances, best, axis=1)
+            cand_pos[queries[:, None], columns] = best + start
+
+        if self.rerank:
+            valid = cand_pos >= 0
+            safe = np.where(valid, cand_pos, 0)
+            diff = self.vectors_[safe] - Q[:, None, :]
+            cand_dist = np.where(valid, np.einsum("qcd,qcd->qc", diff, diff), np.inf)
+
+        best = _top_k(cand_dist, k)
+        distances = np.sqrt(np.maximum(np.take_along_axis(cand_dist, best, axis=1), 0))
+        positions = np.take_along_axis(cand_pos, best, axis=1)
+        return distances.astype(np.float64), np.where(positions >= 0, self.ids_[positions], -1)
+
+    def calibrate(self, X, k, recall=0.95, sample_size=2000, queries=None):
+        """Set ``n_probe`` to the smallest value reaching ``recall`` @ ``k``.
+
+        Recall is measured against exact neighbours of ``queries`` (a random
+        sample of ``X`` by default). Returns ``{n_probe: recall}`` for the
+        values tried.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if queries is None:
+            rng = np.random.default_rng(self.random_state)
+            queries = X[rng.choice(len(X), min(sample_size, len(X)), replace=False)]
+        _, exact = NearestNeighbors(algorithm="brute").fit(X).kneighbors(queries, k)
+
+        tried = {}
+        n_probe = 1
+        while True:
+            n_probe = min(n_probe, len(self.centroids_))
+            _, approx = self._query(np.asarray(queries, dtype=np.float64), k, n_probe)
+            tried[n_probe] = recall_at_k(exact, approx)
+            if tried[n_probe] >= recall or n_probe == len(self.centroids_):
+                break
+            n_probe *= 2
+        self.n_probe = n_probe
+        return tried
+
+
+def _squared_distances(A, B):
+    distances = (A * A).sum(axis=1)[:, None] - 2 * A @ B.T + (B * B).sum(axis=1)[None, :]
+    return np.maximum(distances, 0, out=distances)
+
+
+def recall_at_k(exact, approx):
+    """Fraction of the exact neighbour ids that the approximate search found."""
+    hits = sum(len(np.intersect1d(e, a)) for e, a in zip(exact, approx))
+    return hits / exact.size
+
+
+# settings of ``query`` only: a saved index is reused whatever their values
+QUERY_PARAMS = ("batch_size", "n_jobs", "n_probe")
+
+INDEXES = {
+    "brute": lambda **params: BruteIndex(**params),
+    "kd_tree": lambda **params: TreeIndex(kind="kd_tree", **params),
+    "ball_tree": lambda **params: TreeIndex(kind="ball_tree", **params),
+    "ivf": lambda **params: IVFIndex(**params),
+}
+
+
+def make_index(kind, **params):
+    """Create an unbuilt index by name (one of ``INDEXES``)."""
+    if kind not in INDEXES:
+        raise ValueError(f"Unknown index {kind!r}; expected one of {sorted(INDEXES)}")
+    index = INDEXES[kind](**params)
+    index.spec_ = _spec(kind, params)
+    return index
+
+
+def _spec(kind, params):
+    """``(kind, build params)``: what a saved index must match to be reused."""
+    return kind, tuple(sorted((key, value) for key, value in params.items()
+                              if key not in QUERY_PARAMS))
+
+
+def index_file(path, fingerprint, kind, params):
+    """``path`` with a key of the data fingerprint and the index spec added,
+    e.g. ``knn.idx`` -> ``knn-<key>.idx``, so each CV fold (and each kind)
+    has its own file."""
+    root, extension = os.path.splitext(path)
+    key = joblib.hash((fingerprint, _spec(kind, params)))[:16]
+    return f"{root}-{key}{extension}"
+
+
+def load_or_build(path, X, kind, **params):
+    """Load the ``kind`` index over ``X`` saved next to ``path``, or build it.
+
+    The file is ``index_file(path, ...)``; a saved index is reused only if
+    its data fingerprint and ``(kind, params)`` match (``QUERY_PARAMS`` are
+    applied to it instead). Otherwise a new index is built and saved there.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    fingerprint = joblib.hash(X)
+    path = index_file(path, fingerprint, kind, params)
+    if os.path.exists(path):
+        index = NeighborIndex.load(path)
+        if (index.fingerprint_ == fingerprint
+                and getattr(index, "spec_", None) == _spec(kind, params)):
+            for key in QUERY_PARAMS:
+                if key in params:
+                    setattr(index, key, params[key])
+            return index
+    index = make_index(kind, **params).build(X)
+    index.save(path)
+    return index
+
+
+class IndexedKNeighborsClassifier(ClassifierMixin, BaseEstimator):
+    """``KNeighborsClassifier`` (uniform weights) backed by a ``NeighborIndex``.
+
+    Parameters
+    ----------
+    n_neighbors : int, default=5
+    index : str, default="kd_tree"
+        One of ``INDEXES``.
+    recall_target : float, optional
+        For ``index="ivf"``: calibrate ``n_probe`` to this recall @ k.
+    index_params : dict, optional
+        Extra keyword arguments for the index.
+    index_path : str, optional
+        Reuse the index saved for the training data and index settings next
+        to this path (``load_or_build``; one file per CV fold), otherwise
+        build it and save it there.
+    n_jobs : int, default=-1
+        Threads used to answer query batches.
+    """
+
+    def __init__(self, n_neighbors=5, index="kd_tree", recall_target=None,
+                 index_params=None, index_path=None, n_jobs=-1):
+        self.n_neighbors = n_neighbors
+        self.index = index
+        self.recall_target = recall_target
+        self.index_params = index_params
+        self.index_path = index_path
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y):
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        self.classes_, self._y = np.unique(np.asarray(y), return_inverse=True)
+        params = dict(self.index_params or {}, n_jobs=self.n_jobs)
+        if self.index_path is not None:
+            self.index_ = load_or_build(self.index_path, X, self.index, **params)
+        else:
+            self.index_ = make_index(self.index, **params).build(X)
+        if self.recall_target is not None and isinstance(self.index_, IVFIndex):
+            self.calibration_ = self.index_.calibrate(X, self.n_neighbors, self.recall_target)
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    def kneighbors(self, X, n_neighbors=None):
+        return self.index_.query(np.asarray(X), n_neighbors or self.n_neighbors)
+
+    def predict_proba(self, X):
+        _, neighbors = self.kneighbors(X)
+        found = neighbors >= 0  # approximate search may return fewer than k
+        labels = self._y[np.where(found, neighbors, 0)]
+        rows = np.broadcast_to(np.arange(len(labels))[:, None], labels.shape)
+        counts = np.zeros((len(labels), len(self.classes_)))
+        np.add.at(counts, (rows[found], labels[found]), 1)
+        return counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
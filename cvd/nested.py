@@ -0,0 +1,327 @@
+"""Nested cross-validation of several model families in one process pool.
+
+``best_score_`` of a grid search is optimistic: the same folds chose the
+candidate and scored it. Nested CV scores every outer fold's chosen
+candidate on rows the inner search never saw, but run naively (a
+``GridSearchCV`` per outer fold) it costs ``n_outer`` full searches, one
+outer fold after the other.
+
+``NestedCV`` splits the rows once into ``n_outer`` stratified blocks. Outer
+fold ``k`` tests on block ``k`` and its inner search cross-validates over
+the other blocks, one inner fold per block. The inner fold of outer fold
+``k`` that validates on block ``j`` then trains on exactly the same rows as
+the inner fold of outer fold ``j`` that validates on block ``k`` - all
+blocks but ``j`` and ``k`` - so both are served by one fit per candidate,
+scored on the two blocks. The block-pair folds go through one ``FoldCache``:
+the untuned pipeline prefix (scaler, PCA, SMOTE) is fitted once per pair and
+shared by both outer folds and every family with the same prefix, samplers
+go through the resampling cache, and the fits of all outer folds and
+families run together in one ``Parallel`` pool, as in ``SearchEngine``.
+
+Each family's ``NestedResult`` holds the outer-fold scores (the unbiased
+estimate), the inner best scores they are compared with, the chosen
+parameters per outer fold and what the family cost: fits, fit wall-clock
+seconds and worker CPU seconds. ``NestedCV.report()`` puts them side by
+side.
+
+Example::
+
+    nested = NestedCV(n_outer=5, scoring={"accuracy": "accuracy", "recall": "recall"},
+                      refit="accuracy", n_jobs=-1)
+    nested.add("lr", pipeline_lr, param_grid_lr)
+    nested.add("rf", RandomForestClassifier(), param_grid_rf, halving="n_estimators")
+    nested.fit(X_train, y_train)
+    print(nested.report())
+"""
+
+from __future__ import annotations
+
+import copy
+import itertools
+import os
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import is_classifier
+from sklearn.model_selection import KFold, StratifiedKFold
+
+from cvd.profiling import cpu_seconds
+from cvd.search import (FoldCache, SearchEngine, _fit_and_score, _FamilySearch, _worker_cpu,
+                        split_pipeline)
+from cvd.shared import take_rows
+
+
+class _InnerFolds:
+    """The inner folds of one outer fold, as views of the block-pair folds.
+
+    Inner fold ``j`` validates on the ``j``-th block other than the outer
+    test block; its training rows are those of the pair split of the two
+    blocks, whose validation rows are the lower block followed by the higher
+    one.
+    """
+
+    def __init__(self, folds, outer, n_blocks, pairs, sizes):
+        self.folds = folds
+        self.sizes = sizes
+        # inner fold -> (pair split, block of the pair's validation rows)
+        self.index = [(pairs[min(block, outer), max(block, outer)], int(block > outer))
+                      for block in range(n_blocks) if block != outer]
+
+    def __len__(self):
+        return len(self.index)
+
+    def n_train(self, index, prefix=()):
+        return self.folds.n_train(self.index[index][0], prefix)
+
+    def fold(self, index, prefix=()):
+        pair, part = self.index[index]
+        X_train, y_train, X_valid, y_valid = self.folds.fold(pair, prefix)
+        low = self.sizes[pair][0] if part else 0
+        high = low + self.sizes[pair][part]
+        return X_train, y_train, take_rows(X_valid, slice(low, high)), y_valid[low:high]
+
+
+class NestedResult:
+    """Nested-CV estimate of one model family.
+
+    ``outer_scores_`` maps each metric to the scores of the ``n_outer``
+    outer folds, ``inner_scores_`` holds the inner ``best_score_`` of each
+    outer fold (``metric``) and ``best_params_`` the candidate chosen in
+    each. ``inner_results_`` are the inner searches as ``SearchResult``
+    objects (without refitted estimators). ``cost_`` reports the fits the
+    family needed (inner fits after pair sharing, plus one outer refit per
+    fold), the fits independent inner searches would have needed, and the
+    summed wall-clock and worker CPU seconds of its fits.
+    """
+
+    def __init__(self, name, outer_scores, inner_results, cost, metric="score"):
+        self.name = name
+        self.metric = metric
+        self.outer_scores_ = outer_scores
+        self.inner_results_ = inner_results
+        self.inner_scores_ = np.array([result.best_score_ for result in inner_results])
+        self.best_params_ = [result.best_params_ for result in inner_results]
+        self.cost_ = cost
+
+    @property
+    def score_(self):
+        """Mean outer score of ``metric``."""
+        return float(self.outer_scores_[self.metric].mean())
+
+    @property
+    def std_(self):
+        return float(self.outer_scores_[self.metric].std())
+
+    def summary(self):
+        """One report row: outer mean/std per metric, inner mean and cost."""
+        row = {"family": self.name}
+        for metric, scores in self.outer_scores_.items():
+            row[f"outer_{metric}"] = float(scores.mean())
+            row[f"outer_{metric}_std"] = float(scores.std())
+        row[f"inner_{self.metric}"] = float(self.inner_scores_.mean())
+        # how much the inner best score overstates the unbiased estimate
+        row["optimism"] = row[f"inner_{self.metric}"] - self.score_
+        row.update(self.cost_)
+        return row
+
+    def __repr__(self):
+        return f"NestedResult({self.name!r}, score={self.score_:.4f} +/- {self.std_:.4f})"
+
+
+class NestedCV(SearchEngine):
+    """Nested cross-validation of the registered families (see module doc).
+
+    Families are registered with ``add`` exactly as for ``SearchEngine``,
+    including ``halving`` schedules, which then run inside every outer fold.
+
+    Parameters
+    ----------
+    n_outer : int, default=5
+        Outer folds; every inner search uses ``n_outer - 1`` folds.
+    scoring : str, callable, list or dict, default="accuracy"
+        Metrics of the inner searches and of the outer test blocks.
+    refit : bool or str, default=True
+        With several metrics, the metric inner candidates are chosen by.
+    n_jobs : int, default=-1
+        Worker processes shared by every outer fold and family.
+    random_state : int, default=0
+        Seeds the assignment of rows to blocks.
+    verbose : int, default=0
+    profiler : Profiler, optional
+        Receives a ``cv_fit`` event per fit (``fold`` is the block-pair
+        split) plus ``nested.preprocess`` and ``nested.outer`` stages.
+    shared : bool, default=True
+        Publish the data and preprocessed folds in shared memory.
+    cache : ArtifactCache, optional
+        Persist each family's ``NestedResult``; families found in the cache
+        are not run again.
+    """
+
+    _cache_stage = "nested"
+
+    def __init__(self, n_outer=5, scoring="accuracy", refit=True, n_jobs=-1, random_state=0,
+                 verbose=0, profiler=None, shared=True, cache=None):
+        if n_outer < 3:
+            raise ValueError("n_outer must be at least 3 (inner searches need two folds)")
+        super().__init__(cv=n_outer, scoring=scoring, n_jobs=n_jobs, refit=refit,
+                         verbose=verbose, profiler=profiler, shared=shared, cache=cache)
+        self.n_outer = n_outer
+        self.random_state = random_state
+
+    def _cache_config(self):
+        return {"n_outer": self.n_outer, "random_state": self.random_state,
+                "scoring": self.scoring, "refit": self.refit}
+
+    def _splits(self, y, classifier):
+        """Block-pair splits followed by the outer splits, and the blocks."""
+        splitter = (StratifiedKFold if classifier else KFold)(
+            self.n_outer, shuffle=True, random_state=self.random_state)
+        blocks = [valid for _, valid in splitter.split(np.zeros(len(y)), y)]
+        assignment = np.empty(len(y), dtype=np.int64)
+        for block, rows in enumerate(blocks):
+            assignment[rows] = block
+        pairs = list(itertools.combinations(range(self.n_outer), 2))
+        splits = [(np.flatnonzero((assignment != a) & (assignment != b)),
+                   np.concatenate([blocks[a], blocks[b]])) for a, b in pairs]
+        splits += [(np.flatnonzero(assignment != k), blocks[k]) for k in range(self.n_outer)]
+        return splits, blocks, pairs
+
+    def fit(self, X, y):
+        """Run every family's nested CV and return ``{name: NestedResult}``."""
+        if not self.families:
+            raise ValueError("No model families registered; call add() first")
+        y = np.asarray(y)
+        start, start_cpu = time.perf_counter(), cpu_seconds()
+        cached, keys = self._load_cached(X, y)
+        families = {name: spec for name, spec in self.families.items() if name not in cached}
+        results, worker_cpu = {}, 0.0
+        if families:
+            results, worker_cpu = self._run(X, y, families)
+        if self.cache is not None:
+            for name, result in results.items():
+                result.cache_key_ = keys[name]
+                self.cache.put(keys[name], result, stage=self._cache_stage)
+        results.update(cached)
+        self.results_ = {name: results[name] for name in self.families}
+        self.wall_seconds_ = time.perf_counter() - start
+        # this process (fold preprocessing, scoring of grown forests) plus the
+        # fits of worker processes
+        self.cpu_seconds_ = cpu_seconds() - start_cpu + worker_cpu
+        if self.verbose:
+            print(f"Nested CV of {len(families)} families: {self.wall_seconds_:.1f}s wall, "
+                  f"{self.cpu_seconds_:.1f}s CPU")
+        return self.results_
+
+    def _run(self, X, y, families):
+        classifier = all(is_classifier(spec[0]) for spec in families.values())
+        splits, blocks, pairs = self._splits(y, classifier)
+        folds = FoldCache(X, y, cv=splits, classifier=classifier, shared=self.shared)
+        self.folds_ = folds
+        pair_index = {pair: index for index, pair in enumerate(pairs)}
+        sizes = [(len(blocks[a]), len(blocks[b])) for a, b in pairs]
+
+        searches = {}
+        for name, (estimator, param_grid, halving) in families.items():
+            if halving is not None and halving.resource == "n_samples" \
+                    and halving.max_resources is None:
+                # one budget for all pair splits, so that fits are shared
+                prefix = split_pipeline(estimator, param_grid)[0]
+                halving = copy.copy(halving)
+                halving.max_resources = min(folds.n_train(pair, prefix)
+                                            for pair in range(len(pairs)))
+            for outer in range(self.n_outer):
+                view = _InnerFolds(folds, outer, self.n_outer, pair_index, sizes)
+                searches[name, outer] = _FamilySearch(
+                    name, estimator, param_grid, halving, view, primary=self._primary_metric(),
+                    seeds=[pair for pair, _ in view.index])
+        cost = {name: {"fits": 0, "independent_fits": 0, "fit_seconds": 0.0,
+                       "cpu_seconds": 0.0} for name in families}
+        worker_cpu = 0.0
+
+        def account(name, output):
+            nonlocal worker_cpu
+            _, fit_time, score_time, trace = output
+            cost[name]["fits"] += 1
+            cost[name]["fit_seconds"] += fit_time + score_time
+            cost[name]["cpu_seconds"] += trace["cpu"]
+            if trace["pid"] != os.getpid():
+                worker_cpu += trace["cpu"]
+
+        with Parallel(n_jobs=self.n_jobs, verbose=self.verbose) as parallel:
+            round_ = 0
+            while True:
+                # fit -> the inner folds (of any outer fold) that use its scores
+                fits = {}
+                for search in searches.values():
+                    for candidate, fold, budget in search.jobs(round_):
+                        pair, part = search.folds.index[fold]
+                        key = (search.name, candidate, pair,
+                               None if budget is None else tuple(sorted(budget.items())))
+                        fits.setdefault(key, (search, budget, []))[2].append(
+                            (search, candidate, fold, part))
+                if not fits:
+                    break
+                with self.profiler.stage("nested.preprocess"):
+                    tasks = [
+                        delayed(_fit_and_score)(
+                            search.suffix, search.candidates[candidate],
+                            folds.task_fold(pair, search.prefix), self.scoring, budget,
+                            valid_sizes=sizes[pair],
+                        )
+                        for (_, candidate, pair, _), (search, budget, _) in fits.items()
+                    ]
+                outputs = parallel(tasks)
+                for (key, (search, budget, users)), output in zip(fits.items(), outputs):
+                    name, candidate, pair, _ = key
+                    self._trace(search, round_, candidate, pair, budget, output)
+                    account(name, output)
+                    scores, *rest = output
+                    for user, candidate, fold, part in users:
+                        cost[name]["independent_fits"] += 1
+                        user.record(round_, candidate, fold, budget, (scores[part], *rest),
+                                    self.scoring)
+                for search in searches.values():
+                    search.advance(round_)
+                round_ += 1
+            inner = {key: search.result() for key, search in searches.items()}
+
+            # the chosen candidate of every (family, outer fold), refitted on
+            # the outer training rows and scored on the outer test block
+            with self.profiler.stage("nested.outer", families=list(families)):
+                keys = list(inner)
+                tasks = [
+                    delayed(_fit_and_score)(
+                        searches[key].suffix, inner[key].best_params_,
+                        folds.task_fold(len(pairs) + key[1], searches[key].prefix),
+                        self.scoring,
+                    )
+                    for key in keys
+                ]
+                outputs = parallel(tasks)
+                self.profiler.add_cpu(sum(_worker_cpu(output[3]) for output in outputs))
+
+        outer_scores = {name: {} for name in families}
+        for (name, outer), output in zip(keys, outputs):
+            account(name, output)
+            cost[name]["independent_fits"] += 1
+            score = output[0] if isinstance(output[0], dict) else {"score": output[0]}
+            for metric, value in score.items():
+                outer_scores[name].setdefault(metric, np.zeros(self.n_outer))[outer] = value
+        folds.close()
+        self.folds_ = None
+
+        results = {
+            name: NestedResult(name, outer_scores[name],
+                               [inner[name, outer] for outer in range(self.n_outer)],
+                               cost[name], metric=self._primary_metric())
+            for name in families
+        }
+        return results, worker_cpu
+
+    def report(self):
+        """DataFrame with one row per family: outer scores, inner score, cost."""
+        import pandas as pd
+
+        report = pd.DataFrame([result.summary() for result in self.results_.values()])
+        return report.set_index("family")
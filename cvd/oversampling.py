@@ -0,0 +1,317 @@
+"""SMOTE with a shared minority-class neighbour table and a lazy output.
+
+``imblearn``'s ``SMOTE`` searches the k nearest minority neighbours of every
+minority row again for each fold, and returns ``np.vstack`` of a copy of
+all input rows and the synthetic rows - two copies of the majority class
+per call. ``FastSMOTE`` is a drop-in sampler that makes the same draws as
+``SMOTE(random_state=...)`` up to tie-breaking among equidistant
+neighbours, with less work:
+
+* ``MinorityNeighbors`` queries the neighbours of the minority rows of the
+  *whole* training set once, over-fetching a few extra. A fold's minority
+  rows are a subset, and the k nearest neighbours of a row within the fold
+  are the first k of its full-set neighbours that are in the fold, so the
+  fold's table is read off the shared one. Fold rows are matched to the
+  full set by content; only rows with too few neighbours left in the fold
+  are queried again (in an index over the fold's minority rows). One table
+  serves every fold, family and nested-CV pair split.
+* Synthetic rows are interpolated in vectorized blocks of ``block_size``
+  rows into one preallocated array.
+* With ``virtual=True`` the output is a ``ResampledView``: the input rows
+  (e.g. a compact ``FeatureMatrix``) followed by the synthetic rows, not
+  copied. Row subsets are gathered from both parts, and the dense matrix
+  is only built when an estimator asks for it, once, directly in the
+  requested dtype.
+
+Example::
+
+    neighbors = MinorityNeighbors(k_neighbors=5).fit(X_train, y_train)
+    ImbPipeline([
+        ("smote", FastSMOTE(random_state=seed, neighbors=neighbors, virtual=True)),
+        ("scaler", StandardScaler()),
+        ("logistic_regression", LogisticRegression(max_iter=1000)),
+    ])
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from imblearn.utils import check_sampling_strategy
+from sklearn.base import BaseEstimator
+from sklearn.utils import check_random_state
+
+from cvd.matrix import FeatureMatrix
+from cvd.neighbors import make_index
+from cvd.shared import take_rows
+
+
+def _dense(X, dtype=np.float64):
+    return np.ascontiguousarray(X.rows(dtype=dtype) if isinstance(X, FeatureMatrix)
+                                else np.asarray(X, dtype=dtype))
+
+
+def _occurrence_keys(codes, scale):
+    """``code * scale + k`` for the k-th occurrence of each code."""
+    order = np.argsort(codes, kind="stable")
+    ordered = codes[order]
+    starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+    rank = np.arange(len(codes)) - np.repeat(starts, np.diff(np.r_[starts, len(codes)]))
+    keys = np.empty(len(codes), dtype=np.int64)
+    keys[order] = ordered * scale + rank
+    return keys
+
+
+def match_rows(reference, rows):
+    """Row of ``reference`` with the same content as each row of ``rows``.
+
+    Both are float64 matrices; ``-1`` marks rows without a match. Duplicate
+    rows are paired with distinct copies in ``reference`` (the i-th copy in
+    ``rows`` with the i-th in ``reference``).
+    """
+    width = np.dtype((np.void, reference.shape[1] * reference.itemsize))
+    both = np.concatenate([reference.view(width).ravel(), rows.view(width).ravel()])
+    _, codes = np.unique(both, return_inverse=True)
+    scale = len(both)
+    reference_keys = _occurrence_keys(codes[:len(reference)].astype(np.int64), scale)
+    row_keys = _occurrence_keys(codes[len(reference):].astype(np.int64), scale)
+    order = np.argsort(reference_keys)
+    position = np.minimum(np.searchsorted(reference_keys[order], row_keys), len(order) - 1)
+    found = reference_keys[order][position] == row_keys
+    return np.where(found, order[position], -1)
+
+
+class MinorityNeighbors:
+    """Nearest minority-class neighbours of the minority rows of a training set.
+
+    Parameters
+    ----------
+    k_neighbors : int, default=5
+        Largest ``k_neighbors`` of the ``FastSMOTE`` samplers it serves.
+    overfetch : int, default=3
+        Neighbours stored per row, as a multiple of ``k_neighbors``; with
+        folds holding a fraction ``f`` of the rows, a row needs a new query
+        when fewer than ``k_neighbors`` of these are in its fold.
+    index : str, default="kd_tree"
+        ``cvd.neighbors`` index used for the queries.
+    index_params : dict, optional
+
+    Like ``ResampleCache`` the object is a shared handle: ``copy.deepcopy``
+    (and so ``clone`` of a sampler holding it) returns the same object.
+    """
+
+    def __init__(self, k_neighbors=5, overfetch=3, index="kd_tree", index_params=None):
+        self.k_neighbors = k_neighbors
+        self.overfetch = overfetch
+        self.index = index
+        self.index_params = index_params
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def fit(self, X, y, label=None):
+        """Query the neighbours of the ``label`` rows (default: rarest class)."""
+        y = np.asarray(y)
+        classes, counts = np.unique(y, return_counts=True)
+        self.label_ = classes[np.argmin(counts)] if label is None else label
+        self.X_ = _dense(take_rows(X, np.flatnonzero(y == self.label_)))
+        n_neighbors = min(self.k_neighbors * self.overfetch + 1, len(self.X_))
+        index = make_index(self.index, **(self.index_params or {})).build(self.X_)
+        _, table = index.query(self.X_, n_neighbors)
+        # drop each row itself (a duplicate may come first), else the farthest
+        own = table == np.arange(len(table))[:, None]
+        own[~own.any(axis=1), -1] = True
+        own &= np.cumsum(own, axis=1) == 1
+        self.table_ = table[~own].reshape(len(table), n_neighbors - 1)
+        return self
+
+    def neighbors(self, X_class, k):
+        """``(table, missing)``: the ``k`` nearest neighbours of every row of
+        ``X_class`` among its rows, and the rows whose entries are invalid
+        (no match in the training set, or too few neighbours in it)."""
+        if k > self.k_neighbors:
+            raise ValueError(f"neighbours were fitted for k_neighbors <= {self.k_neighbors}")
+        X_class = _dense(X_class)
+        matched = match_rows(self.X_, X_class)
+        position = np.full(len(self.X_) + 1, -1, dtype=np.int64)
+        position[matched[matched >= 0]] = np.flatnonzero(matched >= 0)
+        # full-set neighbours as rows of X_class (-1 if not in X_class)
+        candidates = position[np.where(matched[:, None] >= 0, self.table_[matched], -1)]
+        valid = candidates >= 0
+        first = np.argsort(~valid, axis=1, kind="stable")[:, :k]
+        table = np.take_along_axis(candidates, first, axis=1)
+        complete = np.take_along_axis(valid, first, axis=1).all(axis=1)
+        return table, np.flatnonzero(~complete)
+
+
+class ResampledView:
+    """The rows of ``base`` followed by ``synthetic`` rows, without a copy.
+
+    ``len``, ``shape`` and ``dtype`` describe the resampled matrix; indexing
+    with a row slice or index array gathers just those rows; ``np.asarray``
+    (which sklearn estimators call) builds the dense matrix. ``publish``
+    writes the two parts to a ``SharedArena`` separately, so shared folds
+    stay lazy in the workers too.
+    """
+
+    def __init__(self, base, synthetic):
+        self.base = base
+        self.synthetic = synthetic
+        self.dtype = synthetic.dtype
+
+    def __len__(self):
+        return len(self.base) + len(self.synthetic)
+
+    @property
+    def shape(self):
+        return (len(self), self.synthetic.shape[1])
+
+    @property
+    def nbytes(self):
+        """Bytes the view keeps alive: the base rows and the synthetic rows."""
+        return getattr(self.base, "nbytes", 0) + self.synthetic.nbytes
+
+    def __getitem__(self, rows):
+        rows = np.arange(len(self))[rows]
+        n_base = len(self.base)
+        out = np.empty((len(rows), self.shape[1]), dtype=self.dtype)
+        in_base = rows < n_base
+        out[in_base] = _dense(take_rows(self.base, rows[in_base]), self.dtype)
+        out[~in_base] = self.synthetic[rows[~in_base] - n_base]
+        return out
+
+    def to_numpy(self, dtype=None):
+        dtype = self.dtype if dtype is None else dtype
+        out = np.empty(self.shape, dtype=dtype)
+        if isinstance(self.base, FeatureMatrix):
+            out[:len(self.base)] = self.base.rows(dtype=dtype)
+        else:
+            out[:len(self.base)] = self.base
+        out[len(self.base):] = self.synthetic
+        return out
+
+    def __array__(self, dtype=None, copy=None):
+        return self.to_numpy(dtype)
+
+    def publish(self, arena):
+        """Write both parts to a ``SharedArena``; returns a picklable handle."""
+        return SharedResampledView(arena.publish(self.base), arena.publish(self.synthetic))
+
+    def __repr__(self):
+        return (f"ResampledView({len(self.base)} rows + {len(self.synthetic)} synthetic, "
+                f"{self.shape[1]} columns)")
+
+
+class SharedResampledView:
+    """Handle to a published ``ResampledView``; ``array`` rebuilds the view."""
+
+    def __init__(self, base, synthetic):
+        self.base = base
+        self.synthetic = synthetic
+
+    @property
+    def array(self):
+        return ResampledView(self.base.array, self.synthetic.array)
+
+    @property
+    def parts(self):
+        return (self.base, self.synthetic)
+
+    @property
+    def nbytes(self):
+        return self.base.nbytes + self.synthetic.nbytes
+
+    def __len__(self):
+        return len(self.base) + len(self.synthetic)
+
+
+class FastSMOTE(BaseEstimator):
+    """Drop-in ``SMOTE`` sampler (see module docstring).
+
+    Parameters
+    ----------
+    k_neighbors : int, default=5
+    sampling_strategy : float, str or dict, default="auto"
+        As in ``imblearn``.
+    random_state : int, optional
+        The same draws as ``SMOTE(random_state=random_state)``, up to
+        tie-breaking among equidistant neighbours.
+    index : str, default="kd_tree"
+        ``cvd.neighbors`` index for neighbour queries not answered by
+        ``neighbors``.
+    neighbors : MinorityNeighbors, optional
+        Fitted on the training set whose folds are resampled; rows of other
+        data (or of other classes) are queried as usual.
+    block_size : int, default=65536
+        Synthetic rows interpolated per vectorized step.
+    virtual : bool, default=False
+        Return a ``ResampledView`` instead of a dense matrix.
+    """
+
+    def __init__(self, k_neighbors=5, sampling_strategy="auto", random_state=None,
+                 index="kd_tree", neighbors=None, block_size=65536, virtual=False):
+        self.k_neighbors = k_neighbors
+        self.sampling_strategy = sampling_strategy
+        self.random_state = random_state
+        self.index = index
+        self.neighbors = neighbors
+        self.block_size = block_size
+        self.virtual = virtual
+
+    def fit(self, X, y):
+        self.fit_resample(X, y)
+        return self
+
+    def _neighbors(self, X_class, label):
+        """``k_neighbors`` nearest neighbours of each row within ``X_class``."""
+        k = self.k_neighbors
+        shared = self.neighbors is not None and getattr(self.neighbors, "label_", None) == label
+        if shared:
+            table, missing = self.neighbors.neighbors(X_class, k)
+        else:
+            table, missing = np.empty((len(X_class), k), dtype=np.int64), np.arange(len(X_class))
+        if len(missing):
+            index = make_index(self.index).build(X_class)
+            table[missing] = index.query(X_class[missing], k + 1)[1][:, 1:]
+        return table
+
+    def fit_resample(self, X, y):
+        columns = getattr(X, "columns", None) if not isinstance(X, FeatureMatrix) else None
+        if columns is not None:
+            X = X.to_numpy()
+        y = np.asarray(y)
+        dtype = X.dtype if np.issubdtype(X.dtype, np.floating) else np.dtype(np.float64)
+        self.sampling_strategy_ = check_sampling_strategy(self.sampling_strategy, y,
+                                                          "over-sampling")
+        n_total = sum(self.sampling_strategy_.values())
+        synthetic = np.empty((n_total, X.shape[1]), dtype=dtype)
+        labels = np.empty(n_total, dtype=y.dtype)
+        start = 0
+        for label, n_samples in self.sampling_strategy_.items():
+            if n_samples == 0:
+                continue
+            X_class = _dense(take_rows(X, np.flatnonzero(y == label)), dtype)
+            table = self._neighbors(X_class, label)
+            # the draws of imblearn's SMOTE._make_samples
+            random_state = check_random_state(self.random_state)
+            samples = random_state.randint(low=0, high=table.size, size=n_samples)
+            steps = random_state.uniform(size=n_samples)
+            rows, cols = np.divmod(samples, table.shape[1])
+            for low in range(0, n_samples, self.block_size):
+                block = slice(low, low + self.block_size)
+                origin = X_class[rows[block]]
+                target = X_class[table[rows[block], cols[block]]]
+                synthetic[start + low:start + min(low + self.block_size, n_samples)] = \
+                    origin + steps[block, None] * (target - origin)
+            labels[start:start + n_samples] = label
+            start += n_samples
+
+        y_resampled = np.concatenate([y, labels])
+        X_resampled = ResampledView(X, synthetic)
+        if self.virtual:
+            return X_resampled, y_resampled
+        X_resampled = X_resampled.to_numpy()
+        if columns is not None:
+            import pandas as pd
+
+            X_resampled = pd.DataFrame(X_resampled, columns=columns)
+        return X_resampled, y_resampled
@@ -0,0 +1,165 @@
+"""EDA figures of the notebook's Part 3, drawn from precomputed aggregates.
+
+Every figure is drawn from ``ColumnStats``, ``cvd.aggregate`` or
+``cvd.sketch`` results, not from the rows: value counts give the bar charts
+and histograms (a histogram of the distinct values weighted by their counts
+equals the histogram of the rows), grouped counts the faceted count plots,
+``QuantileSketch`` box statistics the box plots (``Axes.bxp``), and the
+cached correlation matrix the heatmaps. The interactive scatter plot gets a
+``stratified_sample`` of rows. matplotlib and seaborn are optional and
+imported only when a figure is drawn, so nothing else in the project pays
+for them.
+
+Command line (``python -m cvd plot`` is the same)::
+
+    python -m cvd.plots CVD_cleaned.csv --output figures
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+
+import numpy as np
+
+
+def _pyplot():
+    import matplotlib
+
+    matplotlib.use("Agg")  # files only, no display needed
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+def general_health_counts(stats, ax):
+    counts = stats.value_counts("General_Health")
+    ax.bar(range(len(counts)), counts.to_numpy())
+    ax.set_xticks(range(len(counts)), [str(label) for label in counts.index])
+    ax.set_title("Total People by General Health Responses")
+    ax.set_xlabel("General Health Response")
+    ax.set_ylabel("People")
+
+
+def bmi_histogram(stats, ax, bins=50):
+    counts = stats.value_counts("BMI")
+    ax.hist(counts.index.to_numpy(), bins=bins, weights=counts.to_numpy())
+    ax.set_title("Distribution of BMI")
+    ax.set_xlabel("BMI")
+    ax.set_ylabel("Frequency")
+
+
+def box_by(sketch, ax, labels=None, title=None, xlabel=None, ylabel=None):
+    """Box plot of one ``QuantileSketch`` group per box."""
+    boxes = sketch.box_stats(labels)
+    ax.bxp(boxes, showfliers=True, flierprops={"markersize": 2})
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    return boxes
+
+
+def count_facets(counts, column, by, axes, labels=None):
+    """One bar chart of ``column`` counts per ``by`` group (a ``FacetGrid``).
+
+    ``counts`` is a ``cvd.aggregate.category_counts`` frame; ``labels`` maps
+    the ``by`` codes to titles.
+    """
+    subset = counts[counts["column"] == column]
+    for code, ax in enumerate(axes):
+        group = subset[subset[by] == code]
+        ax.bar(range(len(group)), group["count"].to_numpy())
+        ax.set_xticks(range(len(group)), [str(label) for label in group["category"]])
+        ax.set_title(f"{by} = {labels[code] if labels is not None else code}")
+        ax.set_xlabel(column)
+    axes[0].set_ylabel("Count")
+
+
+def scatter_sample(frame, columns, strata, n=1000, mask=None, random_state=None, **params):
+    """DataFrame of a ``stratified_sample`` of ``frame`` rows, for ``px.scatter``.
+
+    Only the sampled rows of ``columns`` are copied out of ``frame``.
+    """
+    import pandas as pd
+
+    from cvd.sketch import stratified_sample
+
+    rows = stratified_sample([frame[c] for c in strata], n, mask=mask,
+                             random_state=random_state, **params)
+    return pd.DataFrame({c: np.asarray(frame[c])[rows] for c in columns}, index=rows)
+
+
+def disease_rates_by_sex(frame, ax,
+                         columns=("Heart_Disease", "Skin_Cancer", "Other_Cancer", "Diabetes",
+                                  "Arthritis")):
+    import seaborn as sns
+
+    from cvd.aggregate import group_rates
+    from cvd.schema import ENCODING_TABLE
+
+    rates = group_rates(frame, "Sex", list(columns), ENCODING_TABLE)
+    sns.barplot(x="Sex", y="Affected", hue="Disease", data=rates, palette="viridis", ax=ax)
+    ax.set_title("Distribution of Diseases by Gender")
+    ax.set_ylabel("Share of Individuals")
+
+
+def correlation_heatmap(stats, ax, columns=None):
+    import seaborn as sns
+
+    sns.heatmap(data=stats.corr(columns), cmap="RdBu", vmin=-1, vmax=1, annot=True,
+                fmt=".2f", ax=ax)
+
+
+def main(argv=None):
+    from cvd.encoding import DERIVED_COLUMNS
+    from cvd.ingest import BRFSS_2021_SCHEMA, ENCODED_2021_COLUMNS, load_or_ingest
+    from cvd.aggregate import category_counts
+    from cvd.schema import ENCODING_TABLE
+    from cvd.sketch import QuantileSketch
+    from cvd.stats import ColumnStats
+
+    parser = argparse.ArgumentParser(description="Write the EDA figures as PNG files.")
+    parser.add_argument("csv", help="CVD_cleaned.csv")
+    parser.add_argument("--store", default="brfss_2021_store")
+    parser.add_argument("--output", default="figures")
+    args = parser.parse_args(argv)
+
+    plt = _pyplot()
+    store = load_or_ingest(args.csv, args.store, BRFSS_2021_SCHEMA, DERIVED_COLUMNS)
+    stats = ColumnStats.for_store(store)
+    frame = store.frame(ENCODED_2021_COLUMNS)
+    # the per-group summaries behind the box plots and the facets
+    bmi_by_exercise = QuantileSketch.from_columns(frame["BMI"], frame["Exercise"], n_groups=2)
+    weight_by_age = QuantileSketch.from_columns(
+        frame["Weight_(kg)"], frame["Age_Category"], n_groups=len(ENCODING_TABLE["Age_Category"]))
+    smoking = category_counts(frame, ["Smoking_History"], "Sex", ENCODING_TABLE)
+    figures = {
+        "general_health": (lambda ax: general_health_counts(stats, ax), (8, 6)),
+        "bmi": (lambda ax: bmi_histogram(stats, ax), (8, 6)),
+        "bmi_by_exercise": (lambda ax: box_by(bmi_by_exercise, ax, ENCODING_TABLE["Exercise"],
+                                              "Box Plot of BMI by Exercise Level",
+                                              "Exercise Level", "BMI"), (8, 6)),
+        "weight_by_age": (lambda ax: box_by(weight_by_age, ax, ENCODING_TABLE["Age_Category"],
+                                            "Box Plot of Age and Weight", "Age Category",
+                                            "Weight (kg)"), (12, 6)),
+        "diseases_by_sex": (lambda ax: disease_rates_by_sex(frame, ax), (10, 6)),
+        "correlation": (lambda ax: correlation_heatmap(stats, ax, ENCODED_2021_COLUMNS),
+                        (12, 12)),
+    }
+    os.makedirs(args.output, exist_ok=True)
+    for name, (draw, size) in figures.items():
+        fig, ax = plt.subplots(figsize=size)
+        draw(ax)
+        fig.tight_layout()
+        fig.savefig(os.path.join(args.output, f"{name}.png"))
+        plt.close(fig)
+    fig, axes = plt.subplots(1, 2, figsize=(12, 6), sharey=True)
+    count_facets(smoking, "Smoking_History", "Sex", axes, ENCODING_TABLE["Sex"])
+    fig.tight_layout()
+    fig.savefig(os.path.join(args.output, "smoking_by_sex.png"))
+    plt.close(fig)
+    print(f"wrote {len(figures) + 1} figures to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
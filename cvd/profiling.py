@@ -0,0 +1,272 @@
+"""Stage timing and memory instrumentation with Chrome-trace export.
+
+Every stage records wall time, CPU time (user + system of this process,
+plus what pool workers report with ``add_cpu``), resident memory at
+start/end and the peak RSS observed while it ran (a background thread
+samples RSS every ``sample_interval`` seconds). Stages nest, and events
+measured elsewhere - e.g. individual CV fits in worker processes, see
+``SearchEngine(profiler=...)`` - can be added with ``add_event``;
+``sample_rss`` measures such a fit's own peak inside the worker.
+
+``Profiler.write_trace`` writes the Chrome trace-event format
+(``chrome://tracing`` / Perfetto), with a per-stage summary under
+``"stages"``; ``compare_traces`` diffs two such files to flag regressions::
+
+    python -m cvd.profiling compare baseline.json candidate.json --threshold 0.10
+
+Notebook-style usage without re-indenting cells::
+
+    PROFILER.begin("encode")
+    ...
+    PROFILER.end("encode")
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+def current_rss():
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return peak_rss()
+
+
+def peak_rss():
+    """High-water mark of this process's RSS in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+class _RSSSampler:
+    """Tracks the peak RSS of the process while any stage is open."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.peak = current_rss()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+@contextmanager
+def sample_rss(interval=0.01):
+    """Sample this process's RSS while the block runs.
+
+    Yields the sampler; afterwards its ``peak`` is the peak RSS of the block
+    (not the process's lifetime high-water mark).
+    """
+    sampler = _RSSSampler(interval)
+    sampler.start()
+    try:
+        yield sampler
+    finally:
+        sampler.stop()
+        sampler.peak = max(sampler.peak, current_rss())
+
+
+class Profiler:
+    """Collects stage events; see the module docstring.
+
+    Parameters
+    ----------
+    sample_interval : float, default=0.01
+        Seconds between RSS samples while a stage is open.
+    enabled : bool, default=True
+        When False, nothing is recorded.
+    """
+
+    def __init__(self, sample_interval=0.01, enabled=True):
+        self.sample_interval = sample_interval
+        self.enabled = enabled
+        self.events = []
+        self._open = []
+        self._sampler = None
+        self._lock = threading.Lock()
+
+    def begin(self, name, **args):
+        if not self.enabled:
+            return
+        if not self._open:
+            self._sampler = _RSSSampler(self.sample_interval)
+            self._sampler.start()
+        rss = current_rss()
+        self._open.append({
+            "name": name,
+            "args": args,
+            "ts": time.time_ns() // 1000,
+            "wall": time.perf_counter(),
+            "cpu": cpu_seconds(),
+            "worker_cpu": 0.0,
+            "rss": rss,
+            "outer_peak": self._sampler.peak,
+        })
+        # each stage tracks its own peak from its start
+        self._sampler.peak = rss
+
+    def end(self, name=None):
+        if not self.enabled:
+            return
+        if not self._open:
+            raise RuntimeError("Profiler.end() called with no open stage")
+        if name is not None and self._open[-1]["name"] != name:
+            raise RuntimeError(f"Closing stage {name!r} but {self._open[-1]['name']!r} is open")
+        start = self._open.pop()
+        rss = current_rss()
+        peak = max(self._sampler.peak, rss)
+        path = "/".join([frame["name"] for frame in self._open] + [start["name"]])
+        self.add_event(
+            start["name"], start["ts"], time.perf_counter() - start["wall"],
+            cpu=cpu_seconds() - start["cpu"] + start["worker_cpu"],
+            worker_cpu=start["worker_cpu"], rss_start=start["rss"], rss_end=rss,
+            peak_rss=peak, path=path, **start["args"],
+        )
+        # the enclosing stage's peak includes this one
+        self._sampler.peak = max(peak, start["outer_peak"])
+        if not self._open:
+            self._sampler.stop()
+
+    def add_cpu(self, seconds):
+        """Add CPU seconds spent in other processes (e.g. pool workers) on
+        behalf of every open stage."""
+        if not self.enabled:
+            return
+        for frame in self._open:
+            frame["worker_cpu"] += seconds
+
+    @contextmanager
+    def stage(self, name, **args):
+        self.begin(name, **args)
+        try:
+            yield self
+        finally:
+            self.end(name)
+
+    def add_event(self, name, ts_us, duration, pid=None, tid=None, category="stage", **args):
+        """Record a finished event (``ts_us``: epoch microseconds)."""
+        if not self.enabled:
+            return
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": int(ts_us),
+            "dur": int(duration * 1e6),
+            "pid": os.getpid() if pid is None else pid,
+            "tid": threading.get_ident() if tid is None else tid,
+            "args": args,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def summary(self):
+        """Per stage path: count and totals of wall/CPU seconds, max peak RSS."""
+        stages = {}
+        for event in self.events:
+            key = event["args"].get("path", f"{event['cat']}/{event['name']}")
+            entry = stages.setdefault(key, {"count": 0, "wall_s": 0.0, "cpu_s": 0.0,
+                                            "peak_rss_mb": 0.0})
+            entry["count"] += 1
+            entry["wall_s"] += event["dur"] / 1e6
+            entry["cpu_s"] += event["args"].get("cpu", 0.0)
+            peak = event["args"].get("peak_rss", 0) / 2**20
+            entry["peak_rss_mb"] = max(entry["peak_rss_mb"], peak)
+        return stages
+
+    def report(self, file=None):
+        """Print the summary as a table."""
+        file = file or sys.stdout
+        print(f"{'stage':<40}{'n':>5}{'wall s':>10}{'cpu s':>10}{'peak MB':>10}", file=file)
+        for key, entry in self.summary().items():
+            print(f"{key:<40}{entry['count']:>5}{entry['wall_s']:>10.3f}"
+                  f"{entry['cpu_s']:>10.3f}{entry['peak_rss_mb']:>10.1f}", file=file)
+
+    def write_trace(self, path, **metadata):
+        """Write a Chrome trace-event JSON file with the stage summary."""
+        with open(path, "w") as handle:
+            json.dump({
+                "traceEvents": self.events,
+                "displayTimeUnit": "ms",
+                "stages": self.summary(),
+                "metadata": metadata,
+            }, handle, indent=1)
+
+    def reset(self):
+        self.events = []
+
+
+# process-wide profiler used by the notebook and the search engine
+PROFILER = Profiler()
+stage = PROFILER.stage
+
+
+def compare_traces(baseline, candidate, threshold=0.10, metric="wall_s"):
+    """Stages whose ``metric`` grew by more than ``threshold`` (a fraction).
+
+    ``baseline``/``candidate`` are trace file paths or loaded trace dicts.
+    Returns ``[(stage, baseline, candidate, relative_change)]``, worst first.
+    """
+    def stages(trace):
+        if isinstance(trace, str):
+            with open(trace) as handle:
+                trace = json.load(handle)
+        return trace["stages"]
+
+    old, new = stages(baseline), stages(candidate)
+    regressions = []
+    for key in old.keys() & new.keys():
+        before, after = old[key][metric], new[key][metric]
+        if before > 0 and (after - before) / before > threshold:
+            regressions.append((key, before, after, (after - before) / before))
+    return sorted(regressions, key=lambda item: item[3], reverse=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect profiler traces.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compare = commands.add_parser("compare", help="flag stages that got slower")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+    compare.add_argument("--threshold", type=float, default=0.10)
+    compare.add_argument("--metric", default="wall_s",
+                         choices=["wall_s", "cpu_s", "peak_rss_mb"])
+    args = parser.parse_args(argv)
+
+    regressions = compare_traces(args.baseline, args.candidate, args.threshold, args.metric)
+    for key, before, after, change in regressions:
+        print(f"{key}: {before:.3f} -> {after:.3f} ({change:+.0%})")
+    if regressions:
+        sys.exit(1)
+    print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Content-keyed cache for resampled (e.g. SMOTE) training data.
+
+In the ``ImbPipeline`` variants, SMOTE runs before any tuned step, so every
+hyperparameter candidate in a fold resamples exactly the same rows. The cache
+keys each ``fit_resample`` call on the sampler's class and parameters plus a
+hash of the input arrays, so the oversampler runs once per distinct fold no
+matter how many candidates or model families use it.
+
+``FoldCache`` in ``cvd.search`` uses ``DEFAULT_CACHE`` automatically; for a
+plain ``GridSearchCV`` wrap the sampler instead::
+
+    ImbPipeline([
+        ('smote', CachedSampler(SMOTE(random_state=seed))),
+        ('scaler', StandardScaler()),
+        ('logistic_regression', LogisticRegression(max_iter=1000)),
+    ])
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+
+import numpy as np
+from joblib import hash as joblib_hash
+from sklearn.base import BaseEstimator, clone
+
+
+def _nbytes(*arrays):
+    return sum(getattr(array, "nbytes", 0) for array in arrays)
+
+
+def is_deterministic(sampler):
+    """Whether repeated ``fit_resample`` calls give identical output.
+
+    Samplers with ``random_state=None`` draw new synthetic rows on every
+    call, so caching them would change results; they are never cached.
+    """
+    params = sampler.get_params(deep=False)
+    return "random_state" not in params or params["random_state"] is not None
+
+
+class ResampleCache:
+    """Bounded LRU cache of ``fit_resample`` outputs.
+
+    Parameters
+    ----------
+    max_bytes : int, default=2 GiB
+        Upper bound on the total size of cached arrays. Least recently used
+        entries are evicted to stay under it; a single result larger than
+        the bound is returned without being stored.
+
+    The cache is a shared handle: ``copy.deepcopy`` (and therefore
+    ``sklearn.base.clone``) returns the same object, so every clone of a
+    ``CachedSampler`` made by a grid search shares one cache. Worker
+    processes receive their own copy.
+    """
+
+    def __init__(self, max_bytes=2 * 1024**3):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, sampler, X, y):
+        params = sampler.get_params(deep=True)
+        return joblib_hash((type(sampler).__name__, params, np.asarray(X), np.asarray(y)))
+
+    def fit_resample(self, sampler, X, y):
+        """Return ``clone(sampler).fit_resample(X, y)``, cached when possible."""
+        if not is_deterministic(sampler):
+            self.misses += 1
+            return clone(sampler).fit_resample(X, y)
+
+        key = self.key(sampler, X, y)
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        self.misses += 1
+        result = clone(sampler).fit_resample(X, y)
+        self._store(key, result)
+        return result
+
+    def _store(self, key, result):
+        size = _nbytes(*result)
+        if size > self.max_bytes:
+            return
+        while self._entries and self.nbytes + size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= _nbytes(*evicted)
+            self.evictions += 1
+        self._entries[key] = result
+        self.nbytes += size
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "nbytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# process-wide cache shared by every SMOTE pipeline in the project
+DEFAULT_CACHE = ResampleCache()
+
+
+class CachedSampler(BaseEstimator):
+    """Pipeline step that routes a sampler's ``fit_resample`` through a cache.
+
+    Parameters
+    ----------
+    sampler : imblearn sampler
+        E.g. ``SMOTE(random_state=seed)``.
+    cache : ResampleCache, optional
+        Defaults to ``DEFAULT_CACHE``.
+    """
+
+    def __init__(self, sampler, cache=None):
+        self.sampler = sampler
+        self.cache = cache
+
+    def fit(self, X, y):
+        self.fit_resample(X, y)
+        return self
+
+    def fit_resample(self, X, y):
+        cache = DEFAULT_CACHE if self.cache is None else self.cache
+        return cache.fit_resample(self.sampler, X, y)
@@ -0,0 +1,252 @@
+"""Numpy-only scoring runtime for the tuned models.
+
+Scoring a ``save_model`` bundle unpickles the sklearn pipeline, which pulls
+in sklearn, scipy, joblib and pandas before the first row is read. For the
+model kinds the notebook selects, the fitted pipeline reduces to a few
+arrays, so ``export_model`` writes those to an ``.npz`` next to the bundle:
+
+* ``"linear"`` - ``StandardScaler`` / ``PCA`` / logistic regression pipelines
+  (samplers such as SMOTE are skipped at prediction time) folded into one
+  affine map, ``p = sigmoid(x @ weights + bias)``;
+* ``"forest"`` - binary random forests as a ``FlatForest``.
+
+``load_runtime`` and ``score_csv`` need numpy and the standard library only:
+raw ``CVD_cleaned.csv`` records are encoded with the ``cvd.schema`` tables,
+which are the ones ``BRFSSEncoder`` uses. Other estimators (e.g. KNN) have
+no runtime form and are scored through ``cvd.serve``.
+
+Command line (``python -m cvd score`` is the same)::
+
+    python -m cvd.runtime models/rf.npz --input new_rows.csv --output scores.csv
+    python -m cvd.runtime models/rf.npz --input new_rows.csv --cache-size 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import time
+
+import numpy as np
+
+from cvd.forest import FlatForest
+from cvd.memo import PredictionCache
+from cvd.schema import DERIVED_COLUMNS, ENCODING_TABLE
+
+RUNTIME_VERSION = 1
+
+
+class LinearModel:
+    """Binary logistic model on raw features: ``sigmoid(X @ weights + bias)``."""
+
+    def __init__(self, weights, bias, classes):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.classes_ = np.asarray(classes)
+
+    def decision_function(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.weights + self.bias
+
+    def predict_proba(self, X):
+        positive = 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1 - positive, positive])
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(np.intp)]
+
+    def save(self, path, **extra):
+        np.savez(path, **extra, weights=self.weights, bias=self.bias, classes=self.classes_)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["weights"], data["bias"], data["classes"])
+
+
+MODEL_KINDS = {"linear": LinearModel, "forest": FlatForest}
+
+
+def fold_linear(estimator):
+    """``LinearModel`` equivalent to a fitted linear pipeline, else ``None``.
+
+    Supported steps: samplers (ignored), ``StandardScaler``, ``PCA`` or
+    ``StreamingPCA``, and a final binary ``LogisticRegression`` (anything
+    with ``coef_``).
+    """
+    from sklearn.decomposition import PCA
+    from sklearn.preprocessing import StandardScaler
+
+    from cvd.decomposition import StreamingPCA
+
+    steps = [step for _, step in getattr(estimator, "steps", [("model", estimator)])]
+    *transforms, model = [step for step in steps if not hasattr(step, "fit_resample")]
+    if not hasattr(model, "coef_") or len(getattr(model, "classes_", ())) != 2:
+        return None
+
+    # compose x -> x @ W + c through every step
+    n_features = model.n_features_in_ if not transforms else transforms[0].n_features_in_
+    W, c = np.eye(n_features), np.zeros(n_features)
+    for step in transforms:
+        if isinstance(step, StandardScaler):
+            mean = step.mean_ if step.mean_ is not None else 0.0
+            scale = step.scale_ if step.scale_ is not None else 1.0
+            W, c = W / scale, (c - mean) / scale
+        elif isinstance(step, (PCA, StreamingPCA)):
+            projection = step.components_.T
+            if step.whiten:
+                projection = projection / np.sqrt(step.explained_variance_)
+            W, c = W @ projection, (c - step.mean_) @ projection
+        else:
+            return None
+    coef = np.asarray(model.coef_, dtype=np.float64).ravel()
+    return LinearModel(W @ coef, c @ coef + float(np.ravel(model.intercept_)[0]),
+                       model.classes_)
+
+
+def export_model(estimator, path, feature_columns):
+    """Write the numpy runtime form of ``estimator`` to ``path`` (``.npz``).
+
+    Raises ``ValueError`` for estimators without one.
+    """
+    from cvd.forest import compile_estimator
+
+    model = compile_estimator(estimator)
+    kind = "forest"
+    if model is None:
+        model, kind = fold_linear(estimator), "linear"
+    if model is None:
+        raise ValueError(f"{type(estimator).__name__} has no numpy runtime form")
+    model.save(path, runtime_version=RUNTIME_VERSION, kind=kind,
+               feature_columns=np.asarray(list(feature_columns), dtype=str))
+
+
+class RuntimeModel:
+    """A model loaded by ``load_runtime``: the predictor plus its columns.
+
+    With ``cache_size`` predictions are memoized on exact encoded rows by a
+    ``cvd.memo.PredictionCache`` (``self.cache``).
+    """
+
+    def __init__(self, model, kind, feature_columns, cache_size=None):
+        self.model = model
+        self.kind = kind
+        self.feature_columns = list(feature_columns)
+        self.encoder = RecordEncoder(self.feature_columns)
+        self.cache = (None if cache_size is None
+                      else PredictionCache(self._predict_rows, max_entries=cache_size))
+
+    def _predict_rows(self, X):
+        return self.model.predict_proba(X)[:, 1]
+
+    def predict_proba(self, X):
+        """Positive-class probability of every row of an encoded matrix."""
+        if self.cache is not None:
+            return self.cache.predict(X)
+        return self._predict_rows(X)
+
+    def score_columns(self, columns, encoded=False):
+        """Scores for ``{column: values}`` of raw (or encoded) records."""
+        if encoded:
+            X = np.column_stack([_floats(columns[c]) for c in self.feature_columns])
+        else:
+            X = self.encoder.transform(columns)
+        return self.predict_proba(X)
+
+
+def load_runtime(path, cache_size=None):
+    with np.load(path, allow_pickle=False) as data:
+        if int(data["runtime_version"]) != RUNTIME_VERSION:
+            raise ValueError(f"{path} is not a version {RUNTIME_VERSION} runtime model")
+        kind = str(data["kind"])
+        feature_columns = [str(column) for column in data["feature_columns"]]
+    return RuntimeModel(MODEL_KINDS[kind].load(path), kind, feature_columns, cache_size)
+
+
+def _floats(values):
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except ValueError:  # empty fields
+        return np.array([float(v) if v not in ("", None) else np.nan for v in values])
+
+
+class RecordEncoder:
+    """``BRFSSEncoder`` for raw string columns, in numpy only.
+
+    Unknown categories and empty fields become NaN, as in ``BRFSSEncoder``.
+    """
+
+    def __init__(self, feature_columns):
+        self.feature_columns = list(feature_columns)
+
+    def transform(self, columns):
+        encoded = []
+        for column in self.feature_columns:
+            if column in ENCODING_TABLE:
+                # look up each distinct label once
+                labels, inverse = np.unique(np.asarray(columns[column], dtype=str),
+                                            return_inverse=True)
+                codes = {label: code for code, label in enumerate(ENCODING_TABLE[column])}
+                table = np.array([codes.get(label, np.nan) for label in labels], dtype=np.float64)
+                encoded.append(table[inverse.ravel()])
+            elif column in DERIVED_COLUMNS:
+                added, subtracted = DERIVED_COLUMNS[column]
+                total = sum(_floats(columns[name]) for name in added)
+                for name in subtracted:
+                    total = total - _floats(columns[name])
+                encoded.append(total)
+            else:
+                encoded.append(_floats(columns[column]))
+        return np.column_stack(encoded)
+
+
+def _chunks(reader, chunksize):
+    rows = []
+    for row in reader:
+        rows.append(row)
+        if len(rows) == chunksize:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+
+def score_csv(model, input_path, output_path=None, chunksize=100_000, encoded=False):
+    """Score a CSV in chunks; returns the scores, optionally writing them."""
+    scores = []
+    with open(input_path, newline="") as handle:
+        reader = csv.reader(handle)
+        header = next(reader)
+        for rows in _chunks(reader, chunksize):
+            columns = dict(zip(header, zip(*rows)))
+            scores.append(model.score_columns(columns, encoded=encoded))
+    scores = np.concatenate(scores) if scores else np.empty(0)
+    if output_path is not None:
+        with open(output_path, "w", newline="") as handle:
+            handle.write("score\n")
+            handle.writelines(f"{score!r}\n" for score in scores.tolist())
+    return scores
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score BRFSS records with a runtime model.")
+    parser.add_argument("model", help="model written by cvd.runtime.export_model")
+    parser.add_argument("--input", required=True, help="CSV of raw (or --encoded) records")
+    parser.add_argument("--output", help="write one score per input row to this CSV")
+    parser.add_argument("--encoded", action="store_true", help="input is already encoded")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--cache-size", type=int,
+                        help="memoize predictions of up to this many distinct rows")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    model = load_runtime(args.model, args.cache_size)
+    scores = score_csv(model, args.input, args.output, args.chunksize, args.encoded)
+    elapsed = time.perf_counter() - start
+    print(f"{model.kind}: {len(scores):,} rows in {elapsed:.2f}s "
+          f"({len(scores) / elapsed if elapsed > 0 else float('inf'):,.0f} rows/s)")
+    if model.cache is not None:
+        print(f"cache: {model.cache.summary()}")
+
+
+if __name__ == "__main__":
+    main()
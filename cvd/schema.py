@@ -0,0 +1,68 @@
+"""Column tables of the BRFSS surveys, free of any third-party import.
+
+``cvd.encoding`` (pandas/sklearn) and the numpy-only scoring runtime
+(``cvd.runtime``) both encode records from these tables, so they always
+agree on the codes. ``YEAR_MAPPINGS`` maps each survey year's stored
+columns onto the encoded 2021 columns, the harmonized schema of
+``cvd.featurestore``.
+"""
+
+# column -> categories in code order (index in the list == encoded value)
+ENCODING_TABLE = {
+    "General_Health": ["Poor", "Fair", "Good", "Very Good", "Excellent"],
+    "Checkup": [
+        "Within the past year",
+        "Within the past 2 years",
+        "Within the past 5 years",
+        "5 or more years ago",
+        "Never",
+    ],
+    "Exercise": ["No", "Yes"],
+    "Heart_Disease": ["No", "Yes"],
+    "Skin_Cancer": ["No", "Yes"],
+    "Other_Cancer": ["No", "Yes"],
+    "Depression": ["No", "Yes"],
+    "Diabetes": [
+        "No",
+        "No, pre-diabetes or borderline diabetes",
+        "Yes, but female told only during pregnancy",
+        "Yes",
+    ],
+    "Arthritis": ["No", "Yes"],
+    "Sex": ["Female", "Male"],
+    "Age_Category": [
+        "18-24", "25-29", "30-34", "35-39", "40-44", "45-49", "50-54",
+        "55-59", "60-64", "65-69", "70-74", "75-79", "80+",
+    ],
+    "Smoking_History": ["No", "Yes"],
+}
+
+# derived column -> (columns added, columns subtracted)
+DERIVED_COLUMNS = {
+    "Diet": (
+        ["Fruit_Consumption", "Green_Vegetables_Consumption"],
+        ["FriedPotato_Consumption"],
+    ),
+}
+
+# numeric columns carried over unchanged, after the encoded ones
+PASSTHROUGH_COLUMNS = ["Height_(cm)", "Weight_(kg)", "BMI", "Alcohol_Consumption"]
+
+# harmonized column -> (source column, {source value: harmonized code}), with
+# ``None`` for numeric columns copied as they are. Columns a year does not
+# provide are stored as missing (-1 codes / NaN) in its partition.
+BRFSS_2015_MAPPING = {
+    # GenHlth is 1 (excellent) .. 5 (poor)
+    "General_Health": ("GenHlth", {1: 4, 2: 3, 3: 2, 4: 1, 5: 0}),
+    "Exercise": ("PhysActivity", {0: 0, 1: 1}),
+    "Heart_Disease": ("HeartDiseaseorAttack", {0: 0, 1: 1}),
+    # 0 no, 1 pre-diabetes, 2 diabetes
+    "Diabetes": ("Diabetes", {0: 0, 1: 1, 2: 3}),
+    "Sex": ("Sex", {0: 0, 1: 1}),
+    # Age is the same 13 five-year bands, numbered from 1
+    "Age_Category": ("Age", {age: age - 1 for age in range(1, 14)}),
+    "Smoking_History": ("Smoker", {0: 0, 1: 1}),
+    "BMI": ("BMI", None),
+}
+
+YEAR_MAPPINGS = {"2015": BRFSS_2015_MAPPING, "2021": None}  # None: already harmonized
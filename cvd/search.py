@@ -0,0 +1,721 @@
+"""Parallel, fold-cached hyperparameter search shared by all model families.
+
+``GridSearchCV`` re-splits the training data and re-fits every pipeline step
+for each candidate in each fold. ``SearchEngine`` instead splits ``X`` once,
+fits the untuned leading steps of each pipeline (e.g. ``SMOTE``,
+``StandardScaler`` and ``PCA``) once per fold, caches the transformed fold
+matrices and then runs
+the candidate x fold jobs of every registered family in a single process
+pool. Families registered with a ``Halving`` schedule are searched by
+successive halving instead: candidates are scored on a growing budget of
+training rows or forest trees and the losers are dropped after each round.
+
+Example::
+
+    search = SearchEngine(cv=5, scoring="accuracy", n_jobs=-1)
+    search.add("lr", pipeline_lr, param_grid_lr)
+    search.add("rf", RandomForestClassifier(), param_grid_rf, halving="n_estimators")
+    results = search.fit(X_train, y_train)
+    results["lr"].best_params_, results["lr"].predict(X_test)
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from bisect import bisect_left
+
+import numpy as np
+from joblib import Parallel, delayed, hash as joblib_hash
+from scipy.stats import rankdata
+from sklearn.base import BaseEstimator, ClassifierMixin, clone, is_classifier
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import ParameterGrid, check_cv
+from sklearn.pipeline import Pipeline
+
+from cvd.cache import fingerprint
+from cvd.matrix import FeatureMatrix
+from cvd.profiling import PROFILER, cpu_seconds, current_rss, sample_rss
+from cvd.resampling import DEFAULT_CACHE
+from cvd.shared import SharedArena, SharedFold, resolve, take_rows
+
+
+def _tuned_steps(param_grid):
+    """Names of the pipeline steps that appear in any grid parameter."""
+    grids = param_grid if isinstance(param_grid, list) else [param_grid]
+    return {key.split("__", 1)[0] for grid in grids for key in grid}
+
+
+def split_pipeline(estimator, param_grid):
+    """Split ``estimator`` into an untuned, cacheable prefix and the rest.
+
+    The prefix is the longest run of leading pipeline steps that are not
+    referenced by ``param_grid``. It may contain samplers (steps with
+    ``fit_resample``); like in ``ImbPipeline`` they are applied to the
+    training rows of a fold only.
+    """
+    if not isinstance(estimator, Pipeline):
+        return [], estimator
+
+    tuned = _tuned_steps(param_grid)
+    steps = estimator.steps
+    cut = 0
+    for name, step in steps[:-1]:
+        if name in tuned or step in (None, "passthrough"):
+            break
+        cut += 1
+    prefix = steps[:cut]
+    suffix = type(estimator)(steps[cut:])
+    return prefix, suffix
+
+
+def _step_key(steps):
+    return joblib_hash([(type(step).__name__, step.get_params(deep=True)) for _, step in steps])
+
+
+class FoldCache:
+    """CV folds of one training set plus cached preprocessed fold matrices.
+
+    Fold matrices are keyed by the (unfitted) prefix steps that produced
+    them, so e.g. the scaled folds are computed once and shared by every
+    family whose pipeline starts with the same ``StandardScaler``; a
+    ``StandardScaler`` + ``PCA`` prefix reuses the cached scaled folds.
+    Sampler steps resample the training rows through ``resample_cache``
+    (``cvd.resampling.DEFAULT_CACHE`` by default), so e.g. the SMOTE output
+    of a fold is shared by every SMOTE pipeline.
+
+    With ``shared=True`` the training matrix, the fold row indices and every
+    preprocessed fold matrix are published once to a ``SharedArena`` and
+    ``task_fold`` returns ``SharedFold`` handles: workers attach to the same
+    pages instead of each receiving pickled copies, so memory stays flat as
+    workers are added. Raw folds are gathered from the shared matrix inside
+    the worker, for the duration of one fit. A ``FeatureMatrix`` ``X`` is
+    kept (and published) in its compact int8/float32 form; estimators
+    convert only the fold rows they are fitted on.
+    """
+
+    def __init__(self, X, y, cv=5, classifier=True, resample_cache=None, shared=False):
+        # a FeatureMatrix stays compact: folds are gathered from its buffer
+        self.X = X if isinstance(X, FeatureMatrix) else np.asarray(X)
+        self.y = np.asarray(y)
+        self.resample_cache = DEFAULT_CACHE if resample_cache is None else resample_cache
+        splitter = check_cv(cv, self.y, classifier=classifier)
+        self.splits = list(splitter.split(self.X, self.y))
+        self._cache = {}
+        self.hits = 0
+        self.misses = 0
+        self.arena = SharedArena() if shared else None
+        if shared:
+            self._shared_X = self.arena.publish(self.X)
+            self._shared_y = self.arena.publish(self.y)
+            self._shared_splits = [
+                (self.arena.publish(train), self.arena.publish(valid))
+                for train, valid in self.splits
+            ]
+
+    def __len__(self):
+        return len(self.splits)
+
+    def fold(self, index, prefix=()):
+        """Return ``(X_train, y_train, X_valid, y_valid)`` for a fold."""
+        return resolve(self.task_fold(index, prefix))
+
+    def task_fold(self, index, prefix=()):
+        """The fold as sent to workers: arrays, or a ``SharedFold`` if shared."""
+        prefix = list(prefix)
+        key = (index, _step_key(prefix))
+        if key in self._cache:
+            self.hits += 1
+            return self._cache[key]
+
+        self.misses += 1
+        if not prefix and self.arena is not None:
+            train, valid = self._shared_splits[index]
+            result = SharedFold(self._shared_X, self._shared_y, self._shared_X,
+                                self._shared_y, train_rows=train, valid_rows=valid)
+        elif not prefix:
+            train, valid = self.splits[index]
+            result = (take_rows(self.X, train), self.y[train], take_rows(self.X, valid),
+                      self.y[valid])
+        else:
+            X_tr, y_tr, X_va, y_va = self.fold(index, prefix[:-1])
+            step = prefix[-1][1]
+            if hasattr(step, "fit_resample"):
+                X_tr, y_tr = self.resample_cache.fit_resample(step, X_tr, y_tr)
+            else:
+                step = clone(step)
+                X_tr = step.fit_transform(X_tr, y_tr)
+                X_va = step.transform(X_va)
+            result = (X_tr, y_tr, X_va, y_va)
+            if self.arena is not None:
+                result = SharedFold(*(self.arena.publish(array) for array in result))
+        self._cache[key] = result
+        return result
+
+    def n_train(self, index, prefix=()):
+        """Number of training rows of a fold after ``prefix``."""
+        entry = self.task_fold(index, prefix)
+        if isinstance(entry, SharedFold):
+            return len(entry.y_train if entry.train_rows is None else entry.train_rows)
+        return len(entry[1])
+
+    def clear(self):
+        """Drop the cached fold matrices (the shared training data is kept)."""
+        for key, entry in self._cache.items():
+            if key[1] != _step_key([]) and isinstance(entry, SharedFold):
+                for handle in (entry.X_train, entry.y_train, entry.X_valid, entry.y_valid):
+                    self.arena.release(handle)
+        self._cache.clear()
+
+    def close(self):
+        """Remove every shared file; the cache cannot be used afterwards."""
+        self._cache.clear()
+        if self.arena is not None:
+            self.arena.close()
+
+
+def _subsample_rows(y, n_rows, seed):
+    """Sorted, class-stratified random subset of ``n_rows`` row indices.
+
+    Subsets drawn with the same ``seed`` and a larger ``n_rows`` contain the
+    smaller ones, so successive rounds train on growing, nested samples.
+    """
+    order = np.random.default_rng(seed).permutation(len(y))
+    classes, counts = np.unique(y, return_counts=True)
+    quota = np.maximum(np.round(counts * n_rows / len(y)).astype(np.int64), 1)
+    rows = [order[y[order] == label][:size] for label, size in zip(classes, quota)]
+    return np.sort(np.concatenate(rows))
+
+
+def _fit_and_score(estimator, params, fold, scoring, budget=None, valid_sizes=None):
+    """Fit one candidate on a fold and score it on the validation rows.
+
+    With ``valid_sizes`` the validation rows are consecutive blocks of these
+    sizes and the score is a list with one score per block, all from the
+    same fit (see ``cvd.nested``).
+    """
+    X_train, y_train, X_valid, y_valid = resolve(fold)
+    estimator = clone(estimator).set_params(**params)
+    grow = budget is not None and "n_estimators" in budget
+    if budget is not None and "n_samples" in budget:
+        rows = _subsample_rows(y_train, budget["n_samples"], budget["seed"])
+        X_train, y_train = take_rows(X_train, rows), y_train[rows]
+    if grow:
+        estimator.set_params(**{budget["param"]: budget["n_estimators"],
+                                budget["seed_param"]: budget["seed"]})
+    trace = {"ts": time.time_ns() // 1000, "pid": os.getpid(), "cpu": cpu_seconds(),
+             "rss_start": current_rss()}
+    with sample_rss() as rss:
+        start = time.perf_counter()
+        estimator.fit(X_train, y_train)
+        fit_time = time.perf_counter() - start
+        start = time.perf_counter()
+        parts = [(X_valid, y_valid)]
+        if valid_sizes is not None:
+            bounds = np.cumsum([0, *valid_sizes])
+            parts = [(take_rows(X_valid, slice(low, high)), y_valid[low:high])
+                     for low, high in zip(bounds[:-1], bounds[1:])]
+        scores = []
+        for X_part, y_part in parts:
+            if grow:
+                # only this round's new trees were fitted; the main process
+                # adds their votes to those of the earlier rounds' trees and
+                # scores the total
+                scores.append((estimator.predict_proba(X_part) * budget["n_estimators"],
+                               estimator.classes_))
+            else:
+                scores.append(check_scoring(estimator, scoring=scoring)(estimator, X_part,
+                                                                        y_part))
+        score = scores if valid_sizes is not None else scores[0]
+        score_time = time.perf_counter() - start
+    # CPU time of the worker process, and its RSS peak during this fit (not
+    # the worker's lifetime high-water mark)
+    trace["cpu"] = cpu_seconds() - trace["cpu"]
+    trace["peak_rss"] = rss.peak
+    return score, fit_time, score_time, trace
+
+
+def _refit(estimator, params, X, y):
+    trace = {"pid": os.getpid(), "cpu": cpu_seconds()}
+    estimator = clone(estimator).set_params(**params).fit(X, y)
+    trace["cpu"] = cpu_seconds() - trace["cpu"]
+    return estimator, trace
+
+
+def _worker_cpu(trace):
+    """CPU seconds of a job run by another process (in-process jobs are
+    already part of this process's CPU time)."""
+    return trace["cpu"] if trace["pid"] != os.getpid() else 0.0
+
+
+class _AveragedForest(ClassifierMixin, BaseEstimator):
+    """Scorer adapter for a forest grown over several rounds: class
+    probabilities are precomputed (the average over all trees so far)."""
+
+    def __init__(self, proba, classes):
+        self.proba = proba
+        self.classes = classes
+
+    def fit(self, X, y):
+        return self
+
+    @property
+    def classes_(self):
+        return self.classes
+
+    def predict_proba(self, X):
+        return self.proba
+
+    def predict(self, X):
+        # ties go to the first class, like RandomForestClassifier.predict
+        return self.classes[np.argmax(self.proba, axis=1)]
+
+
+class Halving:
+    """Successive-halving schedule for one model family.
+
+    Every candidate is first scored with a small budget; after each round
+    only the best ``1 / factor`` survive and the budget grows by ``factor``
+    until the last round, which uses the full budget.
+
+    Parameters
+    ----------
+    resource : {"n_samples", "n_estimators"}, default="n_samples"
+        ``"n_samples"`` trains on nested, class-stratified subsets of each
+        fold's training rows (validation rows are always complete).
+        ``"n_estimators"`` grows a random forest (``RandomForestClassifier``
+        or ``ExtraTreesClassifier``, possibly as the last pipeline step): a
+        surviving candidate keeps its trees and each round only fits the
+        extra trees, as with ``warm_start=True``.
+    factor : int, default=3
+    min_resources : int, optional
+        Budget of the first round; by default chosen so the last round uses
+        exactly ``max_resources``.
+    max_resources : int, optional
+        Full budget; defaults to the smallest fold training set, or the
+        forest's ``n_estimators``.
+    random_state : int, default=0
+        Seeds the row subsets / the trees added in each round.
+    """
+
+    def __init__(self, resource="n_samples", factor=3, min_resources=None, max_resources=None,
+                 random_state=0):
+        if resource not in ("n_samples", "n_estimators"):
+            raise ValueError(f"Unknown halving resource {resource!r}")
+        self.resource = resource
+        self.factor = factor
+        self.min_resources = min_resources
+        self.max_resources = max_resources
+        self.random_state = random_state
+
+    def schedule(self, n_candidates, max_resources):
+        """``[(n_candidates, resources)]`` for every round."""
+        n_rounds = 1 + int(np.floor(np.log(max(n_candidates, 1)) / np.log(self.factor) + 1e-9))
+        smallest = self.min_resources
+        if smallest is None:
+            smallest = max_resources / self.factor ** (n_rounds - 1)
+        rounds = []
+        for index in range(n_rounds):
+            resources = max_resources if index == n_rounds - 1 else smallest * self.factor ** index
+            candidates = int(np.ceil(n_candidates / self.factor ** index))
+            rounds.append((candidates, max(int(min(resources, max_resources)), 1)))
+        return rounds
+
+
+def _forest_params(estimator):
+    """``(n_estimators, random_state)`` parameter names of a forest (step)."""
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+
+    prefix = ""
+    if isinstance(estimator, Pipeline):
+        prefix = f"{estimator.steps[-1][0]}__"
+        estimator = estimator.steps[-1][1]
+    if not isinstance(estimator, (RandomForestClassifier, ExtraTreesClassifier)):
+        raise TypeError("Halving(resource='n_estimators') needs a random forest estimator")
+    return f"{prefix}n_estimators", f"{prefix}random_state"
+
+
+class _FamilySearch:
+    """State of one family's search across (halving) rounds."""
+
+    def __init__(self, name, estimator, param_grid, halving, folds, primary="score",
+                 seeds=None):
+        self.name = name
+        self.halving = halving
+        self.primary = primary
+        self.prefix, self.suffix = split_pipeline(estimator, param_grid)
+        self.candidates = list(ParameterGrid(param_grid))
+        self.folds = folds
+        n_candidates, n_splits = len(self.candidates), len(folds)
+        # per-fold offsets of the halving seeds; folds that train on the same
+        # rows may share one so that their fits are identical
+        self.seeds = list(range(n_splits)) if seeds is None else list(seeds)
+
+        if halving is None:
+            self.max_resources = 1
+            self.rounds = [(n_candidates, 1)]
+        elif halving.resource == "n_samples":
+            self.max_resources = halving.max_resources or min(
+                folds.n_train(index, self.prefix) for index in range(n_splits))
+            self.rounds = halving.schedule(n_candidates, self.max_resources)
+        else:
+            self.param, self.seed_param = _forest_params(self.suffix)
+            self.max_resources = halving.max_resources or self.suffix.get_params()[self.param]
+            self.rounds = halving.schedule(n_candidates, self.max_resources)
+            self.votes = {}
+
+        self.alive = list(range(n_candidates))
+        self.scores = {}  # metric -> (candidates, folds) scores
+        self.fit_times = np.zeros((n_candidates, n_splits))
+        self.score_times = np.zeros((n_candidates, n_splits))
+        self.iteration = np.zeros(n_candidates, dtype=np.int64)
+        self.n_resources = np.zeros(n_candidates, dtype=np.int64)
+        self.units = 0.0
+        self.n_fits = 0
+        self.fit_seconds = 0.0
+        self._y_valid = {}
+
+    def jobs(self, round_):
+        """``(candidate, fold, budget)`` of every fit in ``round_``."""
+        if round_ >= len(self.rounds):
+            return []
+        resources = self.rounds[round_][1]
+        jobs = []
+        for candidate in self.alive:
+            for fold in range(len(self.folds)):
+                if self.halving is None:
+                    budget = None
+                elif self.halving.resource == "n_samples":
+                    budget = {"n_samples": resources,
+                              "seed": self.halving.random_state + self.seeds[fold]}
+                else:
+                    grown = self.rounds[round_ - 1][1] if round_ else 0
+                    budget = {"n_estimators": resources - grown, "param": self.param,
+                              "seed_param": self.seed_param,
+                              "seed": self.halving.random_state + 1000 * round_
+                              + self.seeds[fold]}
+                jobs.append((candidate, fold, budget))
+        return jobs
+
+    def record(self, round_, candidate, fold, budget, output, scoring):
+        score, fit_time, score_time, _ = output
+        if budget is not None and "n_estimators" in budget:
+            votes, classes = score
+            key = (candidate, fold)
+            self.votes[key] = self.votes.get(key, 0) + votes
+            proba = self.votes[key] / self.rounds[round_][1]
+            if fold not in self._y_valid:
+                self._y_valid[fold] = self.folds.fold(fold, self.prefix)[3]
+            y_valid = self._y_valid[fold]
+            adapter = _AveragedForest(proba, classes)
+            score = check_scoring(adapter, scoring=scoring)(adapter, proba, y_valid)
+            self.units += budget["n_estimators"] / self.max_resources
+        elif budget is not None:
+            self.units += budget["n_samples"] / self.max_resources
+        else:
+            self.units += 1
+        self.n_fits += 1
+        self.fit_seconds += fit_time
+        if not isinstance(score, dict):
+            score = {"score": score}
+        for metric, value in score.items():
+            table = self.scores.setdefault(metric, np.zeros_like(self.fit_times))
+            table[candidate, fold] = value
+        self.fit_times[candidate, fold] = fit_time
+        self.score_times[candidate, fold] = score_time
+        self.iteration[candidate] = round_
+        self.n_resources[candidate] = self.rounds[round_][1]
+
+    def advance(self, round_):
+        """Keep the best candidates for the next round."""
+        if round_ + 1 >= len(self.rounds):
+            return
+        keep = self.rounds[round_ + 1][0]
+        means = self.scores[self.primary][self.alive].mean(axis=1)
+        # stable: equal scores keep the grid order
+        best = np.argsort(-means, kind="stable")[:keep]
+        self.alive = sorted(self.alive[i] for i in best)
+
+    def _rank(self, mean):
+        if self.halving is None:
+            return rankdata(-mean, method="min").astype(np.int32)
+        # candidates that reached a later round rank above earlier losers
+        keys = list(zip(-self.iteration, -mean))
+        ordered = sorted(keys)
+        return np.array([bisect_left(ordered, key) + 1 for key in keys], dtype=np.int32)
+
+    def result(self):
+        cv_results = {
+            "params": self.candidates,
+            "mean_fit_time": self.fit_times.mean(axis=1),
+            "std_fit_time": self.fit_times.std(axis=1),
+            "mean_score_time": self.score_times.mean(axis=1),
+            "std_score_time": self.score_times.std(axis=1),
+        }
+        # GridSearchCV's key layout: "..._test_score" for a single metric,
+        # "..._test_<metric>" for each of several
+        for metric, scores in self.scores.items():
+            mean = scores.mean(axis=1)
+            cv_results[f"mean_test_{metric}"] = mean
+            cv_results[f"std_test_{metric}"] = scores.std(axis=1)
+            cv_results[f"rank_test_{metric}"] = self._rank(mean)
+            for fold in range(len(self.folds)):
+                cv_results[f"split{fold}_test_{metric}"] = scores[:, fold]
+        result = SearchResult(self.name, cv_results, metric=self.primary)
+        if self.halving is not None:
+            cv_results["iter"] = self.iteration
+            cv_results["n_resources"] = self.n_resources
+            result.halving_ = self.report()
+        return result
+
+    def report(self):
+        """Fits and compute used, against the exhaustive grid."""
+        n_splits = len(self.folds)
+        exhaustive = len(self.candidates) * n_splits
+        return {
+            "resource": self.halving.resource,
+            "factor": self.halving.factor,
+            "rounds": [{"n_candidates": n, "n_resources": r} for n, r in self.rounds],
+            "fits": self.n_fits,
+            "exhaustive_fits": exhaustive,
+            # budget units: one unit = one fit with the full resource
+            "resource_units": self.units,
+            "exhaustive_units": float(exhaustive),
+            "compute_saved": 1 - self.units / exhaustive,
+            "fit_seconds": self.fit_seconds,
+            "estimated_exhaustive_fit_seconds": self.fit_seconds / self.units * exhaustive,
+        }
+
+
+class SearchResult:
+    """``GridSearchCV``-like view of one family's search results.
+
+    For families searched with ``Halving``, ``halving_`` reports the rounds
+    and the compute used against the exhaustive grid; ``cv_results_`` then
+    has the last round's scores of each candidate plus ``iter`` and
+    ``n_resources``. With several metrics, the best candidate is chosen by
+    ``metric``.
+    """
+
+    def __init__(self, name, cv_results, best_estimator=None, metric="score"):
+        self.name = name
+        self.cv_results_ = cv_results
+        self.metric = metric
+        self.best_index_ = int(np.argmin(cv_results[f"rank_test_{metric}"]))
+        self.best_params_ = cv_results["params"][self.best_index_]
+        self.best_score_ = float(cv_results[f"mean_test_{metric}"][self.best_index_])
+        self.best_estimator_ = best_estimator
+        self.halving_ = None
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+    def predict_proba(self, X):
+        return self.best_estimator_.predict_proba(X)
+
+    def score(self, X, y):
+        return self.best_estimator_.score(X, y)
+
+    def __repr__(self):
+        return f"SearchResult({self.name!r}, best_score={self.best_score_:.4f})"
+
+
+class SearchEngine:
+    """Grid search over several model families in one shared process pool.
+
+    Parameters
+    ----------
+    cv : int or splitter, default=5
+        Same meaning as in ``GridSearchCV``; an int gives stratified folds
+        for classifiers, so fold assignments match ``GridSearchCV(cv=5)``.
+    scoring : str, callable, list or dict, default="accuracy"
+        Several metrics (a list of scorer names or a ``{name: scorer}``
+        dict) are all computed from the same fit; ``cv_results_`` then has
+        ``mean_test_<name>`` etc. for each, as in ``GridSearchCV``.
+    n_jobs : int, default=-1
+        Worker processes shared by all families' candidate x fold jobs.
+    refit : bool or str, default=True
+        Refit each family's best candidate on the full training data. With
+        several metrics, a metric name selects the one candidates are ranked
+        (and halving rounds pruned) by; the first metric otherwise.
+    verbose : int, default=0
+    profiler : Profiler, optional
+        Receives a ``cv_fit`` event per candidate x fold fit (wall and CPU
+        time, worker peak RSS) plus ``search.preprocess`` and
+        ``search.refit`` stages; ``cvd.profiling.PROFILER`` by default.
+    shared : bool, default=True
+        Publish the training data and preprocessed folds once in shared
+        memory for all workers (see ``FoldCache``).
+    cache : ArtifactCache, optional
+        Persist each family's ``SearchResult`` (including the refitted best
+        estimator) keyed on the training data, the family's estimator, grid
+        and halving schedule, and the engine's cv/scoring/refit settings.
+        Families found in the cache are not searched again; the others run
+        as usual. The key is available as ``result.cache_key_``.
+    """
+
+    def __init__(self, cv=5, scoring="accuracy", n_jobs=-1, refit=True, verbose=0,
+                 profiler=None, shared=True, cache=None):
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.refit = refit
+        self.verbose = verbose
+        self.profiler = PROFILER if profiler is None else profiler
+        self.shared = shared
+        self.cache = cache
+        self.families = {}
+        self.folds_ = None
+
+    def add(self, name, estimator, param_grid, halving=None):
+        """Register a model family; returns ``self`` for chaining.
+
+        ``halving`` selects successive halving for this family: a
+        ``Halving`` instance or its resource name (``"n_samples"`` or
+        ``"n_estimators"``). Without it every candidate is fitted on the
+        full folds, like ``GridSearchCV``.
+        """
+        if name in self.families:
+            raise ValueError(f"Model family {name!r} is already registered")
+        if isinstance(halving, str):
+            halving = Halving(resource=halving)
+        self.families[name] = (estimator, param_grid, halving)
+        return self
+
+    def fit(self, X, y, folds=None):
+        """Run every registered search and return ``{name: SearchResult}``.
+
+        ``folds`` may be the ``folds_`` of an earlier engine fitted on the
+        same ``X``/``y``, in which case its splits and cached fold matrices
+        are reused instead of being rebuilt.
+        """
+        if not self.families:
+            raise ValueError("No model families registered; call add() first")
+        if folds is not None and len(folds.y) != len(y):
+            raise ValueError("folds were built for a different training set")
+
+        cached, keys = self._load_cached(X, y)
+        families = {name: spec for name, spec in self.families.items() if name not in cached}
+        if not families:
+            self.folds_ = folds
+            self.results_ = {name: cached[name] for name in self.families}
+            return self.results_
+
+        if folds is None:
+            classifier = all(is_classifier(spec[0]) for spec in families.values())
+            folds = FoldCache(X, y, cv=self.cv, classifier=classifier, shared=self.shared)
+        self.folds_ = folds
+        searches = [_FamilySearch(name, *spec, folds, primary=self._primary_metric())
+                    for name, spec in families.items()]
+        if self.verbose:
+            n_fits = sum(len(search.jobs(0)) for search in searches)
+            print(f"Fitting {len(families)} families, {len(self.folds_)} folds, "
+                  f"{n_fits} fits in the first round")
+
+        with Parallel(n_jobs=self.n_jobs, verbose=self.verbose) as parallel:
+            # all families' fits of a round run together; grid families only
+            # have round 0, halving families continue with their survivors
+            round_ = 0
+            while True:
+                jobs = [(search, *job) for search in searches for job in search.jobs(round_)]
+                if not jobs:
+                    break
+                # preprocess every fold up front, in this process, so the cache
+                # is filled once and workers only receive finished matrices
+                with self.profiler.stage("search.preprocess"):
+                    tasks = [
+                        delayed(_fit_and_score)(
+                            search.suffix, search.candidates[candidate],
+                            self.folds_.task_fold(fold, search.prefix), self.scoring, budget,
+                        )
+                        for search, candidate, fold, budget in jobs
+                    ]
+                outputs = parallel(tasks)
+                for (search, candidate, fold, budget), output in zip(jobs, outputs):
+                    self._trace(search, round_, candidate, fold, budget, output)
+                    search.record(round_, candidate, fold, budget, output, self.scoring)
+                for search in searches:
+                    search.advance(round_)
+                round_ += 1
+            results = {search.name: search.result() for search in searches}
+
+            if self.refit:
+                with self.profiler.stage("search.refit", families=list(results)):
+                    names = list(results)
+                    refits = parallel(
+                        delayed(_refit)(self.families[name][0], results[name].best_params_,
+                                        X, y)
+                        for name in names
+                    )
+                    self.profiler.add_cpu(sum(_worker_cpu(trace) for _, trace in refits))
+                for name, (estimator, _) in zip(names, refits):
+                    results[name].best_estimator_ = estimator
+
+        if self.cache is not None:
+            for name, result in results.items():
+                result.cache_key_ = keys[name]
+                self.cache.put(keys[name], result, stage="search")
+
+        if self.verbose:
+            for name, result in results.items():
+                if result.halving_ is not None:
+                    report = result.halving_
+                    print(f"{name}: successive halving over {report['resource']} used "
+                          f"{report['fits']} fits ({report['resource_units']:.1f} of "
+                          f"{report['exhaustive_units']:.0f} full-fit units), "
+                          f"{report['compute_saved']:.0%} less compute than the grid")
+        results.update(cached)
+        self.results_ = {name: results[name] for name in self.families}
+        return self.results_
+
+    # artifact-cache stage of the results; part of every cache key
+    _cache_stage = "search"
+
+    def _cache_config(self):
+        """Engine settings that the cached results depend on."""
+        return {"cv": self.cv, "scoring": self.scoring, "refit": self.refit}
+
+    def _load_cached(self, X, y):
+        """``({name: cached result}, {name: cache key})``."""
+        if self.cache is None:
+            return {}, {}
+        with self.profiler.stage(f"{self._cache_stage}.cache"):
+            data = (fingerprint(X), fingerprint(y))
+            keys = {
+                name: self.cache.key(self._cache_stage, *data, estimator=estimator,
+                                     param_grid=param_grid, halving=halving,
+                                     **self._cache_config())
+                for name, (estimator, param_grid, halving) in self.families.items()
+            }
+            cached = {}
+            for name, key in keys.items():
+                if key in self.cache:
+                    self.cache.hits += 1
+                    cached[name] = self.cache.get(key)
+                    cached[name].name = name
+                else:
+                    self.cache.misses += 1
+        if self.verbose and cached:
+            print(f"Loaded {len(cached)} families from the artifact cache: {list(cached)}")
+        return cached, keys
+
+    def _primary_metric(self):
+        if not isinstance(self.scoring, (list, tuple, set, dict)):
+            return "score"
+        if isinstance(self.refit, str):
+            if self.refit not in self.scoring:
+                raise ValueError(f"refit={self.refit!r} is not one of the scoring metrics")
+            return self.refit
+        return next(iter(self.scoring))
+
+    def _trace(self, search, round_, candidate, fold, budget, output):
+        _, fit_time, score_time, trace = output
+        self.profiler.add_cpu(_worker_cpu(trace))
+        self.profiler.add_event(
+            search.name, trace["ts"], fit_time + score_time, pid=trace["pid"],
+            tid=trace["pid"], category="cv_fit", candidate=candidate, fold=fold,
+            params=repr(search.candidates[candidate]), round=round_,
+            resources=None if budget is None else search.rounds[round_][1],
+            fit_time=fit_time, score_time=score_time, cpu=trace["cpu"],
+            rss_start=trace["rss_start"], peak_rss=trace["peak_rss"],
+        )
@@ -0,0 +1,455 @@
+"""Local batch and online scoring for the tuned best estimators.
+
+A fitted pipeline is persisted together with the feature columns it was
+trained on (``save_model``). ``Scorer`` loads such a bundle once, encodes raw
+``CVD_cleaned.csv``-style records with the same ``ENCODING_TABLE`` mappings
+as ``BRFSSEncoder`` and returns positive-class probabilities:
+
+* ``Scorer.score_file`` streams a CSV through the model in chunks;
+* ``Scorer.submit``/``Scorer.score_record`` queue single records; a
+  background thread micro-batches concurrent requests into one vectorized
+  ``predict_proba`` call.
+
+Records are validated before they reach the model: a category outside
+``ENCODING_TABLE``, or a missing or non-numeric number, raises
+``InvalidRecord`` naming the columns and values. ``submit`` encodes each
+record in the caller's thread, so a bad request is rejected on its own
+instead of failing its micro-batch (and a batch that still fails is scored
+record by record); ``score_file`` gives invalid rows a NaN score and lists
+them in ``last_file_problems``.
+
+Random forests are compiled to a ``FlatForest`` on load, which avoids
+sklearn's per-tree Python loop on small batches. Latency percentiles and
+throughput are tracked in ``LatencyStats``. With ``cache_size`` identical
+encoded rows are scored once (``cvd.memo.PredictionCache``). Batch jobs
+that only need scores from a linear or forest model can skip sklearn and
+pandas entirely with the numpy runtime in ``cvd.runtime``.
+
+Command line::
+
+    python -m cvd.serve models/rf.joblib --input new_rows.csv --output scores.csv
+    python -m cvd.serve models/rf.joblib --input new_rows.csv --online 10000 --concurrency 32
+    python -m cvd.serve models/knn.joblib --input new_rows.csv --cache-size 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from cvd.encoding import DERIVED_COLUMNS, ENCODING_TABLE, BRFSSEncoder
+from cvd.forest import compile_estimator
+from cvd.memo import PredictionCache
+
+BUNDLE_VERSION = 1
+
+
+def save_model(estimator, path, feature_columns):
+    """Persist a fitted estimator with the feature columns it expects."""
+    joblib.dump({
+        "version": BUNDLE_VERSION,
+        "estimator": estimator,
+        "feature_columns": list(feature_columns),
+    }, path)
+
+
+def load_model(path):
+    bundle = joblib.load(path)
+    if bundle.get("version") != BUNDLE_VERSION:
+        raise ValueError(f"{path} is not a version {BUNDLE_VERSION} model bundle")
+    return bundle
+
+
+def feature_encoder(feature_columns):
+    """Fitted ``BRFSSEncoder`` restricted to the columns a model consumes."""
+    mappings = {c: ENCODING_TABLE[c] for c in feature_columns if c in ENCODING_TABLE}
+    derived = {c: DERIVED_COLUMNS[c] for c in feature_columns if c in DERIVED_COLUMNS}
+    passthrough = [c for c in feature_columns if c not in mappings and c not in derived]
+    raw_columns = list(mappings) + passthrough
+    for added, subtracted in derived.values():
+        raw_columns += list(added) + list(subtracted)
+    encoder = BRFSSEncoder(mappings=mappings, derived=derived, passthrough=passthrough)
+    return encoder.fit(pd.DataFrame(columns=raw_columns))
+
+
+class InvalidRecord(ValueError):
+    """A record the model cannot encode.
+
+    ``problems`` maps each offending column to its value (``None`` if the
+    column is absent); ``row`` is the record's position in a frame, if any.
+    """
+
+    def __init__(self, problems, row=None):
+        self.problems = dict(problems)
+        self.row = row
+        where = "" if row is None else f" (row {row})"
+        details = ", ".join(f"{column}={value!r}" for column, value in self.problems.items())
+        super().__init__(f"cannot encode record{where}: {details}")
+
+
+class LatencyStats:
+    """Thread-safe request latency recorder."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = []
+        self._batch_sizes = []
+        self._started = None
+        self._finished = None
+
+    def record(self, latencies, batch_size=None):
+        now = time.perf_counter()
+        with self._lock:
+            if self._started is None:
+                self._started = now - max(latencies, default=0.0)
+            self._finished = now
+            self._latencies.extend(latencies)
+            if batch_size is not None:
+                self._batch_sizes.append(batch_size)
+
+    def reset(self):
+        with self._lock:
+            self._latencies.clear()
+            self._batch_sizes.clear()
+            self._started = self._finished = None
+
+    def summary(self):
+        with self._lock:
+            latencies = np.asarray(self._latencies)
+            batches = np.asarray(self._batch_sizes)
+            elapsed = (self._finished - self._started) if self._latencies else 0.0
+        if not len(latencies):
+            return {"requests": 0}
+        return {
+            "requests": int(len(latencies)),
+            "p50_ms": float(np.percentile(latencies, 50) * 1e3),
+            "p99_ms": float(np.percentile(latencies, 99) * 1e3),
+            "max_ms": float(latencies.max() * 1e3),
+            "throughput_rps": float(len(latencies) / elapsed) if elapsed > 0 else float("inf"),
+            "mean_batch_size": float(batches.mean()) if len(batches) else 1.0,
+        }
+
+
+class Scorer:
+    """Loads a model bundle once and scores raw or encoded records.
+
+    Parameters
+    ----------
+    path : str
+        Bundle written by ``save_model``.
+    encoded : bool, default=False
+        Whether incoming records are already encoded feature rows.
+    max_batch_size : int, default=1024
+        Upper bound on the number of queued records scored together.
+    max_wait_ms : float, default=2.0
+        How long the batching thread waits for more requests after the first
+        one arrives.
+    compile : bool, default=True
+        Score random forests with a compiled ``FlatForest``.
+    cache_size : int, optional
+        Memoize predictions on exact encoded rows (``cvd.memo``): every batch
+        is deduplicated and up to ``cache_size`` distinct rows are kept
+        across batches and online requests; ``0`` only deduplicates.
+    """
+
+    def __init__(self, path, encoded=False, max_batch_size=1024, max_wait_ms=2.0,
+                 compile=True, cache_size=None):
+        bundle = load_model(path)
+        self.estimator = bundle["estimator"]
+        self.compiled = compile_estimator(self.estimator) if compile else None
+        self.feature_columns = bundle["feature_columns"]
+        self.encoder = feature_encoder(self.feature_columns)
+        self.encoded = encoded
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1e3
+        self.cache = (None if cache_size is None
+                      else PredictionCache(self._predict_rows, max_entries=cache_size))
+        # input columns of a record: categories, or None for a number
+        raw = {column: list(categories) for column, categories in self.encoder.mappings_.items()}
+        for added, subtracted in self.encoder.derived_.values():
+            raw.update(dict.fromkeys([*added, *subtracted]))
+        raw.update(dict.fromkeys(self.encoder.passthrough_))
+        self._inputs = {False: raw, True: dict.fromkeys(self.feature_columns)}
+        self._codes = {column: {label: code for code, label in enumerate(categories)}
+                       for column, categories in self.encoder.mappings_.items()}
+        self.stats = LatencyStats()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def encode(self, frame):
+        """Encode a raw frame into the model's feature matrix."""
+        return self.encoder.transform(frame)[self.feature_columns]
+
+    def invalid_rows(self, frame, encoded=None):
+        """``{row position: {column: value}}`` of the rows of ``frame`` that
+        cannot be encoded."""
+        encoded = self.encoded if encoded is None else encoded
+        problems = {}
+        for column, categories in self._inputs[encoded].items():
+            if column not in frame:
+                values, valid = None, np.zeros(len(frame), dtype=bool)
+            elif categories is None:
+                values = frame[column]
+                numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+                valid = np.isfinite(numbers)
+            else:
+                values = frame[column]
+                valid = values.isin(categories).to_numpy()
+            for row in np.flatnonzero(~valid).tolist():
+                problems.setdefault(row, {})[column] = None if values is None else values.iloc[row]
+        return dict(sorted(problems.items()))
+
+    def encode_record(self, record, encoded=None):
+        """Feature row of one record (a dict); raises ``InvalidRecord``."""
+        encoded = self.encoded if encoded is None else encoded
+        values, problems = {}, {}
+        for column, categories in self._inputs[encoded].items():
+            value = record.get(column)
+            if categories is None:
+                try:
+                    number = float(value)
+                except (TypeError, ValueError):
+                    number = np.nan
+                if np.isfinite(number):
+                    values[column] = number
+                else:
+                    problems[column] = value
+            elif value in self._codes[column]:
+                values[column] = float(self._codes[column][value])
+            else:
+                problems[column] = value
+        if problems:
+            raise InvalidRecord(problems)
+        row = np.empty(len(self.feature_columns))
+        for j, column in enumerate(self.feature_columns):
+            if not encoded and column in self.encoder.derived_:
+                added, subtracted = self.encoder.derived_[column]
+                total = values[added[0]]
+                for name in added[1:]:
+                    total += values[name]
+                for name in subtracted:
+                    total -= values[name]
+                row[j] = total
+            else:
+                row[j] = values[column]
+        return row
+
+    def score_frame(self, frame, encoded=None):
+        """``(scores, problems)``: scores of the rows of ``frame``, NaN for the
+        invalid rows listed in ``problems`` (see ``invalid_rows``)."""
+        encoded = self.encoded if encoded is None else encoded
+        problems = self.invalid_rows(frame, encoded)
+        scores = np.full(len(frame), np.nan)
+        valid = np.ones(len(frame), dtype=bool)
+        valid[list(problems)] = False
+        if valid.any():
+            rows = frame[valid] if problems else frame
+            features = rows[self.feature_columns] if encoded else self.encode(rows)
+            scores[valid] = self._predict_features(features.to_numpy(dtype=np.float64))
+        return scores, problems
+
+    def predict_proba(self, frame, encoded=None):
+        """Positive-class probability for every row of ``frame``; raises
+        ``InvalidRecord`` for the first row that cannot be encoded."""
+        scores, problems = self.score_frame(frame, encoded)
+        if problems:
+            row, columns = next(iter(problems.items()))
+            raise InvalidRecord(columns, row=row)
+        return scores
+
+    def _predict_features(self, rows):
+        if self.cache is not None:
+            return self.cache.predict(rows)
+        return self._predict_rows(rows)
+
+    def _predict_rows(self, rows):
+        """Positive-class probabilities of the distinct encoded ``rows``."""
+        if self.compiled is not None:
+            return self.compiled.predict_proba(rows)[:, 1]
+        if hasattr(self.estimator, "feature_names_in_"):
+            rows = pd.DataFrame(rows, columns=self.feature_columns)
+        return self.estimator.predict_proba(rows)[:, 1]
+
+    def score_file(self, input_path, output_path=None, chunksize=100_000, encoded=None):
+        """Score a CSV in chunks; returns the scores, optionally writing them.
+
+        Rows that cannot be encoded get a NaN score; ``last_file_problems``
+        maps their row numbers to the offending ``{column: value}``.
+        """
+        scores = []
+        self.last_file_problems = {}
+        start = time.perf_counter()
+        offset = 0
+        for chunk in pd.read_csv(input_path, chunksize=chunksize):
+            chunk_scores, problems = self.score_frame(chunk, encoded=encoded)
+            self.last_file_problems.update((offset + row, columns)
+                                           for row, columns in problems.items())
+            scores.append(chunk_scores)
+            offset += len(chunk)
+        scores = np.concatenate(scores) if scores else np.empty(0)
+        elapsed = time.perf_counter() - start
+        self.last_file_stats = {
+            "rows": int(len(scores)),
+            "invalid_rows": len(self.last_file_problems),
+            "seconds": elapsed,
+            "rows_per_second": len(scores) / elapsed if elapsed > 0 else float("inf"),
+        }
+        if self.cache is not None:
+            self.last_file_stats["cache"] = self.cache.stats()
+        if output_path is not None:
+            pd.DataFrame({"score": scores}).to_csv(output_path, index=False)
+        return scores
+
+    # online path -------------------------------------------------------
+
+    def submit(self, record):
+        """Queue one record (a dict); returns a ``Future`` of its score.
+
+        The record is encoded here: an invalid one gets an ``InvalidRecord``
+        future at once and never joins a batch.
+        """
+        future = Future()
+        try:
+            row = self.encode_record(record)
+        except InvalidRecord as error:
+            future.set_exception(error)
+            return future
+        self._ensure_worker()
+        self._queue.put((row, future, time.perf_counter()))
+        return future
+
+    def score_record(self, record, timeout=None):
+        """Score one record, batched with any concurrent requests."""
+        return self.submit(record).result(timeout=timeout)
+
+    def close(self):
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._score_batch(batch)
+            if stop:
+                return
+
+    def _score_batch(self, batch):
+        rows, futures, submitted = zip(*batch)
+        try:
+            scores = self._predict_features(np.vstack(rows))
+        except Exception:
+            # score the records one by one, so only the failing ones fail
+            scores = []
+            for row, future in zip(rows, futures):
+                try:
+                    scores.append(self._predict_features(row[None])[0])
+                except Exception as error:
+                    future.set_exception(error)
+                    scores.append(None)
+        done = time.perf_counter()
+        for future, score in zip(futures, scores):
+            if score is not None:
+                future.set_result(float(score))
+        self.stats.record([done - t for t in submitted], batch_size=len(batch))
+
+
+def run_online(scorer, records, concurrency=32):
+    """Fire ``records`` at ``scorer`` from ``concurrency`` client threads.
+
+    Rejected records (``InvalidRecord``) score NaN.
+    """
+    def score(record):
+        try:
+            return scorer.score_record(record)
+        except InvalidRecord:
+            return np.nan
+
+    scorer.stats.reset()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        scores = list(clients.map(score, records))
+    return np.asarray(scores), scorer.stats.summary()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score BRFSS records with a saved model.")
+    parser.add_argument("model", help="bundle written by cvd.serve.save_model")
+    parser.add_argument("--input", required=True, help="CSV of raw (or --encoded) records")
+    parser.add_argument("--output", help="write one score per input row to this CSV")
+    parser.add_argument("--encoded", action="store_true", help="input is already encoded")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--online", type=int, metavar="N",
+                        help="also replay the first N rows as concurrent single requests")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-batch-size", type=int, default=1024)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--cache-size", type=int,
+                        help="memoize predictions of up to this many distinct rows")
+    args = parser.parse_args(argv)
+
+    with Scorer(args.model, args.encoded, args.max_batch_size, args.max_wait_ms,
+                cache_size=args.cache_size) as scorer:
+        scorer.score_file(args.input, args.output, args.chunksize)
+        stats = scorer.last_file_stats
+        print(f"batch: {stats['rows']:,} rows in {stats['seconds']:.2f}s "
+              f"({stats['rows_per_second']:,.0f} rows/s)")
+        if stats["invalid_rows"]:
+            print(f"invalid: {stats['invalid_rows']:,} rows scored NaN, e.g.")
+            for row, columns in list(scorer.last_file_problems.items())[:5]:
+                details = ", ".join(f"{column}={value!r}" for column, value in columns.items())
+                print(f"  row {row}: {details}")
+        if scorer.cache is not None:
+            print(f"cache: {scorer.cache.summary()}")
+
+        if args.online:
+            records = pd.read_csv(args.input, nrows=args.online).to_dict("records")
+            scores, summary = run_online(scorer, records, args.concurrency)
+            print(f"online: {summary['requests']:,} requests, p50 {summary.get('p50_ms', 0):.2f} "
+                  f"ms, p99 {summary.get('p99_ms', 0):.2f} ms, "
+                  f"{summary.get('throughput_rps', 0):,.0f} req/s, "
+                  f"mean batch {summary.get('mean_batch_size', 0):.1f}, "
+                  f"{int(np.isnan(scores).sum()):,} rejected")
+            if scorer.cache is not None:
+                print(f"cache: {scorer.cache.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Read-only arrays published once in shared memory for worker processes.
+
+Passing ``X_train`` to a process pool pickles a private copy into every
+worker (or, with joblib's automatic memmapping, re-dumps each distinct fold
+matrix). A ``SharedArena`` instead writes each array once to a file under
+``/dev/shm`` (the system temp directory elsewhere) and hands out
+``SharedArray`` handles that pickle as ``(path, dtype, shape)`` only.
+Workers attach with a read-only ``np.memmap``: the pages are shared by every
+process, so adding workers does not add copies of the data.
+
+``SharedFold`` describes one CV fold on top of shared arrays: either a row
+subset of a published matrix (the raw folds: only the index arrays are
+published, and the worker gathers its rows for the duration of one fit) or
+four published, already preprocessed fold matrices. A ``FeatureMatrix``
+(``cvd.matrix``) is published as its compact byte buffer, and its fold rows
+stay compact until the estimator converts them.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import uuid
+import weakref
+
+import numpy as np
+
+from cvd.matrix import FeatureMatrix
+
+
+def _default_directory():
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+    return tempfile.gettempdir()
+
+
+class SharedArray:
+    """Handle to a published array; ``array`` attaches lazily (zero-copy)."""
+
+    def __init__(self, path, dtype, shape):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.shape = tuple(shape)
+        self._array = None
+
+    @property
+    def array(self):
+        if self._array is None:
+            if not all(self.shape):
+                self._array = np.empty(self.shape, dtype=self.dtype)
+            else:
+                self._array = np.memmap(self.path, dtype=self.dtype, mode="r",
+                                        shape=self.shape)
+        return self._array
+
+    @property
+    def nbytes(self):
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __reduce__(self):
+        # only the location travels to workers, never the data
+        return SharedArray, (self.path, self.dtype.str, self.shape)
+
+    def __repr__(self):
+        return f"SharedArray({self.path!r}, dtype={self.dtype}, shape={self.shape})"
+
+
+class SharedArena:
+    """Owns a directory of published arrays and removes it on ``close``.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Parent directory; ``/dev/shm`` when available.
+    """
+
+    def __init__(self, directory=None):
+        self.path = tempfile.mkdtemp(prefix="cvd_shared_", dir=directory or _default_directory())
+        self.nbytes = 0
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.path, True)
+
+    def publish(self, array):
+        """Write ``array`` once and return its ``SharedArray`` handle.
+
+        Objects with a ``publish(arena)`` method (``FeatureMatrix``,
+        ``ResampledView``) publish their own parts and return their handle.
+        """
+        if hasattr(array, "publish"):
+            return array.publish(self)
+        array = np.ascontiguousarray(array)
+        path = os.path.join(self.path, f"{uuid.uuid4().hex}.bin")
+        if array.size:
+            target = np.memmap(path, dtype=array.dtype, mode="w+", shape=array.shape)
+            target[...] = array
+            target.flush()
+            del target
+        self.nbytes += array.nbytes
+        return SharedArray(path, array.dtype, array.shape)
+
+    def release(self, handle):
+        """Delete one published array (handles already attached stay valid)."""
+        if not isinstance(handle, SharedArray):
+            for part in handle.parts:
+                self.release(part)
+            return
+        if os.path.exists(handle.path):
+            os.remove(handle.path)
+            self.nbytes -= handle.nbytes
+
+    def close(self):
+        self._finalizer()
+        self.nbytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SharedFold:
+    """One CV fold as shared arrays; ``load()`` returns the four fold arrays.
+
+    With ``train_rows``/``valid_rows`` the fold is a row subset of the shared
+    ``X``/``y`` (``X_train is X_valid``); otherwise the four arrays are the
+    fold matrices themselves and ``load`` is zero-copy.
+    """
+
+    def __init__(self, X_train, y_train, X_valid, y_valid, train_rows=None, valid_rows=None):
+        self.X_train = X_train
+        self.y_train = y_train
+        self.X_valid = X_valid
+        self.y_valid = y_valid
+        self.train_rows = train_rows
+        self.valid_rows = valid_rows
+
+    def load(self):
+        arrays = [self.X_train.array, self.y_train.array, self.X_valid.array, self.y_valid.array]
+        if self.train_rows is not None:
+            train, valid = self.train_rows.array, self.valid_rows.array
+            arrays = [take_rows(arrays[0], train), arrays[1][train],
+                      take_rows(arrays[2], valid), arrays[3][valid]]
+        return tuple(arrays)
+
+
+def take_rows(array, rows):
+    """``array[rows]``, keeping a ``FeatureMatrix`` compact."""
+    if isinstance(array, FeatureMatrix):
+        return array.take(rows)
+    return array[rows]
+
+
+def resolve(value):
+    """The in-memory value of a ``SharedArray``/``SharedFold`` (else unchanged)."""
+    if isinstance(value, SharedFold):
+        return value.load()
+    if isinstance(value, SharedArray):
+        return value.array
+    return value
@@ -0,0 +1,273 @@
+"""Streaming plot summaries: grouped quantile sketches and stratified samples.
+
+``sns.boxplot`` sorts every row of every group to draw five numbers, and
+``frame.sample(n)`` on a filtered frame first copies the filtered rows (and
+can leave rare groups, e.g. heart-disease cases among the young, with no
+points at all). For large or multi-year data the figures get their input
+from small summaries instead:
+
+* ``QuantileSketch`` - relative-error quantiles of a value per group
+  (DDSketch: counts in logarithmically sized buckets, so every quantile is
+  within ``relative_accuracy`` of an exact one). Updates are vectorized
+  ``bincount`` passes over chunks, sketches of chunks or survey years
+  ``merge`` exactly, and the memory is O(groups x log(max / min)) whatever
+  the number of rows. ``box_stats`` gives ``Axes.bxp`` input and
+  ``histogram`` re-bins the buckets for a histogram.
+* ``stratified_sample`` - row indices of a sample with a quota per stratum
+  (proportional, with a floor so that small strata still show), drawn in
+  one vectorized pass over the code columns.
+
+Example::
+
+    sketch = QuantileSketch.from_columns(frame["Weight_(kg)"], frame["Age_Category"],
+                                         n_groups=13)
+    ax.bxp(sketch.box_stats(ENCODING_TABLE["Age_Category"]))
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+# values closer to zero than this are counted as zeros
+MIN_VALUE = 1e-9
+
+
+class _Buckets:
+    """Dense per-group bucket counts over a growing range of bucket keys."""
+
+    def __init__(self, n_groups):
+        self.counts = np.zeros((n_groups, 0), dtype=np.int64)
+        self.offset = 0
+
+    def _cover(self, low, high):
+        if not self.counts.shape[1]:
+            self.counts = np.zeros((len(self.counts), high - low + 1), dtype=np.int64)
+            self.offset = low
+            return
+        start = min(low, self.offset)
+        stop = max(high, self.offset + self.counts.shape[1] - 1)
+        if start == self.offset and stop - start + 1 == self.counts.shape[1]:
+            return
+        counts = np.zeros((len(self.counts), stop - start + 1), dtype=np.int64)
+        counts[:, self.offset - start:self.offset - start + self.counts.shape[1]] = self.counts
+        self.counts, self.offset = counts, start
+
+    def add(self, groups, keys):
+        if not len(keys):
+            return
+        self._cover(int(keys.min()), int(keys.max()))
+        width = self.counts.shape[1]
+        flat = groups * width + (keys - self.offset)
+        self.counts += np.bincount(flat, minlength=self.counts.size).reshape(self.counts.shape)
+
+    def merge(self, other):
+        if not other.counts.shape[1]:
+            return
+        high = other.offset + other.counts.shape[1] - 1
+        self._cover(other.offset, high)
+        start = other.offset - self.offset
+        self.counts[:, start:start + other.counts.shape[1]] += other.counts
+
+
+class QuantileSketch:
+    """Mergeable relative-error quantiles of one value per group.
+
+    Parameters
+    ----------
+    n_groups : int, default=1
+        Groups are the integer codes ``0 .. n_groups - 1``; other codes
+        (e.g. ``-1`` for missing) and non-finite values are skipped.
+    relative_accuracy : float, default=0.005
+        Every reported quantile is within this relative distance of a value
+        whose rank is exactly the requested one.
+    """
+
+    def __init__(self, n_groups=1, relative_accuracy=0.005):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        self.n_groups = n_groups
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self.positive = _Buckets(n_groups)
+        self.negative = _Buckets(n_groups)
+        self.zeros = np.zeros(n_groups, dtype=np.int64)
+        self.min = np.full(n_groups, np.inf)
+        self.max = np.full(n_groups, -np.inf)
+
+    @classmethod
+    def from_columns(cls, values, groups=None, n_groups=1, chunk_size=1_000_000, **params):
+        """Sketch ``values`` (e.g. memory-mapped columns) chunk by chunk."""
+        sketch = cls(n_groups, **params)
+        for start in range(0, len(values), chunk_size):
+            stop = start + chunk_size
+            sketch.update(values[start:stop], None if groups is None else groups[start:stop])
+        return sketch
+
+    @property
+    def count(self):
+        """Values counted per group."""
+        return self.positive.counts.sum(axis=1) + self.negative.counts.sum(axis=1) + self.zeros
+
+    def _keys(self, magnitudes):
+        return np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+
+    def update(self, values, groups=None):
+        values = np.asarray(values, dtype=np.float64)
+        if groups is None:
+            groups = np.zeros(len(values), dtype=np.int64)
+        groups = np.nan_to_num(np.asarray(groups, dtype=np.float64), nan=-1).astype(np.int64)
+        keep = np.isfinite(values) & (groups >= 0) & (groups < self.n_groups)
+        values, groups = values[keep], groups[keep]
+        if not len(values):
+            return self
+        np.minimum.at(self.min, groups, values)
+        np.maximum.at(self.max, groups, values)
+        zero = np.abs(values) < MIN_VALUE
+        self.zeros += np.bincount(groups[zero], minlength=self.n_groups)
+        positive = values >= MIN_VALUE
+        self.positive.add(groups[positive], self._keys(values[positive]))
+        negative = values <= -MIN_VALUE
+        self.negative.add(groups[negative], self._keys(-values[negative]))
+        return self
+
+    def merge(self, other):
+        """Add the counts of another sketch with the same groups and accuracy."""
+        if other.n_groups != self.n_groups or other.gamma != self.gamma:
+            raise ValueError("sketches have different groups or accuracy")
+        self.positive.merge(other.positive)
+        self.negative.merge(other.negative)
+        self.zeros += other.zeros
+        np.minimum(self.min, other.min, out=self.min)
+        np.maximum(self.max, other.max, out=self.max)
+        return self
+
+    def _value(self, keys):
+        # midpoint (in relative terms) of the bucket (gamma^(k-1), gamma^k]
+        return 2 * self.gamma ** keys / (self.gamma + 1)
+
+    def buckets(self, group=0):
+        """``(values, counts)`` of the non-empty buckets of a group, ascending."""
+        parts = []
+        for store, sign in ((self.negative, -1), (self.positive, 1)):
+            keys = np.flatnonzero(store.counts[group]) if store.counts.shape[1] else []
+            keys = np.asarray(keys, dtype=np.int64)
+            counts = store.counts[group, keys] if len(keys) else np.empty(0, np.int64)
+            values = sign * self._value(keys + store.offset)
+            parts.append((values[::sign], counts[::sign]))
+        values = np.concatenate([parts[0][0], [0.0], parts[1][0]])
+        counts = np.concatenate([parts[0][1], [self.zeros[group]], parts[1][1]])
+        present = counts > 0
+        values = np.clip(values[present], self.min[group], self.max[group])
+        return values, counts[present]
+
+    def quantiles(self, q, group=None):
+        """Quantiles ``q`` per group (rows) or of one ``group``; NaN if empty."""
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        groups = range(self.n_groups) if group is None else [group]
+        out = np.full((len(groups), len(q)), np.nan)
+        for row, g in enumerate(groups):
+            values, counts = self.buckets(g)
+            if not len(values):
+                continue
+            cumulative = np.cumsum(counts)
+            ranks = q * (cumulative[-1] - 1)
+            out[row] = values[np.searchsorted(cumulative, ranks, side="right")]
+        return out if group is None else out[0]
+
+    def box_stats(self, labels=None, whis=1.5, max_fliers=200):
+        """``Axes.bxp`` statistics (Tukey whiskers) for every non-empty group.
+
+        Outliers are the bucket values beyond the whiskers, one point per
+        bucket, at most ``max_fliers`` of the most extreme per group.
+        """
+        labels = list(range(self.n_groups)) if labels is None else list(labels)
+        boxes = []
+        for g in range(self.n_groups):
+            values, counts = self.buckets(g)
+            if not len(values):
+                continue
+            q1, median, q3 = self.quantiles([0.25, 0.5, 0.75], group=g)
+            iqr = q3 - q1
+            inside = (values >= q1 - whis * iqr) & (values <= q3 + whis * iqr)
+            fliers = values[~inside]
+            if len(fliers) > max_fliers:
+                order = np.argsort(np.abs(fliers - median))[::-1]
+                fliers = np.sort(fliers[order[:max_fliers]])
+            cumulative = np.cumsum(counts)
+            boxes.append({
+                "label": labels[g], "med": median, "q1": q1, "q3": q3,
+                "whislo": values[inside].min(), "whishi": values[inside].max(),
+                "fliers": fliers,
+                "mean": float(np.dot(values, counts) / cumulative[-1]),
+                "n": int(cumulative[-1]),
+            })
+        return boxes
+
+    def histogram(self, bins=50, group=None, range=None):
+        """``(counts, edges)`` of all groups (or one) from the bucket counts."""
+        groups = np.arange(self.n_groups) if group is None else [group]
+        values, counts = zip(*(self.buckets(g) for g in groups))
+        values, counts = np.concatenate(values), np.concatenate(counts)
+        if range is None:
+            range = (self.min[groups].min(), self.max[groups].max())
+        return np.histogram(values, bins=bins, range=range, weights=counts)
+
+
+def stratified_sample(strata, n, mask=None, min_per_stratum=1, random_state=None):
+    """Sorted row indices of a sample of about ``n`` rows, stratified.
+
+    Parameters
+    ----------
+    strata : array or list of arrays
+        Integer codes (e.g. ``Heart_Disease`` and ``Age_Category``); several
+        columns define their cross product. Rows with a negative/NaN code
+        are never drawn.
+    n : int
+        Sample size; strata get shares proportional to their sizes.
+    mask : bool array, optional
+        Rows eligible for the sample (e.g. ``Diet > 0``).
+    min_per_stratum : int, default=1
+        Floor of every non-empty stratum's quota (capped by its size), so
+        rare strata are represented; the total can exceed ``n`` by at most
+        the floors.
+    random_state : int, optional
+    """
+    columns = [strata] if isinstance(strata, np.ndarray) or np.ndim(strata) == 1 else strata
+    codes = [_codes(column) for column in columns]
+    valid = np.logical_and.reduce([c >= 0 for c in codes])
+    if mask is not None:
+        valid &= np.asarray(mask, dtype=bool)
+    rows = np.flatnonzero(valid)
+    sizes = [int(c[rows].max()) + 1 if len(rows) else 1 for c in codes]
+    stratum = np.ravel_multi_index([c[rows] for c in codes], sizes)
+    available = np.bincount(stratum, minlength=int(np.prod(sizes)))
+
+    # proportional quotas by largest remainder, then the floor, capped by size
+    share = available * min(n, len(rows)) / max(len(rows), 1)
+    quota = np.floor(share).astype(np.int64)
+    remainder = min(n, len(rows)) - quota.sum()
+    quota[np.argsort(quota - share)[:remainder]] += 1
+    quota = np.minimum(np.maximum(quota, np.minimum(min_per_stratum, available)), available)
+
+    # a random priority per row; the lowest ``quota`` of every stratum win.
+    # Only rows under a generous per-stratum cut-off are sorted (all rows if
+    # a stratum falls short of its quota, which is very unlikely)
+    priority = np.random.default_rng(random_state).random(len(rows))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cutoff = (quota + 4 * np.sqrt(quota) + 16) / available
+    candidates = np.flatnonzero(priority < cutoff[stratum])
+    if np.any(np.bincount(stratum[candidates], minlength=len(quota)) < quota):
+        candidates = np.arange(len(rows))
+    order = candidates[np.lexsort((priority[candidates], stratum[candidates]))]
+    counts = np.bincount(stratum[order], minlength=len(quota))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.arange(len(order)) - starts[stratum[order]]
+    return np.sort(rows[order[rank < quota[stratum[order]]]])
+
+
+def _codes(values):
+    values = np.asarray(values)
+    if values.dtype.kind == "f":
+        return np.nan_to_num(values, nan=-1).astype(np.int64)
+    return values.astype(np.int64)
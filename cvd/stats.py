@@ -0,0 +1,262 @@
+"""Mergeable column statistics for the EDA reports.
+
+``frame.corr()``, ``describe()``, ``isnull().sum()`` and ``unique()`` each
+rescan the data, and all of them start over when new survey rows arrive.
+``ColumnStats`` keeps sufficient statistics instead, updated chunk by chunk
+(``update``) or combined across chunks/years (``merge``):
+
+* per column pair: the number of rows where both are present and, over
+  those rows, the sums, sums of squares and cross-products (shifted by a
+  per-column reference value for numerical stability), so Pearson
+  correlations with pairwise deletion - what ``DataFrame.corr`` computes -
+  come out exactly for any subset of columns;
+* per column: null count and the distinct values with their counts (exact
+  ``unique``, ``value_counts`` and ``describe`` quantiles), up to
+  ``max_distinct`` values.
+
+Reports cost O(columns^2) and never touch the rows again. Categorical
+columns are tracked by their integer codes (negative codes count as nulls),
+and ``unique``/``value_counts`` map them back to labels.
+"""
+
+from __future__ import annotations
+
+import os
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+STATS_FILE = "stats.joblib"
+
+
+def _merge_counts(values, counts, other_values, other_counts, limit):
+    """Union of two (sorted values, counts) tables; ``None`` past ``limit``."""
+    if values is None or other_values is None:
+        return None, None
+    merged, inverse = np.unique(np.concatenate([values, other_values]), return_inverse=True)
+    if len(merged) > limit:
+        return None, None
+    weights = np.concatenate([counts, other_counts])
+    return merged, np.bincount(inverse, weights=weights, minlength=len(merged)).astype(np.int64)
+
+
+class ColumnStats:
+    """Incremental counts, moments and distinct values of numeric columns.
+
+    Parameters
+    ----------
+    max_distinct : int, default=65536
+        Distinct values kept per column; columns with more lose ``unique``,
+        ``value_counts`` and describe quantiles (reported as NaN).
+    """
+
+    def __init__(self, max_distinct=65_536):
+        self.max_distinct = max_distinct
+        self.columns = None
+        self.categories = {}
+        self.n_rows = 0
+
+    def _matrix(self, frame, categories):
+        """Chunk as float64 with NaN for nulls, plus categorical labels."""
+        labels = dict(categories or {})
+        columns = []
+        for column in frame.columns:
+            values = frame[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                labels[column] = list(values.cat.categories)
+                values = values.cat.codes
+            elif not pd.api.types.is_numeric_dtype(values.dtype):
+                raise TypeError(f"Column {column!r} is not numeric or categorical; encode it first")
+            values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+            if column in labels:
+                values = np.where(values < 0, np.nan, values)
+            columns.append(values)
+        return np.column_stack(columns) if columns else np.empty((len(frame), 0)), labels
+
+    def _init(self, columns, labels, shift):
+        k = len(columns)
+        self.columns = list(columns)
+        self.categories = labels
+        self.shift = shift
+        self.pair_count = np.zeros((k, k))
+        self.pair_sum = np.zeros((k, k))
+        self.pair_square = np.zeros((k, k))
+        self.cross = np.zeros((k, k))
+        self.distinct = [np.empty(0)] * k
+        self.distinct_counts = [np.empty(0, dtype=np.int64)] * k
+
+    def update(self, frame, categories=None):
+        """Fold a chunk of rows into the statistics; returns ``self``.
+
+        ``categories`` maps integer-coded columns to their labels (columns of
+        ``category`` dtype are detected automatically).
+        """
+        X, labels = self._matrix(frame, categories)
+        if self.columns is None:
+            # all-missing columns (e.g. a question a survey year did not ask)
+            # get a zero shift
+            with np.errstate(all="ignore"), warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                shift = np.nan_to_num(np.nanmean(X, axis=0)) if len(X) else np.zeros(X.shape[1])
+            self._init(frame.columns, labels, shift)
+        elif list(frame.columns) != self.columns:
+            raise ValueError("Chunk columns differ from the columns seen so far")
+
+        valid = ~np.isnan(X)
+        mask = valid.astype(np.float64)
+        centred = np.where(valid, X - self.shift, 0.0)
+        self.pair_count += mask.T @ mask
+        self.pair_sum += centred.T @ mask
+        self.pair_square += (centred * centred).T @ mask
+        self.cross += centred.T @ centred
+        self.n_rows += len(X)
+
+        for i in range(len(self.columns)):
+            values, counts = np.unique(X[valid[:, i], i], return_counts=True)
+            self.distinct[i], self.distinct_counts[i] = _merge_counts(
+                self.distinct[i], self.distinct_counts[i], values, counts, self.max_distinct)
+        return self
+
+    def merge(self, other):
+        """Add the statistics of ``other`` (same columns) to ``self``."""
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self._init(other.columns, dict(other.categories), other.shift.copy())
+        elif other.columns != self.columns:
+            raise ValueError("Cannot merge statistics of different columns")
+
+        # re-express other's sums around self's shift: x - a = (x - b) + (b - a)
+        d = other.shift - self.shift
+        n, s = other.pair_count, other.pair_sum
+        self.pair_count += n
+        self.pair_sum += s + d[:, None] * n
+        self.pair_square += other.pair_square + 2 * d[:, None] * s + (d ** 2)[:, None] * n
+        self.cross += other.cross + d[None, :] * s + d[:, None] * s.T + np.outer(d, d) * n
+        self.n_rows += other.n_rows
+        for i in range(len(self.columns)):
+            self.distinct[i], self.distinct_counts[i] = _merge_counts(
+                self.distinct[i], self.distinct_counts[i], other.distinct[i],
+                other.distinct_counts[i], self.max_distinct)
+        return self
+
+    @classmethod
+    def from_frame(cls, frame, chunk_size=1_000_000, categories=None, **params):
+        stats = cls(**params)
+        for start in range(0, max(len(frame), 1), chunk_size):
+            stats.update(frame.iloc[start:start + chunk_size], categories)
+        return stats
+
+    @classmethod
+    def from_store(cls, store, columns=None, chunk_size=1_000_000, **params):
+        """Statistics of ``ColumnStore`` columns, reading one chunk at a time."""
+        columns = list(columns or store.columns)
+        categories = {c: store.categories(c) for c in columns if store.categories(c)}
+        stats = cls(**params)
+        for start in range(0, max(len(store), 1), chunk_size):
+            chunk = pd.DataFrame({c: store.array(c)[start:start + chunk_size] for c in columns})
+            stats.update(chunk, categories)
+        return stats
+
+    @classmethod
+    def for_store(cls, store, **params):
+        """``from_store`` cached in the store directory.
+
+        The cache lives and dies with the store, which ``load_or_ingest``
+        rebuilds whenever its source changes.
+        """
+        path = os.path.join(store.path, STATS_FILE)
+        if os.path.exists(path):
+            cached = joblib.load(path)
+            if cached["fingerprint"] == store.meta.get("fingerprint"):
+                return cached["stats"]
+        stats = cls.from_store(store, **params)
+        joblib.dump({"fingerprint": store.meta.get("fingerprint"), "stats": stats}, path)
+        return stats
+
+    def _positions(self, columns):
+        if columns is None:
+            return list(range(len(self.columns)))
+        index = {column: i for i, column in enumerate(self.columns)}
+        missing = [column for column in columns if column not in index]
+        if missing:
+            raise KeyError(f"No statistics for columns: {missing}")
+        return [index[column] for column in columns]
+
+    def null_counts(self, columns=None):
+        """Like ``frame.isnull().sum()``."""
+        positions = self._positions(columns)
+        counts = self.n_rows - np.diag(self.pair_count)[positions]
+        return pd.Series(counts.astype(np.int64), index=[self.columns[i] for i in positions])
+
+    def corr(self, columns=None, min_periods=1):
+        """Pearson correlations with pairwise deletion, like ``frame.corr()``."""
+        p = self._positions(columns)
+        n = self.pair_count[np.ix_(p, p)]
+        sx = self.pair_sum[np.ix_(p, p)]  # sum of x_i where i and j present
+        sxx = self.pair_square[np.ix_(p, p)]
+        sxy = self.cross[np.ix_(p, p)]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = sxy - sx * sx.T / n
+            var_x = sxx - sx ** 2 / n
+            var_y = var_x.T
+            result = cov / np.sqrt(var_x * var_y)
+        result = np.clip(result, -1.0, 1.0)
+        result[(n < max(min_periods, 2)) | (var_x <= 0) | (var_y <= 0)] = np.nan
+        labels = [self.columns[i] for i in p]
+        return pd.DataFrame(result, index=labels, columns=labels)
+
+    def _quantile(self, i, q):
+        values, counts = self.distinct[i], self.distinct_counts[i]
+        if values is None or not len(values):
+            return np.nan
+        cumulative = np.cumsum(counts)
+        position = q * (cumulative[-1] - 1)
+        low = int(np.floor(position))
+        lo_value = values[np.searchsorted(cumulative, low, side="right")]
+        hi_value = values[np.searchsorted(cumulative, min(low + 1, cumulative[-1] - 1),
+                                          side="right")]
+        return lo_value + (hi_value - lo_value) * (position - low)
+
+    def describe(self, columns=None, percentiles=(0.25, 0.5, 0.75)):
+        """Like ``frame.describe()``; defaults to the non-categorical columns."""
+        if columns is None:
+            columns = [c for c in self.columns if c not in self.categories]
+        rows = {}
+        for column, i in zip(columns, self._positions(columns)):
+            n = self.pair_count[i, i]
+            total = self.pair_sum[i, i]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = self.shift[i] + total / n
+                std = np.sqrt(max(self.pair_square[i, i] - total ** 2 / n, 0.0) / (n - 1))
+            values = self.distinct[i]
+            known = values is not None and len(values)
+            rows[column] = [n, mean, std, values[0] if known else np.nan]
+            rows[column] += [self._quantile(i, q) for q in percentiles]
+            rows[column] += [values[-1] if known else np.nan]
+        index = ["count", "mean", "std", "min"]
+        index += [f"{q * 100:g}%" for q in percentiles] + ["max"]
+        return pd.DataFrame(rows, index=index)
+
+    def value_counts(self, column):
+        """Counts of each distinct value (labels for categorical columns)."""
+        i = self._positions([column])[0]
+        values, counts = self.distinct[i], self.distinct_counts[i]
+        if values is None:
+            raise ValueError(f"{column!r} has more than {self.max_distinct} distinct values")
+        if column in self.categories:
+            values = np.asarray(self.categories[column], dtype=object)[values.astype(np.intp)]
+        return pd.Series(counts, index=values, name=column)
+
+    def unique(self, column):
+        """Distinct non-null values (or labels), in sorted / code order."""
+        return self.value_counts(column).index.to_numpy()
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
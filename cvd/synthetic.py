@@ -0,0 +1,186 @@
+"""Synthetic survey data with the ``CVD_cleaned.csv`` and BRFSS 2015 schemas.
+
+The generators reproduce the columns, category labels, value ranges and
+roughly the marginal distributions of the two Kaggle files, so the whole
+pipeline can be run and benchmarked offline at any size. The target is drawn
+from a logistic model of age, general health, diabetes, sex, smoking and a
+few other columns, with the intercept solved so that the share of positive
+rows equals ``positive_rate``; the models therefore have real signal to fit
+and the class imbalance is configurable.
+
+Frames are generated in chunks from independent child seeds, so
+``write_csv`` can produce files far larger than memory (e.g. 50M rows) and
+the same ``random_state`` and ``chunk_size`` always give the same rows.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from cvd.schema import ENCODING_TABLE
+
+# marginal category probabilities, in ENCODING_TABLE order
+CATEGORY_PROBABILITIES_2021 = {
+    "General_Health": [0.036, 0.114, 0.309, 0.357, 0.184],
+    "Checkup": [0.776, 0.122, 0.060, 0.038, 0.004],
+    "Exercise": [0.225, 0.775],
+    "Skin_Cancer": [0.903, 0.097],
+    "Other_Cancer": [0.903, 0.097],
+    "Depression": [0.800, 0.200],
+    "Diabetes": [0.840, 0.022, 0.009, 0.129],
+    "Arthritis": [0.673, 0.327],
+    "Sex": [0.519, 0.481],
+    "Age_Category": [0.059, 0.055, 0.061, 0.069, 0.072, 0.067, 0.077,
+                     0.087, 0.107, 0.108, 0.097, 0.064, 0.081],
+    "Smoking_History": [0.594, 0.406],
+}
+
+# share of ones of the binary 2015 indicators
+BINARY_RATES_2015 = {
+    "HighBP": 0.43, "HighChol": 0.42, "CholCheck": 0.96, "Smoker": 0.44,
+    "Stroke": 0.04, "PhysActivity": 0.76, "Fruits": 0.63, "Veggies": 0.81,
+    "HvyAlcoholConsump": 0.056, "AnyHealthcare": 0.95, "NoDocbcCost": 0.084,
+    "DiffWalk": 0.17, "Sex": 0.44,
+}
+
+COLUMNS_2021 = list(ENCODING_TABLE)[:11] + [
+    "Height_(cm)", "Weight_(kg)", "BMI", "Smoking_History", "Alcohol_Consumption",
+    "Fruit_Consumption", "Green_Vegetables_Consumption", "FriedPotato_Consumption",
+]
+
+COLUMNS_2015 = [
+    "HeartDiseaseorAttack", "HighBP", "HighChol", "CholCheck", "BMI", "Smoker",
+    "Stroke", "Diabetes", "PhysActivity", "Fruits", "Veggies", "HvyAlcoholConsump",
+    "AnyHealthcare", "NoDocbcCost", "GenHlth", "MentHlth", "PhysHlth", "DiffWalk",
+    "Sex", "Age", "Education", "Income",
+]
+
+
+def _draw_target(rng, risk, positive_rate):
+    """Bernoulli draws of ``sigmoid(risk + b)`` with ``mean == positive_rate``."""
+    low, high = -30.0, 30.0
+    for _ in range(60):
+        middle = (low + high) / 2
+        if np.mean(1 / (1 + np.exp(-(risk + middle)))) < positive_rate:
+            low = middle
+        else:
+            high = middle
+    probability = 1 / (1 + np.exp(-(risk + low)))
+    return rng.random(len(risk)) < probability
+
+
+def _skewed_counts(rng, n_rows, mean, upper, zero_share):
+    """Non-negative integer amounts with a spike at zero, capped at ``upper``."""
+    values = rng.gamma(1.2, mean / 1.2, n_rows).round()
+    values[rng.random(n_rows) < zero_share] = 0
+    return np.minimum(values, upper)
+
+
+def make_brfss_2021(n_rows, positive_rate=0.081, random_state=0, as_category=False):
+    """A frame shaped like ``CVD_cleaned.csv`` (string categories, float numbers).
+
+    ``as_category=True`` returns the categorical columns as ``category``
+    dtype instead of strings, which keeps very large frames small.
+    """
+    rng = np.random.default_rng(random_state)
+    codes = {
+        column: rng.choice(len(p), size=n_rows, p=np.asarray(p) / np.sum(p)).astype(np.int8)
+        for column, p in CATEGORY_PROBABILITIES_2021.items()
+    }
+    male = codes["Sex"] == 1
+    height = rng.normal(np.where(male, 178.0, 163.0), 7.5).clip(91, 241).round()
+    bmi = rng.lognormal(np.log(28.0), 0.2, n_rows).clip(12.0, 99.0)
+    weight = (bmi * (height / 100) ** 2).clip(24.0, 293.0).round(2)
+
+    risk = (
+        0.28 * codes["Age_Category"]
+        + 0.55 * (4 - codes["General_Health"])
+        + 0.6 * (codes["Diabetes"] == 3)
+        + 0.7 * male
+        + 0.4 * codes["Smoking_History"]
+        + 0.3 * codes["Arthritis"]
+        + 0.2 * codes["Depression"]
+        - 0.2 * codes["Exercise"]
+    )
+    codes["Heart_Disease"] = _draw_target(rng, risk, positive_rate).astype(np.int8)
+
+    columns = {}
+    for column in COLUMNS_2021:
+        if column in ENCODING_TABLE:
+            categorical = pd.Categorical.from_codes(codes[column], ENCODING_TABLE[column])
+            columns[column] = categorical if as_category else np.asarray(categorical)
+    columns.update({
+        "Height_(cm)": height,
+        "Weight_(kg)": weight,
+        "BMI": (weight / (height / 100) ** 2).round(2),
+        "Alcohol_Consumption": _skewed_counts(rng, n_rows, 5.1, 30, 0.35),
+        "Fruit_Consumption": _skewed_counts(rng, n_rows, 29.8, 120, 0.03),
+        "Green_Vegetables_Consumption": _skewed_counts(rng, n_rows, 15.1, 128, 0.03),
+        "FriedPotato_Consumption": _skewed_counts(rng, n_rows, 6.3, 128, 0.15),
+    })
+    return pd.DataFrame(columns)[COLUMNS_2021]
+
+
+def make_brfss_2015(n_rows, positive_rate=0.094, random_state=0):
+    """A frame shaped like ``heart_disease_health_indicators_BRFSS2015.csv``.
+
+    All values are whole numbers stored as float64, like in the Kaggle file.
+    """
+    rng = np.random.default_rng(random_state)
+    columns = {
+        column: (rng.random(n_rows) < rate).astype(np.int8)
+        for column, rate in BINARY_RATES_2015.items()
+    }
+    columns["BMI"] = rng.lognormal(np.log(27.5), 0.22, n_rows).clip(12, 98).round()
+    columns["Diabetes"] = rng.choice(3, n_rows, p=[0.84, 0.02, 0.14])
+    columns["GenHlth"] = rng.choice(np.arange(1, 6), n_rows, p=[0.18, 0.35, 0.30, 0.12, 0.05])
+    columns["MentHlth"] = _skewed_counts(rng, n_rows, 10.0, 30, 0.69)
+    columns["PhysHlth"] = _skewed_counts(rng, n_rows, 12.0, 30, 0.63)
+    columns["Age"] = rng.choice(np.arange(1, 14), n_rows, p=np.asarray(
+        CATEGORY_PROBABILITIES_2021["Age_Category"]) / np.sum(
+        CATEGORY_PROBABILITIES_2021["Age_Category"]))
+    columns["Education"] = rng.choice(np.arange(1, 7), n_rows,
+                                      p=[0.001, 0.016, 0.037, 0.247, 0.276, 0.423])
+    columns["Income"] = rng.choice(np.arange(1, 9), n_rows,
+                                   p=[0.04, 0.05, 0.07, 0.09, 0.10, 0.14, 0.17, 0.34])
+
+    risk = (
+        0.28 * columns["Age"]
+        + 0.55 * columns["GenHlth"]
+        + 0.7 * columns["HighBP"]
+        + 0.5 * columns["HighChol"]
+        + 0.4 * columns["Smoker"]
+        + 1.0 * columns["Stroke"]
+        + 0.3 * (columns["Diabetes"] == 2)
+        + 0.7 * columns["Sex"]
+        + 0.4 * columns["DiffWalk"]
+    )
+    columns["HeartDiseaseorAttack"] = _draw_target(rng, risk, positive_rate).astype(np.int8)
+    return pd.DataFrame(columns)[COLUMNS_2015].astype(np.float64)
+
+
+GENERATORS = {"2021": make_brfss_2021, "2015": make_brfss_2015}
+
+
+def iter_frames(generator, n_rows, chunk_size=1_000_000, random_state=0, **kwargs):
+    """Yield ``n_rows`` rows of ``generator`` in chunks with independent seeds."""
+    n_chunks = -(-n_rows // chunk_size)
+    seeds = np.random.SeedSequence(random_state).spawn(n_chunks)
+    for index, seed in enumerate(seeds):
+        size = min(chunk_size, n_rows - index * chunk_size)
+        yield generator(size, random_state=np.random.default_rng(seed), **kwargs)
+
+
+def make_frame(schema, n_rows, chunk_size=1_000_000, random_state=0, **kwargs):
+    """All rows of ``GENERATORS[schema]`` in one frame (chunked generation)."""
+    frames = iter_frames(GENERATORS[schema], n_rows, chunk_size, random_state, **kwargs)
+    return pd.concat(frames, ignore_index=True)
+
+
+def write_csv(path, schema, n_rows, chunk_size=1_000_000, random_state=0, **kwargs):
+    """Stream ``n_rows`` synthetic rows of ``schema`` ("2021"/"2015") to a CSV."""
+    frames = iter_frames(GENERATORS[schema], n_rows, chunk_size, random_state, **kwargs)
+    for index, frame in enumerate(frames):
+        frame.to_csv(path, mode="w" if index == 0 else "a", header=index == 0, index=False)
+    return path
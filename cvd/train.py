@@ -0,0 +1,302 @@
+"""Training and evaluation entry points: the notebook's Part 4 as commands.
+
+``python -m cvd train`` ingests (or reuses) the 2021 column store, splits it
+like the notebook, searches the notebook's eight model families with one
+``SearchEngine`` and saves each best estimator as a ``save_model`` bundle
+plus, where one exists, its numpy runtime form (``cvd.runtime``).
+``python -m cvd evaluate`` scores the saved bundles on the held-out rows
+with one ``ThresholdSweep`` per model. ``python -m cvd nested`` estimates
+each family's score by nested cross-validation on the training rows
+(``cvd.nested``), with the wall-clock and CPU time it cost. With
+``--sample-ratio`` the families train on negative-downsampled (or
+stratified) rows with importance weights (``cvd.subsample``), and
+``python -m cvd subsample`` reports training time against test recall and
+AUC at several ratios.
+
+Both go through the same ``ArtifactCache`` as the notebook, so the split
+and any unchanged search are read back instead of recomputed. With
+``--feature-store`` the rows come from the selected year partitions of a
+``cvd.featurestore.FeatureStore`` (e.g. 2015 and 2021 together, on the
+features both years provide) instead of the 2021 CSV.
+
+Command line::
+
+    python -m cvd train CVD_cleaned.csv --models models --families lr rf
+    python -m cvd evaluate CVD_cleaned.csv --models models --min-recall 0.8
+    python -m cvd nested CVD_cleaned.csv --families lr pca --outer 5
+    python -m cvd train CVD_cleaned.csv --sample-ratio 0.1 --families lr pca rf knn
+    python -m cvd subsample CVD_cleaned.csv --ratios 0.05 0.1 0.25 1
+    python -m cvd train --feature-store brfss_features --years 2015 2021
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+
+import numpy as np
+from imblearn.pipeline import Pipeline as ImbPipeline
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import make_scorer, recall_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from cvd.cache import ArtifactCache
+from cvd.decomposition import StreamingPCA
+from cvd.encoding import DERIVED_COLUMNS
+from cvd.featurestore import FeatureStore
+from cvd.ingest import BRFSS_2021_SCHEMA, ENCODED_2021_COLUMNS, load_or_ingest
+from cvd.matrix import FeatureMatrix
+from cvd.neighbors import IndexedKNeighborsClassifier
+from cvd.oversampling import FastSMOTE, MinorityNeighbors
+from cvd.subsample import STRATEGIES, sampling_report, subsampled_family
+
+TARGET = "Heart_Disease"
+DROPPED_COLUMNS = ["Height_(cm)", "Weight_(kg)"]
+LOGISTIC_GRID = {
+    "logistic_regression__penalty": ["l1", "l2", None],
+    "logistic_regression__C": [0.1, 1],
+    "logistic_regression__solver": ["saga"],
+}
+# families searched by successive halving in the notebook
+HALVING = {"rf": "n_estimators", "rf_smote": "n_estimators"}
+SCORING = {"accuracy": "accuracy", "recall": make_scorer(recall_score)}
+
+
+def model_families(seed=42, neighbors=None):
+    """The notebook's estimators and grids (sections 4.2 and 4.3).
+
+    ``neighbors`` is a ``MinorityNeighbors`` fitted on the training rows,
+    shared by the SMOTE steps of all folds.
+    """
+    def sampler():
+        return FastSMOTE(random_state=seed, neighbors=neighbors, virtual=True)
+
+    def logistic(smote, pca):
+        steps = [("smote", sampler())] if smote else []
+        steps.append(("scaler", StandardScaler()))
+        if pca:
+            steps.append(("pca", StreamingPCA(n_components=0.80)))
+        steps.append(("logistic_regression", LogisticRegression(max_iter=1000)))
+        return (ImbPipeline if smote else Pipeline)(steps), LOGISTIC_GRID
+
+    def forest(smote):
+        grid = {"max_depth": [None, 10], "min_samples_split": [2, 5]}
+        if not smote:
+            return RandomForestClassifier(), grid
+        return (ImbPipeline([("smote", sampler()),
+                             ("random_forest", RandomForestClassifier())]),
+                {f"random_forest__{key}": value for key, value in grid.items()})
+
+    def knn(smote):
+        if not smote:
+            return IndexedKNeighborsClassifier(index="kd_tree"), {"n_neighbors": [3, 5]}
+        return (ImbPipeline([("smote", sampler()),
+                             ("knn", IndexedKNeighborsClassifier(index="kd_tree"))]),
+                {"knn__n_neighbors": [3, 5]})
+
+    return {
+        "lr": logistic(False, False), "pca": logistic(False, True),
+        "rf": forest(False), "knn": knn(False),
+        "lr_smote": logistic(True, False), "pca_smote": logistic(True, True),
+        "rf_smote": forest(True), "knn_smote": knn(True),
+    }
+
+
+FEATURE_COLUMNS = [column for column in ENCODED_2021_COLUMNS
+                   if column != TARGET and column not in DROPPED_COLUMNS]
+
+
+def load_split(csv_path, store_path, cache, seed=42, test_size=0.2, feature_store=None,
+               years=None):
+    """``(X_train, X_test, y_train, y_test, split_key)`` as in the notebook.
+
+    The features are compact ``FeatureMatrix`` row subsets, the targets
+    int8 arrays. With ``feature_store`` the rows are read from the ``years``
+    partitions of that ``FeatureStore`` instead of ``csv_path``, keeping the
+    features every selected year provides and the rows with a known target.
+    """
+    if feature_store is not None:
+        store = FeatureStore(feature_store)
+        available = store.available_columns(years)
+        columns = [column for column in FEATURE_COLUMNS if column in available]
+        known = [(TARGET, "in", [0, 1])]
+        features = store.scan(columns, years=years, filters=known)
+        target = store.scan([TARGET], years=years, filters=known)[TARGET].copy()
+        source = store.fingerprint(years)
+    else:
+        source = load_or_ingest(csv_path, store_path, BRFSS_2021_SCHEMA, DERIVED_COLUMNS)
+        features = FeatureMatrix.from_store(source, FEATURE_COLUMNS)
+        target = source.array(TARGET)
+    split_key = cache.key("split", source, list(features.columns), test_size=test_size,
+                          random_state=seed)
+    train_rows, test_rows = cache.run(
+        split_key,
+        lambda: train_test_split(np.arange(len(target)), test_size=test_size,
+                                 random_state=seed),
+        stage="split",
+    )
+    return (features.take(train_rows), features.take(test_rows), target[train_rows],
+            target[test_rows], split_key)
+
+
+def _parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("csv", nargs="?", help="CVD_cleaned.csv (unless --feature-store)")
+    parser.add_argument("--store", default="brfss_2021_store")
+    parser.add_argument("--feature-store", help="read the rows from this FeatureStore instead")
+    parser.add_argument("--years", nargs="+", help="FeatureStore partitions (default all)")
+    parser.add_argument("--cache", default="artifact_cache")
+    parser.add_argument("--models", default="models")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser
+
+
+def _load_split(parser, args, cache):
+    if args.csv is None and args.feature_store is None:
+        parser.error("give the CSV or --feature-store")
+    return load_split(args.csv, args.store, cache, args.seed, feature_store=args.feature_store,
+                      years=args.years)
+
+
+def _minority_neighbors(families, X_train, y_train):
+    """Neighbour table for the SMOTE steps, if a SMOTE family is selected."""
+    if families is not None and not any("smote" in name for name in families):
+        return None
+    return MinorityNeighbors(k_neighbors=5).fit(X_train, y_train)
+
+
+def main(argv=None):
+    from cvd.runtime import export_model
+    from cvd.search import SearchEngine
+    from cvd.serve import save_model
+
+    parser = _parser("Search, refit and save the notebook's models.")
+    parser.add_argument("--families", nargs="+", choices=list(model_families()))
+    parser.add_argument("--cv", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--sample-ratio", type=float,
+                        help="train the non-SMOTE families on subsampled rows (cvd.subsample)")
+    parser.add_argument("--sampling", choices=STRATEGIES, default="negative")
+    args = parser.parse_args(argv)
+
+    cache = ArtifactCache(args.cache)
+    X_train, _, y_train, _, _ = _load_split(parser, args, cache)
+    engine = SearchEngine(cv=args.cv, scoring=SCORING, refit="accuracy", n_jobs=args.n_jobs,
+                          verbose=1, cache=cache)
+    families = model_families(args.seed, _minority_neighbors(args.families, X_train, y_train))
+    if args.sample_ratio is not None:
+        families = subsampled_families(families, args.sample_ratio, args.sampling, args.seed)
+    for name, (estimator, grid) in families.items():
+        if args.families is None or name in args.families:
+            # forests are halved over their trees, which the wrapper hides
+            halving = HALVING.get(name) if args.sample_ratio is None else None
+            engine.add(name, estimator, grid, halving=halving)
+    results = engine.fit(X_train, y_train)
+
+    os.makedirs(args.models, exist_ok=True)
+    for name, result in results.items():
+        print(f"{name}: {result.best_params_} (accuracy {result.best_score_:.4f})")
+        save_model(result.best_estimator_, os.path.join(args.models, f"{name}.joblib"),
+                   X_train.columns)
+        try:
+            export_model(result.best_estimator_, os.path.join(args.models, f"{name}.npz"),
+                         X_train.columns)
+        except ValueError:
+            pass  # scored through cvd.serve only
+    print(cache.stats())
+
+
+def subsampled_families(families, ratio, strategy="negative", seed=42):
+    """The non-SMOTE families, each wrapped in a ``SubsampledClassifier``
+    (the subsample takes the place of the oversampling)."""
+    return {name: subsampled_family(estimator, grid, ratio, strategy, random_state=seed)
+            for name, (estimator, grid) in families.items() if "smote" not in name}
+
+
+def subsample_main(argv=None):
+    parser = _parser("Training time against recall/AUC at several sampling ratios.")
+    parser.add_argument("--families", nargs="+", default=["lr", "pca", "rf", "knn"],
+                        choices=[name for name in model_families() if "smote" not in name])
+    parser.add_argument("--ratios", type=float, nargs="+", default=[0.05, 0.1, 0.25, 1])
+    parser.add_argument("--sampling", choices=STRATEGIES, default="negative")
+    parser.add_argument("--cv", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args(argv)
+
+    cache = ArtifactCache(args.cache)
+    X_train, X_test, y_train, y_test, _ = _load_split(parser, args, cache)
+    families = {name: spec for name, spec in model_families(args.seed).items()
+                if name in args.families}
+    report = sampling_report(families, X_train, y_train, X_test, y_test, args.ratios,
+                             args.sampling, cv=args.cv, n_jobs=args.n_jobs,
+                             random_state=args.seed)
+    print(report.to_string(float_format="{:.4f}".format))
+
+
+def nested_main(argv=None):
+    from cvd.nested import NestedCV
+
+    parser = _parser("Nested cross-validation of the notebook's model families.")
+    parser.add_argument("--families", nargs="+", choices=list(model_families()))
+    parser.add_argument("--outer", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args(argv)
+
+    cache = ArtifactCache(args.cache)
+    X_train, _, y_train, _, _ = _load_split(parser, args, cache)
+    nested = NestedCV(n_outer=args.outer, scoring=SCORING, refit="accuracy",
+                      n_jobs=args.n_jobs, random_state=args.seed, verbose=1, cache=cache)
+    neighbors = _minority_neighbors(args.families, X_train, y_train)
+    for name, (estimator, grid) in model_families(args.seed, neighbors).items():
+        if args.families is None or name in args.families:
+            nested.add(name, estimator, grid, halving=HALVING.get(name))
+    nested.fit(X_train, y_train)
+    print(nested.report().to_string(float_format="{:.4f}".format))
+    print(cache.stats())
+
+
+def _bundle_scores(path, X):
+    from cvd.serve import load_model
+
+    bundle = load_model(path)
+    return bundle["estimator"].predict_proba(X.rows(columns=bundle["feature_columns"]))[:, 1]
+
+
+def evaluate_main(argv=None):
+    from cvd.evaluation import ThresholdSweep, compare_models
+
+    parser = _parser("Evaluate the saved models on the held-out test rows.")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--min-recall", type=float)
+    args = parser.parse_args(argv)
+
+    cache = ArtifactCache(args.cache)
+    _, X_test, _, y_test, split_key = _load_split(parser, args, cache)
+    sweeps = {}
+    for path in sorted(glob.glob(os.path.join(args.models, "*.joblib"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        # keyed on the bundle file, so a retrained model is scored again
+        key = cache.key("evaluate", split_key, os.path.abspath(path), os.path.getmtime(path))
+        scores = cache.run(key, lambda: _bundle_scores(path, X_test), stage="predict")
+        sweeps[name] = ThresholdSweep(y_test, scores)
+    if not sweeps:
+        parser.error(f"no model bundles in {args.models!r}")
+
+    print(compare_models(sweeps, args.threshold).to_string(float_format="{:.4f}".format))
+    if args.min_recall is not None:
+        for name, sweep in sweeps.items():
+            threshold = sweep.threshold_for(min_recall=args.min_recall)
+            if threshold is None:
+                continue
+            metrics = sweep.metrics(threshold, inclusive=True)
+            print(f"{name}: threshold {threshold:.3f} -> recall {metrics['recall']:.3f}, "
+                  f"specificity {metrics['specificity']:.3f}, "
+                  f"precision {metrics['precision']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Shared fixtures: small, seeded synthetic survey data."""
+
+from __future__ import annotations
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cvd.encoding import BRFSSEncoder  # noqa: E402
+from cvd.synthetic import make_frame  # noqa: E402
+from cvd.train import DROPPED_COLUMNS, TARGET  # noqa: E402
+
+
+def encoded_rows(n_rows, seed=0):
+    """``(X, y)``: synthetic 2021 rows encoded as in ``python -m cvd train``."""
+    frame = BRFSSEncoder().fit_transform(make_frame("2021", n_rows, random_state=seed))
+    y = frame.pop(TARGET).to_numpy()
+    X = frame.drop(columns=DROPPED_COLUMNS).to_numpy(dtype=np.float64)
+    return np.nan_to_num(X), y
+
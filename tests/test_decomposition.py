@@ -0,0 +1,53 @@
+"""``StreamingPCA`` matches ``sklearn.decomposition.PCA``."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from sklearn.decomposition import PCA
+from sklearn.preprocessing import StandardScaler
+
+from conftest import encoded_rows
+from cvd.decomposition import StreamingPCA
+
+
+@pytest.fixture(scope="module")
+def X():
+    return StandardScaler().fit_transform(encoded_rows(3_000, seed=2)[0])
+
+
+def assert_same_pca(pca, expected, X):
+    assert pca.n_components_ == expected.n_components_
+    np.testing.assert_allclose(pca.mean_, expected.mean_, atol=1e-12)
+    np.testing.assert_allclose(pca.explained_variance_, expected.explained_variance_,
+                               rtol=1e-8)
+    np.testing.assert_allclose(pca.explained_variance_ratio_,
+                               expected.explained_variance_ratio_, rtol=1e-8)
+    np.testing.assert_allclose(pca.singular_values_, expected.singular_values_, rtol=1e-8)
+    np.testing.assert_allclose(pca.noise_variance_, expected.noise_variance_, rtol=1e-8)
+    np.testing.assert_allclose(pca.components_, expected.components_, atol=1e-6)
+    np.testing.assert_allclose(pca.transform(X), expected.transform(X), atol=1e-6)
+
+
+@pytest.mark.parametrize("n_components", [0.80, 0.95, 5])
+@pytest.mark.parametrize("whiten", [False, True])
+def test_covariance_solver_matches_pca(X, n_components, whiten):
+    pca = StreamingPCA(n_components, solver="covariance", chunk_size=700, whiten=whiten).fit(X)
+    expected = PCA(n_components, svd_solver="full", whiten=whiten).fit(X)
+    assert_same_pca(pca, expected, X)
+    np.testing.assert_allclose(pca.inverse_transform(pca.transform(X)),
+                               expected.inverse_transform(expected.transform(X)), atol=1e-6)
+
+
+def test_partial_fit_matches_fit(X):
+    pca = StreamingPCA(0.80, solver="covariance")
+    for chunk in np.array_split(X, 4):
+        pca.partial_fit(chunk)
+    assert pca.n_samples_seen_ == len(X)
+    assert_same_pca(pca, PCA(0.80, svd_solver="full").fit(X), X)
+
+
+@pytest.mark.parametrize("n_components", [0.80, 4])
+def test_randomized_solver_matches_pca(X, n_components):
+    pca = StreamingPCA(n_components, solver="randomized", n_iter=10, random_state=0).fit(X)
+    assert_same_pca(pca, PCA(n_components, svd_solver="full").fit(X), X)
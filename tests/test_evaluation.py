@@ -0,0 +1,84 @@
+"""``ThresholdSweep`` agrees with ``sklearn.metrics``."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from sklearn import metrics
+
+from cvd.evaluation import ThresholdSweep, compare_models
+
+
+@pytest.fixture(scope="module", params=["continuous", "tied"])
+def scored(request):
+    rng = np.random.default_rng(0)
+    y = (rng.random(2_000) < 0.15).astype(np.int64)
+    scores = np.clip(0.3 * y + rng.normal(0.3, 0.2, size=len(y)), 0, 1)
+    if request.param == "tied":
+        scores = np.round(scores, 2)
+    return y, scores
+
+
+@pytest.mark.parametrize("threshold", [0.1, 0.3, 0.5, 0.9])
+def test_confusion_matrix_and_metrics(scored, threshold):
+    y, scores = scored
+    sweep = ThresholdSweep(y, scores)
+    for inclusive, predicted in ((False, scores > threshold), (True, scores >= threshold)):
+        predicted = predicted.astype(np.int64)
+        np.testing.assert_array_equal(sweep.confusion_matrix(threshold, inclusive),
+                                      metrics.confusion_matrix(y, predicted))
+        values = sweep.metrics(threshold, inclusive)
+        for name, score in (("accuracy", metrics.accuracy_score),
+                            ("precision", metrics.precision_score),
+                            ("recall", metrics.recall_score), ("f1", metrics.f1_score),
+                            ("balanced_accuracy", metrics.balanced_accuracy_score)):
+            kwargs = {"zero_division": 0} if name in ("precision", "f1") else {}
+            assert values[name] == pytest.approx(score(y, predicted, **kwargs), abs=1e-12), name
+        assert sweep.classification_report(threshold, inclusive, digits=4) == \
+            metrics.classification_report(y, predicted, digits=4, zero_division=0)
+
+
+def test_roc_curve_and_areas(scored):
+    y, scores = scored
+    sweep = ThresholdSweep(y, scores)
+    for ours, expected in zip(sweep.roc_curve(),
+                              metrics.roc_curve(y, scores, drop_intermediate=False)):
+        np.testing.assert_allclose(ours, expected)
+    assert sweep.roc_auc() == pytest.approx(metrics.roc_auc_score(y, scores), abs=1e-12)
+    assert sweep.average_precision() == pytest.approx(
+        metrics.average_precision_score(y, scores), abs=1e-12)
+
+
+def test_table_and_thresholds(scored):
+    y, scores = scored
+    sweep = ThresholdSweep(y, scores)
+    table = sweep.table()
+    assert len(table) == len(np.unique(scores))
+    assert (table[["tp", "fp", "fn", "tn"]].sum(axis=1) == len(y)).all()
+    threshold = sweep.threshold_for(min_recall=0.8)
+    recall = metrics.recall_score(y, scores >= threshold)
+    assert recall >= 0.8
+    # the next higher threshold misses the target
+    higher = sweep.thresholds[np.searchsorted(-sweep.thresholds, -threshold) - 1]
+    assert metrics.recall_score(y, scores >= higher) < 0.8
+    best = sweep.best_threshold("f1")
+    assert metrics.f1_score(y, scores >= best) == pytest.approx(table["f1"].max())
+    assert sweep.threshold_for(min_recall=1.1) is None
+
+
+def test_compare_models(scored):
+    y, scores = scored
+    report = compare_models({"a": ThresholdSweep(y, scores),
+                             "b": ThresholdSweep(y, 1 - scores)})
+    assert list(report.index) == ["a", "b"]
+    assert report.loc["a", "roc_auc"] == pytest.approx(metrics.roc_auc_score(y, scores))
+    assert report.loc["b", "roc_auc"] == pytest.approx(1 - report.loc["a", "roc_auc"])
+
+
+def test_precision_recall_curve(scored):
+    y, scores = scored
+    sweep = ThresholdSweep(y, scores)
+    expected = metrics.precision_recall_curve(y, scores, drop_intermediate=False)
+    for ours, values in zip(sweep.precision_recall_curve(), expected):
+        assert len(ours) == len(values)
+        np.testing.assert_allclose(ours, values)
@@ -0,0 +1,50 @@
+"""``FlatForest`` scores exactly like the ``RandomForestClassifier`` it came from."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from imblearn.over_sampling import SMOTE
+from imblearn.pipeline import Pipeline
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from conftest import encoded_rows
+from cvd.forest import FlatForest, compile_estimator
+
+
+@pytest.fixture(scope="module")
+def data():
+    X, y = encoded_rows(3_000, seed=4)
+    return X[:2_000], y[:2_000], X[2_000:]
+
+
+@pytest.mark.parametrize("params", [{"max_depth": 6}, {"min_samples_leaf": 1},
+                                    {"max_features": None, "max_depth": 20}])
+def test_predict_proba_matches_sklearn(data, params):
+    X, y, X_test = data
+    forest = RandomForestClassifier(25, random_state=0, **params).fit(X, y)
+    flat = FlatForest.from_sklearn(forest)
+    # leaf values are stored as float32
+    np.testing.assert_allclose(flat.predict_proba(X_test, batch_size=300),
+                               forest.predict_proba(X_test), atol=1e-6)
+    np.testing.assert_array_equal(flat.predict(X_test), forest.predict(X_test))
+
+
+def test_save_load_round_trip(data, tmp_path):
+    X, y, X_test = data
+    flat = FlatForest.from_sklearn(RandomForestClassifier(10, random_state=0).fit(X, y))
+    flat.save(tmp_path / "forest.npz")
+    loaded = FlatForest.load(tmp_path / "forest.npz")
+    np.testing.assert_array_equal(loaded.predict_proba(X_test), flat.predict_proba(X_test))
+
+
+def test_compile_estimator(data):
+    X, y, X_test = data
+    pipeline = Pipeline([("smote", SMOTE(random_state=0)),
+                         ("rf", RandomForestClassifier(10, random_state=0))]).fit(X, y)
+    np.testing.assert_allclose(compile_estimator(pipeline).predict_proba(X_test),
+                               pipeline.predict_proba(X_test), atol=1e-6)
+    scaled = Pipeline([("scaler", StandardScaler()),
+                       ("rf", RandomForestClassifier(10, random_state=0))]).fit(X, y)
+    assert compile_estimator(scaled) is None
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import log_loss
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from conftest import encoded_rows
+from cvd.incremental import IncrementalLogisticRegression
+
+
+@pytest.fixture(scope="module")
+def rows():
+    X, y = encoded_rows(60_000, seed=0)
+    return X[:50_000], y[:50_000], X[50_000:], y[50_000:]
+
+
+def chunk_factory(X, y, chunk_size=10_000, seed=0):
+    rng = np.random.default_rng(seed)
+
+    def chunks():
+        order = rng.permutation(len(X))
+        for start in range(0, len(X), chunk_size):
+            rows = order[start:start + chunk_size]
+            yield X[rows], y[rows]
+    return chunks
+
+
+def reference(X, y, C):
+    model = make_pipeline(StandardScaler(), LogisticRegression(C=C, max_iter=2000)).fit(X, y)
+    return model, model[-1].coef_.ravel() / model[0].scale_
+
+
+def raw_coef(model, C):
+    return model.models_[C].coef_.ravel() / model.scaler_.scale_
+
+
+@pytest.mark.parametrize("C", [0.1, 1.0])
+@pytest.mark.parametrize("method", ["fit_path", "partial_fit_stream"])
+def test_matches_logistic_regression(rows, C, method):
+    # tolerance: test log-loss within 0.002, raw coefficients within 15% (L2)
+    X, y, X_test, y_test = rows
+    expected, expected_coef = reference(X, y, C)
+    model = IncrementalLogisticRegression(Cs=(C,))
+    if method == "fit_path":
+        model.fit_path(chunk_factory(X, y), n_epochs=3)
+    else:
+        model.partial_fit_stream(chunk_factory(X, y))
+    loss = log_loss(y_test, model.predict_proba(X_test, C=C)[:, 1])
+    assert loss == pytest.approx(log_loss(y_test, expected.predict_proba(X_test)[:, 1]),
+                                 abs=0.002)
+    coef = raw_coef(model, C)
+    assert np.linalg.norm(coef - expected_coef) <= 0.15 * np.linalg.norm(expected_coef)
+
+
+def test_epochs_do_not_recount_rows(rows):
+    X, y, _, _ = rows
+    model = IncrementalLogisticRegression(Cs=(1.0,))
+    model.partial_fit_stream(chunk_factory(X, y), n_epochs=3)
+    assert model.n_seen_ == len(X)
+    assert model.scaler_.n_samples_seen_ == len(X)
+    assert model.models_[1.0].alpha == pytest.approx(1 / len(X))
+
+
+def test_adding_a_year_matches_refit(rows):
+    X, y, X_test, y_test = rows
+    old, new = slice(0, 30_000), slice(30_000, None)
+    model = IncrementalLogisticRegression(Cs=(1.0,))
+    model.fit_path(chunk_factory(X[old], y[old]), n_epochs=3)
+    model.partial_fit_stream(chunk_factory(X[new], y[new], seed=1))
+    expected, expected_coef = reference(X, y, 1.0)
+    assert model.n_seen_ == len(X)
+    loss = log_loss(y_test, model.predict_proba(X_test)[:, 1])
+    assert loss == pytest.approx(log_loss(y_test, expected.predict_proba(X_test)[:, 1]),
+                                 abs=0.002)
+    coef = raw_coef(model, 1.0)
+    assert np.linalg.norm(coef - expected_coef) <= 0.15 * np.linalg.norm(expected_coef)
+
+
+def test_to_sklearn_predicts_the_same(rows):
+    X, y, X_test, _ = rows
+    model = IncrementalLogisticRegression(Cs=(1.0,)).fit_path(chunk_factory(X, y), n_epochs=1)
+    np.testing.assert_allclose(model.to_sklearn().predict_proba(X_test),
+                               model.predict_proba(X_test), rtol=1e-10)
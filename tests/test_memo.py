@@ -0,0 +1,62 @@
+"""``PredictionCache`` returns exactly what the wrapped ``predict`` returns."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+import cvd.memo
+from cvd.memo import PredictionCache
+
+
+class Counted:
+    """Row-wise function that records how many rows it was asked for."""
+
+    def __init__(self):
+        self.rows = 0
+
+    def __call__(self, X):
+        self.rows += len(X)
+        return np.sin(np.nan_to_num(X, nan=7.0) @ np.arange(1, X.shape[1] + 1))
+
+
+@pytest.fixture
+def batches():
+    rng = np.random.default_rng(0)
+    pool = rng.integers(0, 4, size=(300, 5)).astype(np.float64)
+    pool[::50, 2] = np.nan
+    return [pool[rng.integers(0, len(pool), 1_000)] for _ in range(6)]
+
+
+@pytest.mark.parametrize("max_entries", [0, 50, 100_000])
+def test_matches_direct_predictions(batches, max_entries):
+    predict = Counted()
+    cache = PredictionCache(predict, max_entries=max_entries)
+    for batch in batches:
+        np.testing.assert_array_equal(cache.predict(batch), Counted()(batch))
+    stats = cache.stats()
+    assert stats["rows"] == sum(map(len, batches))
+    assert predict.rows == stats["misses"] == stats["distinct"] - stats["hits"]
+    assert len(cache) <= max_entries
+    distinct = len(np.unique(np.nan_to_num(np.vstack(batches), nan=-1), axis=0))
+    if max_entries >= distinct:
+        assert predict.rows == distinct
+        assert stats["evictions"] == 0
+
+
+def test_signed_zeros_and_nans_match(batches):
+    predict = Counted()
+    cache = PredictionCache(predict)
+    X = np.array([[0.0, np.nan], [-0.0, np.nan], [0.0, -np.nan]])
+    np.testing.assert_array_equal(cache.predict(X), Counted()(X))
+    assert predict.rows == 1
+
+
+def test_hash_collisions_are_exact(batches, monkeypatch):
+    monkeypatch.setattr(cvd.memo, "row_hashes", lambda X: np.zeros(len(X), dtype=np.uint64))
+    predict = Counted()
+    cache = PredictionCache(predict)
+    for batch in batches[:2]:
+        np.testing.assert_array_equal(cache.predict(batch), Counted()(batch))
+    assert cache.stats()["collisions"] == 2
+    assert len(cache) == 0
@@ -0,0 +1,70 @@
+"""``NestedCV`` reproduces a naive nested ``GridSearchCV`` on the same blocks."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV, StratifiedKFold
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+from conftest import encoded_rows
+from cvd.nested import NestedCV
+from cvd.profiling import Profiler
+
+N_OUTER = 4
+FAMILIES = {
+    "lr": (Pipeline([("scaler", StandardScaler()), ("lr", LogisticRegression(max_iter=1000))]),
+           {"lr__C": [0.01, 0.1, 1.0]}),
+    "tree": (DecisionTreeClassifier(random_state=0), {"max_depth": [2, 4, 8]}),
+}
+
+
+def naive_nested(estimator, grid, X, y, scoring):
+    """A ``GridSearchCV`` per outer fold, its inner folds the other blocks."""
+    splitter = StratifiedKFold(N_OUTER, shuffle=True, random_state=0)
+    blocks = [valid for _, valid in splitter.split(X, y)]
+    outer_scores, inner_scores, best_params = [], [], []
+    for outer, test in enumerate(blocks):
+        train = np.setdiff1d(np.arange(len(y)), test)
+        inner_cv = [(np.flatnonzero(~np.isin(train, block)), np.flatnonzero(np.isin(train, block)))
+                    for index, block in enumerate(blocks) if index != outer]
+        search = GridSearchCV(estimator, grid, cv=inner_cv, scoring=scoring)
+        search.fit(X[train], y[train])
+        outer_scores.append(search.score(X[test], y[test]))
+        inner_scores.append(search.best_score_)
+        best_params.append(search.best_params_)
+    return np.array(outer_scores), np.array(inner_scores), best_params
+
+
+@pytest.fixture(scope="module")
+def data():
+    return encoded_rows(800, seed=5)
+
+
+@pytest.fixture(scope="module")
+def results(data):
+    nested = NestedCV(n_outer=N_OUTER, scoring="roc_auc", n_jobs=1, profiler=Profiler())
+    for name, (estimator, grid) in FAMILIES.items():
+        nested.add(name, estimator, grid)
+    return nested.fit(*data)
+
+
+@pytest.mark.parametrize("name", list(FAMILIES))
+def test_matches_naive_nested_grid_search(name, data, results):
+    outer, inner, best_params = naive_nested(*FAMILIES[name], *data, scoring="roc_auc")
+    result = results[name]
+    np.testing.assert_allclose(result.outer_scores_["score"], outer, rtol=1e-12)
+    np.testing.assert_allclose(result.inner_scores_, inner, rtol=1e-12)
+    assert result.best_params_ == best_params
+
+
+@pytest.mark.parametrize("name", list(FAMILIES))
+def test_pair_sharing_halves_inner_fits(name, results):
+    cost = results[name].cost_
+    n_candidates = len(FAMILIES[name][1][next(iter(FAMILIES[name][1]))])
+    pairs = N_OUTER * (N_OUTER - 1) // 2
+    assert cost["fits"] == n_candidates * pairs + N_OUTER
+    assert cost["independent_fits"] == n_candidates * N_OUTER * (N_OUTER - 1) + N_OUTER
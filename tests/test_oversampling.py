@@ -0,0 +1,45 @@
+"""``FastSMOTE`` draws the same synthetic rows as ``imblearn``'s ``SMOTE``.
+
+The rows are jittered so that no two minority rows are equidistant from a
+third; with ties the two may pick different (equally near) neighbours.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from imblearn.over_sampling import SMOTE
+from sklearn.model_selection import StratifiedKFold
+
+from conftest import encoded_rows
+from cvd.oversampling import FastSMOTE, MinorityNeighbors
+
+
+@pytest.fixture(scope="module")
+def data():
+    X, y = encoded_rows(2_000, seed=8)
+    return X + np.random.default_rng(0).normal(scale=1e-3, size=X.shape), y
+
+
+@pytest.mark.parametrize("k_neighbors", [3, 5])
+@pytest.mark.parametrize("sampling_strategy", ["auto", 0.5])
+def test_matches_imblearn(data, k_neighbors, sampling_strategy):
+    expected = SMOTE(k_neighbors=k_neighbors, sampling_strategy=sampling_strategy,
+                     random_state=1).fit_resample(*data)
+    sampler = FastSMOTE(k_neighbors=k_neighbors, sampling_strategy=sampling_strategy,
+                        random_state=1, block_size=100)
+    X_resampled, y_resampled = sampler.fit_resample(*data)
+    np.testing.assert_array_equal(y_resampled, expected[1])
+    np.testing.assert_allclose(X_resampled, expected[0], rtol=1e-12)
+
+
+def test_shared_neighbors_match_imblearn_on_folds(data):
+    X, y = data
+    neighbors = MinorityNeighbors(k_neighbors=5).fit(X, y)
+    for train, _ in StratifiedKFold(4, shuffle=True, random_state=0).split(X, y):
+        expected = SMOTE(random_state=2).fit_resample(X[train], y[train])
+        sampler = FastSMOTE(random_state=2, neighbors=neighbors, virtual=True)
+        view, y_resampled = sampler.fit_resample(X[train], y[train])
+        np.testing.assert_array_equal(y_resampled, expected[1])
+        assert view.shape == expected[0].shape
+        np.testing.assert_allclose(view.to_numpy(), expected[0], rtol=1e-12)
@@ -0,0 +1,76 @@
+"""The numpy runtime scores like the sklearn pipelines it was exported from."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from imblearn.over_sampling import SMOTE
+from imblearn.pipeline import Pipeline
+from sklearn.decomposition import PCA
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.preprocessing import StandardScaler
+
+from conftest import encoded_rows
+from cvd.decomposition import StreamingPCA
+from cvd.encoding import BRFSSEncoder
+from cvd.runtime import export_model, fold_linear, load_runtime, score_csv
+from cvd.synthetic import make_frame
+from cvd.train import DROPPED_COLUMNS, TARGET
+
+PIPELINES = {
+    "lr": lambda: Pipeline([("scaler", StandardScaler()),
+                            ("lr", LogisticRegression(max_iter=1000))]),
+    "pca": lambda: Pipeline([("scaler", StandardScaler()), ("pca", PCA(0.8)),
+                             ("lr", LogisticRegression(max_iter=1000))]),
+    "whiten": lambda: Pipeline([("scaler", StandardScaler()),
+                                ("pca", StreamingPCA(5, whiten=True)),
+                                ("lr", LogisticRegression(max_iter=1000))]),
+    "smote": lambda: Pipeline([("smote", SMOTE(random_state=0)), ("scaler", StandardScaler()),
+                               ("lr", LogisticRegression(max_iter=1000))]),
+}
+
+
+@pytest.fixture(scope="module")
+def data():
+    X, y = encoded_rows(3_000, seed=6)
+    return X[:2_000], y[:2_000], X[2_000:]
+
+
+@pytest.mark.parametrize("name", list(PIPELINES))
+def test_fold_linear_matches_pipeline(name, data):
+    X, y, X_test = data
+    pipeline = PIPELINES[name]().fit(X, y)
+    model = fold_linear(pipeline)
+    np.testing.assert_allclose(model.predict_proba(X_test), pipeline.predict_proba(X_test),
+                               rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(model.predict(X_test), pipeline.predict(X_test))
+
+
+def test_no_runtime_form(data, tmp_path):
+    X, y, _ = data
+    knn = KNeighborsClassifier().fit(X, y)
+    assert fold_linear(knn) is None
+    with pytest.raises(ValueError, match="no numpy runtime form"):
+        export_model(knn, tmp_path / "knn.npz", [])
+
+
+@pytest.mark.parametrize("name", ["lr", "rf"])
+def test_score_csv_matches_pipeline(name, tmp_path):
+    frame = make_frame("2021", 1_500, random_state=7)
+    encoded = BRFSSEncoder().fit_transform(frame)
+    y = encoded.pop(TARGET).to_numpy()
+    features = encoded.drop(columns=DROPPED_COLUMNS)
+    estimator = (PIPELINES["pca"]() if name == "lr"
+                 else RandomForestClassifier(20, max_depth=8, random_state=0))
+    estimator.fit(features.to_numpy(), y)
+    export_model(estimator, tmp_path / "model.npz", features.columns)
+    frame.drop(columns=TARGET).to_csv(tmp_path / "rows.csv", index=False)
+
+    scores = score_csv(load_runtime(tmp_path / "model.npz", cache_size=100),
+                       tmp_path / "rows.csv", tmp_path / "scores.csv", chunksize=400)
+    expected = estimator.predict_proba(features.to_numpy())[:, 1]
+    np.testing.assert_allclose(scores, expected, rtol=1e-9, atol=1e-6)
+    written = np.loadtxt(tmp_path / "scores.csv", skiprows=1)
+    np.testing.assert_array_equal(written, scores)
@@ -0,0 +1,123 @@
+"""``SearchEngine`` reproduces ``GridSearchCV`` for families without halving."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from imblearn.over_sampling import SMOTE
+from imblearn.pipeline import Pipeline as ImbPipeline
+from sklearn.decomposition import PCA
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+from conftest import encoded_rows
+from cvd.profiling import Profiler
+from cvd.search import Halving, SearchEngine
+
+FAMILIES = {
+    "lr": (Pipeline([("scaler", StandardScaler()), ("lr", LogisticRegression(max_iter=1000))]),
+           {"lr__C": [0.01, 0.1, 1.0]}),
+    "knn": (Pipeline([("scaler", StandardScaler()), ("pca", PCA(5, random_state=0)),
+                      ("knn", KNeighborsClassifier())]),
+            {"knn__n_neighbors": [3, 9], "knn__weights": ["uniform", "distance"]}),
+    "smote": (ImbPipeline([("smote", SMOTE(random_state=0)), ("scaler", StandardScaler()),
+                           ("lr", LogisticRegression(max_iter=1000))]),
+              {"lr__C": [0.1, 1.0]}),
+    "tree": (DecisionTreeClassifier(random_state=0),
+             {"max_depth": [2, 4, None], "min_samples_leaf": [1, 20]}),
+}
+
+
+@pytest.fixture(scope="module")
+def data():
+    return encoded_rows(600, seed=3)
+
+
+@pytest.fixture(scope="module", params=[True, False], ids=["shared", "local"])
+def results(request, data):
+    engine = SearchEngine(cv=4, scoring="roc_auc", n_jobs=1, shared=request.param,
+                          profiler=Profiler())
+    for name, (estimator, grid) in FAMILIES.items():
+        engine.add(name, estimator, grid)
+    return engine.fit(*data)
+
+
+@pytest.mark.parametrize("name", list(FAMILIES))
+def test_matches_grid_search(name, data, results):
+    estimator, grid = FAMILIES[name]
+    expected = GridSearchCV(estimator, grid, cv=4, scoring="roc_auc").fit(*data)
+    result = results[name]
+    assert result.cv_results_["params"] == expected.cv_results_["params"]
+    for key in ["mean_test_score", "std_test_score", "rank_test_score",
+                *(f"split{fold}_test_score" for fold in range(4))]:
+        np.testing.assert_allclose(result.cv_results_[key], expected.cv_results_[key],
+                                   rtol=1e-12, err_msg=key)
+    assert result.best_params_ == expected.best_params_
+    np.testing.assert_allclose(result.predict_proba(data[0]),
+                               expected.predict_proba(data[0]), rtol=1e-12)
+
+
+def test_several_metrics_match_grid_search(data):
+    estimator, grid = FAMILIES["lr"]
+    scoring = ["accuracy", "roc_auc"]
+    engine = SearchEngine(cv=3, scoring=scoring, refit="roc_auc", n_jobs=1,
+                          profiler=Profiler())
+    result = engine.add("lr", estimator, grid).fit(*data)["lr"]
+    expected = GridSearchCV(estimator, grid, cv=3, scoring=scoring, refit="roc_auc").fit(*data)
+    for metric in scoring:
+        for key in [f"mean_test_{metric}", f"rank_test_{metric}"]:
+            np.testing.assert_allclose(result.cv_results_[key], expected.cv_results_[key],
+                                       rtol=1e-12, err_msg=key)
+    assert result.best_params_ == expected.best_params_
+
+
+def test_halving_schedule():
+    assert Halving(factor=3).schedule(9, 90) == [(9, 10), (3, 30), (1, 90)]
+    assert Halving(factor=3).schedule(10, 900) == [(10, 100), (4, 300), (2, 900)]
+    # the last round always uses the full budget
+    assert Halving(factor=2, min_resources=16).schedule(5, 100) == [(5, 16), (3, 32),
+                                                                    (2, 100)]
+    assert Halving(factor=3).schedule(1, 50) == [(1, 50)]
+
+
+def test_halving_n_estimators_saves_three_quarters(data):
+    grid = {"max_depth": [2, 4, 6], "min_samples_leaf": [1, 5, 20]}
+    forest = RandomForestClassifier(n_estimators=90, random_state=0)
+    engine = SearchEngine(cv=4, scoring="roc_auc", n_jobs=1, profiler=Profiler())
+    result = engine.add("rf", forest, grid, halving="n_estimators").fit(*data)["rf"]
+    report = result.halving_
+    # 9 candidates x 10 trees, the best 3 grow 20 more, the best one 60 more,
+    # in each of 4 folds: 13 fits per fold, (9 x 10 + 3 x 20 + 60) / 90 = 7/3
+    # full forests per fold instead of 9
+    assert report["rounds"] == [{"n_candidates": 9, "n_resources": 10},
+                                {"n_candidates": 3, "n_resources": 30},
+                                {"n_candidates": 1, "n_resources": 90}]
+    assert report["fits"] == 13 * 4
+    assert report["exhaustive_fits"] == 9 * 4
+    assert report["resource_units"] == pytest.approx(4 * 7 / 3)
+    assert report["compute_saved"] == pytest.approx(1 - 7 / 27)  # 74%
+    np.testing.assert_array_equal(np.sort(result.cv_results_["iter"]), [0] * 6 + [1] * 2 + [2])
+    np.testing.assert_array_equal(np.sort(result.cv_results_["n_resources"]),
+                                  [10] * 6 + [30] * 2 + [90])
+    assert result.cv_results_["rank_test_score"][result.best_index_] == 1
+    assert result.cv_results_["iter"][result.best_index_] == 2
+    assert result.best_estimator_.n_estimators == 90
+
+
+def test_halving_n_samples_report(data):
+    estimator, grid = FAMILIES["tree"]
+    engine = SearchEngine(cv=3, scoring="roc_auc", n_jobs=1, profiler=Profiler())
+    halving = Halving("n_samples", factor=2, max_resources=360)
+    report = engine.add("tree", estimator, grid, halving=halving).fit(*data)["tree"].halving_
+    # 6 candidates on 90 rows, 3 on 180, 2 on 360, in each of 3 folds: 5 full
+    # fits per fold instead of 6
+    assert [(r["n_candidates"], r["n_resources"]) for r in report["rounds"]] == \
+        [(6, 90), (3, 180), (2, 360)]
+    assert report["fits"] == (6 + 3 + 2) * 3
+    assert report["resource_units"] == pytest.approx(3 * (6 * 90 + 3 * 180 + 2 * 360) / 360)
+    assert report["compute_saved"] == pytest.approx(1 - 5 / 6)
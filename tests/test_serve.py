@@ -0,0 +1,66 @@
+"""``Scorer`` rejects invalid records one at a time."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from conftest import encoded_rows
+from cvd.encoding import BRFSSEncoder
+from cvd.serve import InvalidRecord, Scorer, run_online, save_model
+from cvd.synthetic import make_frame
+from cvd.train import DROPPED_COLUMNS, TARGET
+
+
+@pytest.fixture(scope="module", params=["forest", "logistic"])
+def scorer(request, tmp_path_factory):
+    X, y = encoded_rows(2_000)
+    estimator = (RandomForestClassifier(20, max_depth=6, random_state=0)
+                 if request.param == "forest" else LogisticRegression(max_iter=1000))
+    path = tmp_path_factory.mktemp("models") / f"{request.param}.joblib"
+    encoder = BRFSSEncoder().fit(make_frame("2021", 100))
+    columns = [c for c in encoder.feature_names_out_ if c not in DROPPED_COLUMNS + [TARGET]]
+    save_model(estimator.fit(X, y), path, columns)
+    return Scorer(path, max_wait_ms=5.0)
+
+
+@pytest.fixture(scope="module")
+def records():
+    frame = make_frame("2021", 200, random_state=1).drop(columns=TARGET)
+    frame = frame.astype({"BMI": object})
+    frame.loc[3, "General_Health"] = "Superb"
+    frame.loc[5, "BMI"] = "abc"
+    return frame
+
+
+def test_encode_record_matches_encoder(scorer, records):
+    clean = records.drop(index=[3, 5])
+    rows = np.vstack([scorer.encode_record(r) for r in clean.to_dict("records")])
+    expected = scorer.encode(clean.astype({"BMI": np.float64})).to_numpy(dtype=np.float64)
+    np.testing.assert_array_equal(rows, expected)
+
+
+def test_invalid_rows_name_columns_and_values(scorer, records):
+    assert scorer.invalid_rows(records) == {3: {"General_Health": "Superb"}, 5: {"BMI": "abc"}}
+    with pytest.raises(InvalidRecord, match="General_Health='Superb'") as error:
+        scorer.predict_proba(records)
+    assert error.value.row == 3
+
+
+def test_bad_rows_do_not_fail_their_batch(scorer, records, tmp_path):
+    clean = scorer.predict_proba(records.drop(index=[3, 5]).astype({"BMI": np.float64}))
+    records.to_csv(tmp_path / "records.csv", index=False)
+    scores = scorer.score_file(tmp_path / "records.csv", chunksize=64)
+    assert list(scorer.last_file_problems) == [3, 5]
+    assert scorer.last_file_stats["invalid_rows"] == 2
+    np.testing.assert_array_equal(np.flatnonzero(np.isnan(scores)), [3, 5])
+    np.testing.assert_allclose(np.delete(scores, [3, 5]), clean)
+
+    online, summary = run_online(scorer, records.to_dict("records"), concurrency=16)
+    np.testing.assert_array_equal(np.flatnonzero(np.isnan(online)), [3, 5])
+    np.testing.assert_allclose(np.delete(online, [3, 5]), clean)
+    assert summary["requests"] == len(records) - 2
+    with pytest.raises(InvalidRecord, match="BMI='abc'"):
+        scorer.submit(records.iloc[5].to_dict()).result()
@@ -0,0 +1,81 @@
+"""``QuantileSketch`` quantiles are within the relative accuracy of exact ones."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from cvd.sketch import QuantileSketch, stratified_sample
+
+Q = np.linspace(0, 1, 21)
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    n = 20_000
+    groups = rng.integers(-1, 4, n)
+    values = rng.lognormal(4, 0.5, n) * np.where(groups == 3, -1, 1)
+    values[groups == 2] -= 60  # straddles zero
+    values[rng.random(n) < 0.01] = 0.0
+    values[rng.random(n) < 0.01] = np.nan
+    return values, groups
+
+
+def assert_close_to_exact(sketch, values, groups):
+    for g in range(sketch.n_groups):
+        exact = values[(groups == g) & np.isfinite(values)]
+        assert sketch.count[g] == len(exact)
+        ours = sketch.quantiles(Q, group=g)
+        expected = np.quantile(exact, Q, method="lower")
+        assert np.all(np.abs(ours - expected) <= sketch.relative_accuracy * np.abs(expected)
+                      + 1e-12)
+
+
+@pytest.mark.parametrize("relative_accuracy", [0.005, 0.02])
+def test_quantiles_match_exact(data, relative_accuracy):
+    sketch = QuantileSketch.from_columns(*data, n_groups=4, chunk_size=3_000,
+                                         relative_accuracy=relative_accuracy)
+    assert_close_to_exact(sketch, *data)
+
+
+def test_merge_equals_one_pass(data):
+    values, groups = data
+    whole = QuantileSketch.from_columns(values, groups, n_groups=4)
+    merged = QuantileSketch(4)
+    for part in np.array_split(np.arange(len(values)), 5):
+        merged.merge(QuantileSketch(4).update(values[part], groups[part]))
+    np.testing.assert_array_equal(merged.quantiles(Q), whole.quantiles(Q))
+    np.testing.assert_array_equal(merged.count, whole.count)
+    for g in range(4):
+        for ours, expected in zip(merged.buckets(g), whole.buckets(g)):
+            np.testing.assert_array_equal(ours, expected)
+    with pytest.raises(ValueError):
+        merged.merge(QuantileSketch(4, relative_accuracy=0.01))
+
+
+def test_box_stats_and_histogram(data):
+    values, groups = data
+    sketch = QuantileSketch.from_columns(values, groups, n_groups=4)
+    boxes = sketch.box_stats(labels="abcd")
+    assert [box["label"] for box in boxes] == list("abcd")
+    for g, box in enumerate(boxes):
+        exact = values[(groups == g) & np.isfinite(values)]
+        assert box["n"] == len(exact)
+        assert box["med"] == pytest.approx(np.median(exact), rel=0.011)
+        assert box["mean"] == pytest.approx(exact.mean(), rel=0.01)
+    counts, edges = sketch.histogram(bins=30)
+    assert counts.sum() == sketch.count.sum()
+    assert edges[0] == np.nanmin(values[groups >= 0])
+
+
+def test_stratified_sample_quotas():
+    rng = np.random.default_rng(1)
+    strata = rng.choice([0, 1, 2, -1], size=10_000, p=[0.8, 0.17, 0.002, 0.028])
+    rows = stratified_sample(strata, 500, min_per_stratum=10, random_state=0)
+    assert np.all(np.diff(rows) > 0) and np.all(strata[rows] >= 0)
+    counts = np.bincount(strata[rows], minlength=3)
+    available = np.bincount(strata[strata >= 0], minlength=3)
+    share = 500 * available / available.sum()
+    assert np.all(counts >= np.minimum(10, available))
+    assert np.all(np.abs(counts - np.maximum(share, np.minimum(10, available))) <= 1)
@@ -0,0 +1,80 @@
+"""``ColumnStats`` reports match pandas, whether built at once or merged."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cvd.stats import ColumnStats
+
+
+@pytest.fixture(scope="module")
+def frame():
+    rng = np.random.default_rng(0)
+    n = 3_000
+    height = rng.normal(170, 10, n)
+    frame = pd.DataFrame({
+        "height": height,
+        "weight": 0.9 * height - 80 + rng.normal(0, 8, n),
+        "servings": rng.integers(0, 30, n).astype(np.float64),
+        "health": pd.Categorical.from_codes(rng.integers(-1, 5, n),
+                                            ["Poor", "Fair", "Good", "Very Good", "Excellent"]),
+    })
+    frame.loc[rng.random(n) < 0.1, "weight"] = np.nan
+    frame.loc[rng.random(n) < 0.05, "servings"] = np.nan
+    # later rows sit far from the first chunk's shift
+    frame.loc[2_000:, "height"] += 1e4
+    return frame
+
+
+@pytest.fixture(scope="module", params=["once", "chunks", "merged"])
+def stats(request, frame):
+    if request.param == "once":
+        return ColumnStats.from_frame(frame)
+    if request.param == "chunks":
+        return ColumnStats.from_frame(frame, chunk_size=700)
+    parts = [ColumnStats.from_frame(frame.iloc[start:stop])
+             for start, stop in [(0, 500), (500, 2_000), (2_000, None)]]
+    merged = ColumnStats().merge(parts[0])
+    for part in parts[1:]:
+        merged.merge(part)
+    return merged
+
+
+def test_corr_matches_pandas(frame, stats):
+    numeric = frame.drop(columns="health")
+    columns = list(numeric.columns)
+    pd.testing.assert_frame_equal(stats.corr(columns), numeric.corr(), rtol=1e-9)
+    pd.testing.assert_frame_equal(stats.corr(["servings", "weight"]),
+                                  numeric[["servings", "weight"]].corr(), rtol=1e-9)
+
+
+def test_describe_matches_pandas(frame, stats):
+    expected = frame.drop(columns="health").describe()
+    pd.testing.assert_frame_equal(stats.describe(), expected, rtol=1e-9)
+
+
+def test_counts_match_pandas(frame, stats):
+    assert stats.n_rows == len(frame)
+    pd.testing.assert_series_equal(stats.null_counts(), frame.isnull().sum(),
+                                   check_names=False)
+    health = frame["health"].value_counts().sort_index()
+    ours = stats.value_counts("health")
+    np.testing.assert_array_equal(ours.index, health.index.astype(object))
+    np.testing.assert_array_equal(ours.to_numpy(), health.to_numpy())
+    np.testing.assert_array_equal(stats.unique("servings"),
+                                  np.sort(frame["servings"].dropna().unique()))
+
+
+def test_too_many_distinct_values(frame):
+    stats = ColumnStats.from_frame(frame, chunk_size=1_000, max_distinct=100)
+    assert stats.value_counts("servings").sum() == frame["servings"].notna().sum()
+    with pytest.raises(ValueError, match="more than 100 distinct"):
+        stats.value_counts("height")
+    assert np.isnan(stats.describe(["height"]).loc["50%", "height"])
+
+
+def test_merge_rejects_other_columns(frame):
+    with pytest.raises(ValueError, match="different columns"):
+        ColumnStats.from_frame(frame).merge(ColumnStats.from_frame(frame[["height"]]))